@@ -0,0 +1,223 @@
+"""
+Persistent registry of BERVO numeric IDs.
+
+The registry maps each source term key (the text ID from the sheet, e.g.
+BERVO:Eco_NetRad_col) to the number it was given the first time it was seen.
+It is stored as a small SQLite file kept next to bervo-idranges.owl, so a
+rebuild only allocates numbers for new terms and existing terms keep their IDs
+no matter how the input is ordered. New numbers are taken from one of the ID
+ranges declared in bervo-idranges.owl, after the highest number that is
+registered or reserved. The numbers of a released ontology can be reserved
+with reserve_released, so a new registry does not hand out IDs that were
+already released, and 0, the number of the root term, is never handed out.
+
+Registry IDs have the width given by iddigits in the ID ranges file, seven
+digits for BERVO (BERVO:0000012), as in the released ontology; this differs
+from the five-digit IDs (BERVO:00012) that process_ecosim_csv.py counts
+without a registry.
+"""
+
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+
+def read_id_range(idranges_file: str, allocated_to: str = 'ONTOLOGY-CREATOR') -> dict:
+    """
+    Read an ID range from an ODK ID ranges file (Manchester syntax).
+
+    Args:
+        idranges_file: Path to the ID ranges file, e.g. bervo-idranges.owl
+        allocated_to: Name of the range owner, as given by allocatedto:
+
+    Returns:
+        Dictionary with prefix, digits, start and end of the range
+    """
+    with open(idranges_file, 'r') as file:
+        content = file.read()
+
+    prefix = re.search(r'idsfor:\s*"([^"]+)"', content)
+    digits = re.search(r'iddigits:\s*(\d+)', content)
+    if not prefix or not digits:
+        raise ValueError(f"No idsfor/iddigits annotations found in {idranges_file}")
+
+    for block in content.split('Datatype:')[1:]:
+        owner = re.search(r'allocatedto:\s*"([^"]+)"', block)
+        bounds = re.search(r'>=\s*(\d+)\s*,\s*<=\s*(\d+)', block)
+        if owner and bounds and owner.group(1) == allocated_to:
+            return {
+                'prefix': prefix.group(1),
+                'digits': int(digits.group(1)),
+                'start': int(bounds.group(1)),
+                'end': int(bounds.group(2)),
+            }
+
+    raise ValueError(f"No ID range allocated to '{allocated_to}' in {idranges_file}")
+
+
+class IdRegistry:
+    """
+    SQLite-backed mapping of term keys to numeric IDs.
+
+    Args:
+        path: Path to the SQLite registry file, created if missing
+        prefix: Prefix of the generated IDs
+        digits: Number of digits in the generated IDs
+        start: First number of the ID range new terms are allocated from
+        end: Last number of the ID range
+    """
+
+    def __init__(self, path: str, prefix: str = 'BERVO', digits: int = 7,
+                 start: int = 0, end: int = 999999):
+        self.path = path
+        self.prefix = prefix
+        self.digits = digits
+        self.start = start
+        self.end = end
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS ids ('
+            'key TEXT PRIMARY KEY, num INTEGER NOT NULL UNIQUE) WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE TABLE IF NOT EXISTS reserved (num INTEGER PRIMARY KEY)')
+
+    @classmethod
+    def from_id_ranges(cls, path: str, idranges_file: str,
+                       allocated_to: str = 'ONTOLOGY-CREATOR') -> 'IdRegistry':
+        """
+        Open a registry that allocates from a range declared in an ID ranges file.
+
+        Args:
+            path: Path to the SQLite registry file
+            idranges_file: Path to the ID ranges file, e.g. bervo-idranges.owl
+            allocated_to: Name of the range owner to allocate from
+
+        Returns:
+            IdRegistry instance
+        """
+        return cls(path, **read_id_range(idranges_file, allocated_to))
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM ids').fetchone()[0]
+
+    def __enter__(self) -> 'IdRegistry':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        self.conn.close()
+
+    def format_ids(self, nums: pd.Series) -> pd.Series:
+        """
+        Format numbers as prefixed IDs of digits digits, e.g. 12 -> BERVO:0000012.
+
+        Args:
+            nums: Integer numbers
+
+        Returns:
+            Prefixed IDs
+        """
+        return f"{self.prefix}:" + nums.astype('int64').astype(str).str.zfill(self.digits)
+
+    def lookup(self, keys: list) -> dict:
+        """
+        Look up the numbers already registered for some keys.
+
+        Args:
+            keys: Distinct term keys
+
+        Returns:
+            Dictionary of key to number, for the keys that are registered
+        """
+        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (key TEXT PRIMARY KEY) WITHOUT ROWID')
+        self.conn.execute('DELETE FROM wanted')
+        self.conn.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', ((key,) for key in keys))
+        found = dict(self.conn.execute('SELECT ids.key, ids.num FROM wanted JOIN ids USING (key)'))
+        self.conn.execute('DELETE FROM wanted')
+        return found
+
+    def reserve(self, nums) -> int:
+        """
+        Reserve numbers that must not be handed out, e.g. those of released terms.
+
+        Args:
+            nums: Integer numbers
+
+        Returns:
+            Number of numbers that were not reserved before
+        """
+        before = self.conn.total_changes
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO reserved (num) VALUES (?)', ((int(num),) for num in nums))
+        return self.conn.total_changes - before
+
+    def reserve_released(self, obo_file: str) -> int:
+        """
+        Reserve the numbers of the terms of a released ontology, e.g. bervo.obo,
+        whose ids are written as BERVO:0000001, BERVO_0000001 or bervo:BERVO_0000001.
+
+        Args:
+            obo_file: Path to the OBO file
+
+        Returns:
+            Number of numbers that were not reserved before
+        """
+        pattern = re.compile(rf'^id:\s*(?:\w+:)?{re.escape(self.prefix)}[:_](\d+)\s*$')
+        nums = []
+        with open(obo_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                match = pattern.match(line)
+                if match:
+                    nums.append(int(match.group(1)))
+        return self.reserve(nums)
+
+    def next_free(self) -> int:
+        """
+        Return the first number after the highest one registered or reserved in the range.
+        0 is never returned, as it is the number of the root term.
+        """
+        (highest,) = self.conn.execute(
+            'SELECT MAX(num) FROM (SELECT num FROM ids UNION ALL SELECT num FROM reserved) '
+            'WHERE num BETWEEN ? AND ?', (self.start, self.end)
+        ).fetchone()
+        return max(self.start, 1) if highest is None else max(highest + 1, 1)
+
+    def assign(self, keys: pd.Series) -> pd.Series:
+        """
+        Return the ID for every key, allocating numbers for keys not seen before.
+        New keys are numbered in order of first appearance and written to the
+        registry in one transaction.
+
+        Args:
+            keys: Term keys, possibly repeated
+
+        Returns:
+            Prefixed IDs aligned with keys
+        """
+        codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object).map(str)
+        nums = uniques.map(self.lookup(uniques.tolist()))
+
+        new = nums.isna().to_numpy()
+        if new.any():
+            first = self.next_free()
+            last = first + int(new.sum()) - 1
+            if last > self.end:
+                raise ValueError(
+                    f"ID range {self.start}-{self.end} of {self.path} is exhausted: "
+                    f"{int(new.sum())} new terms need IDs up to {last}"
+                )
+            nums[new] = np.arange(first, last + 1)
+            with self.conn:
+                self.conn.executemany(
+                    'INSERT INTO ids (key, num) VALUES (?, ?)',
+                    zip(uniques[new].tolist(), nums[new].astype('int64').tolist())
+                )
+
+        ids = self.format_ids(nums)
+        return pd.Series(ids.to_numpy()[codes], index=keys.index)
@@ -2,7 +2,27 @@
 
 import pandas as pd
 import argparse
+import csv
+import heapq
 import os
+import pickle
+import tempfile
+
+import numpy as np
+
+# Join types supported by the streaming backend
+STREAMING_JOIN_TYPES = ['left', 'inner', 'outer', 'right']
+
+# Join types supported per input by the N-way merge
+MULTI_JOIN_TYPES = ['left', 'inner', 'outer']
+
+# Rough per-object overheads used to estimate memory use, in bytes
+FIELD_OVERHEAD = 56
+ROW_OVERHEAD = 64
+INDEX_ENTRY_OVERHEAD = 120
+
+# Sorts after every byte offset, for rows that have no row in the ordered input
+LAST = np.iinfo(np.int64).max
 
 
 def get_first_column_name(file_path):
@@ -27,7 +47,30 @@ def get_first_column_name(file_path):
         raise ValueError(f"Empty CSV file: {file_path}")
 
 
-def merge_csv_files(primary_file, secondary_file, output_file, join_type='left', remove_first_column=False):
+def read_csv_file(file_path):
+    """
+    Read a whole CSV file, checking that it has at least one column.
+
+    Args:
+        file_path (str): Path to the CSV file
+
+    Returns:
+        pd.DataFrame: Contents of the file
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    try:
+        df = pd.read_csv(file_path)
+    except pd.errors.EmptyDataError:
+        raise ValueError(f"Empty CSV file: {file_path}")
+    if len(df.columns) == 0:
+        raise ValueError(f"No columns found in {file_path}")
+    return df
+
+
+def merge_csv_files(primary_file, secondary_file, output_file, join_type='left', remove_first_column=False,
+                    streaming=False, memory_budget_mb=512):
     """
     Merge two CSV files based on their first columns and save the result.
 
@@ -37,19 +80,37 @@ def merge_csv_files(primary_file, secondary_file, output_file, join_type='left',
         output_file (str): Path for the output merged CSV file
         join_type (str): Type of join to perform (default: 'left')
         remove_first_column (bool): Whether to remove the first column from the output file (default: False)
+        streaming (bool): Use the out-of-core backend, see stream_merge_csv_files (default: False)
+        memory_budget_mb (int): Memory budget of the streaming backend in MB (default: 512)
+
+    Returns:
+        dict: The secondary file name, its rows, matched primary rows, unmatched
+            primary rows and unmatched secondary rows, as multi_merge_csv_files gives per input
     """
-    # Get the names of the first columns
-    primary_first_col = get_first_column_name(primary_file)
-    secondary_first_col = get_first_column_name(secondary_file)
+    if streaming:
+        return stream_merge_csv_files(primary_file, secondary_file, output_file, join_type,
+                                      remove_first_column, memory_budget_mb)
 
-    # Read the CSV files
-    primary_df = pd.read_csv(primary_file)
-    secondary_df = pd.read_csv(secondary_file)
+    # Read the CSV files; the first column of each is the join key
+    primary_df = read_csv_file(primary_file)
+    secondary_df = read_csv_file(secondary_file)
+    primary_first_col = primary_df.columns[0]
+    secondary_first_col = secondary_df.columns[0]
 
     # Rename the first column of secondary_df to match primary_df for merging
     secondary_df = secondary_df.rename(
         columns={secondary_first_col: primary_first_col})
 
+    # Primary rows with and without a match, and secondary rows without a primary row;
+    # the keys are factorized together, as isin on string columns is much slower
+    codes, _ = pd.factorize(pd.concat([primary_df[primary_first_col], secondary_df[primary_first_col]],
+                                      ignore_index=True))
+    primary_codes, secondary_codes = codes[:len(primary_df)], codes[len(primary_df):]
+    primary_matched = int(np.isin(primary_codes, secondary_codes).sum())
+    secondary_matched = int(np.isin(secondary_codes, primary_codes).sum())
+    stats = {'file': secondary_file, 'rows': len(secondary_df), 'matched': primary_matched,
+             'missed': len(primary_df) - primary_matched, 'unmatched': len(secondary_df) - secondary_matched}
+
     # Merge the dataframes on the first column
     merged_df = pd.merge(
         primary_df,
@@ -57,13 +118,608 @@ def merge_csv_files(primary_file, secondary_file, output_file, join_type='left',
         on=primary_first_col,
         how=join_type
     )
-    
+
     # Remove the first column if specified
     if remove_first_column:
         merged_df = merged_df.drop(columns=[primary_first_col])
-        
+
     # Write the merged data to a new CSV file
     merged_df.to_csv(output_file, index=False)
+    return stats
+
+
+def dedupe_columns(columns):
+    """
+    Make column names unique the way pandas.read_csv does,
+    e.g. ['id', 'id', 'id'] -> ['id', 'id.1', 'id.2'].
+
+    Args:
+        columns (list): Column names as read from the header
+
+    Returns:
+        list: Unique column names
+    """
+    original = set(columns)
+    used = set()
+    result = []
+    for col in columns:
+        name = col
+        counter = 1
+        while name in used:
+            name = f"{col}.{counter}"
+            counter += 1
+            while name in original:
+                name = f"{col}.{counter}"
+                counter += 1
+        used.add(name)
+        result.append(name)
+    return result
+
+
+def merged_columns(primary_columns, secondary_columns, remove_first_column=False):
+    """
+    Work out the header of a merge on the first columns, following pandas.merge:
+    the key column, the other primary columns, then the other secondary columns,
+    with _x/_y suffixes on names the two files share.
+
+    Args:
+        primary_columns (list): Unique column names of the primary file
+        secondary_columns (list): Unique column names of the secondary file
+        remove_first_column (bool): Whether the key column is dropped from the output
+
+    Returns:
+        list: Output column names
+    """
+    primary_rest = primary_columns[1:]
+    secondary_rest = secondary_columns[1:]
+    shared = set(primary_rest) & set(secondary_rest)
+    columns = [] if remove_first_column else [primary_columns[0]]
+    columns += [f"{col}_x" if col in shared else col for col in primary_rest]
+    columns += [f"{col}_y" if col in shared else col for col in secondary_rest]
+    return columns
+
+
+def iter_records(file):
+    """
+    Yield every non-blank record of a CSV file opened in binary mode,
+    together with the byte offset it starts at.
+
+    Args:
+        file: CSV file opened in binary mode, positioned at a record start
+
+    Yields:
+        tuple: (offset, list of fields)
+    """
+    def lines():
+        while True:
+            line = file.readline()
+            if not line:
+                return
+            yield line.decode('utf-8-sig') if line.startswith(b'\xef\xbb\xbf') else line.decode('utf-8')
+
+    # csv.reader only pulls the lines of one record at a time, so the
+    # position before each read is the offset of the next record
+    reader = csv.reader(lines())
+    while True:
+        offset = file.tell()
+        fields = next(reader, None)
+        if fields is None:
+            return
+        if fields:
+            yield offset, fields
+
+
+def read_record(file, offset):
+    """
+    Read the CSV record starting at a byte offset.
+
+    Args:
+        file: CSV file opened in binary mode
+        offset (int): Offset from iter_records
+
+    Returns:
+        list: Fields of the record
+    """
+    file.seek(offset)
+    return next(iter_records(file))[1]
+
+
+def estimate_row_size(fields):
+    """
+    Estimate the memory held by a parsed CSV row, in bytes.
+
+    Args:
+        fields (list): Fields of the row
+
+    Returns:
+        int: Approximate size in bytes
+    """
+    return ROW_OVERHEAD + sum(FIELD_OVERHEAD + len(field) for field in fields)
+
+
+class JoinSide:
+    """
+    One input of a streaming join: the open file, its header and, once built,
+    a hash index from each key to the byte offsets of the rows with that key.
+
+    Args:
+        file_path (str): Path to the CSV file
+    """
+
+    def __init__(self, file_path):
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"File not found: {file_path}")
+        self.file_path = file_path
+        self.size = os.path.getsize(file_path)
+        self.file = open(file_path, 'rb')
+        header = next(iter_records(self.file), None)
+        if header is None:
+            self.file.close()
+            raise ValueError(f"Empty CSV file: {file_path}")
+        self.columns = dedupe_columns(header[1])
+        self.width = len(self.columns)
+        self.data_start = self.file.tell()
+        self.index = None
+        self.rows = None
+        self.row_count = 0
+
+    def close(self):
+        """Close the underlying file."""
+        self.file.close()
+
+    def fit(self, fields):
+        """Pad or cut a row to the header width."""
+        if len(fields) < self.width:
+            return fields + [''] * (self.width - len(fields))
+        return fields[:self.width]
+
+    def records(self):
+        """
+        Yield (offset, fields) for every data record, fitted to the header width.
+        After a full pass, row_count is the number of data records.
+        """
+        self.file.seek(self.data_start)
+        self.row_count = 0
+        for offset, fields in iter_records(self.file):
+            self.row_count += 1
+            yield offset, self.fit(fields)
+
+    def build_index(self, memory_budget):
+        """
+        Build the hash index on the key column.
+        The rows themselves are also kept when the whole file comfortably fits
+        the budget; otherwise they are read back by offset when needed.
+
+        Args:
+            memory_budget (int): Memory budget in bytes
+
+        Returns:
+            bool: False if the index does not fit the budget
+        """
+        index = {}
+        rows = {} if self.size * 4 <= memory_budget else None
+        used = 0
+        for offset, fields in self.records():
+            offsets = index.get(fields[0])
+            if offsets is None:
+                offsets = index[fields[0]] = []
+                used += INDEX_ENTRY_OVERHEAD + len(fields[0])
+            offsets.append(offset)
+            used += 8
+            if rows is not None:
+                rows[offset] = fields
+                used += estimate_row_size(fields)
+            if used > memory_budget:
+                return False
+        self.index = index
+        self.rows = rows
+        return True
+
+    def fetch(self, offset):
+        """Return the row starting at a byte offset."""
+        if self.rows is not None:
+            return self.rows[offset]
+        self.file.seek(offset)
+        return self.fit(next(iter_records(self.file))[1])
+
+
+def external_sort(items, run_size):
+    """
+    Sort tuples that may not fit in memory.
+    Items are sorted in runs of run_size, each run is written to a temporary
+    file, and the runs are merged lazily.
+
+    Args:
+        items: Iterable of comparable tuples
+        run_size (int): Number of items sorted in memory at a time
+
+    Yields:
+        Items in sorted order
+    """
+    runs = []
+    try:
+        run = []
+        for item in items:
+            run.append(item)
+            if len(run) >= run_size:
+                runs.append(write_run(sorted(run)))
+                run = []
+        if not runs:
+            yield from sorted(run)
+            return
+        if run:
+            runs.append(write_run(sorted(run)))
+        yield from heapq.merge(*(read_run(run_file) for run_file in runs))
+    finally:
+        for run_file in runs:
+            run_file.close()
+
+
+def write_run(items):
+    """Write sorted items to a temporary file, returned rewound."""
+    run_file = tempfile.TemporaryFile()
+    pickler = pickle.Pickler(run_file, protocol=pickle.HIGHEST_PROTOCOL)
+    for item in items:
+        pickler.dump(item)
+    run_file.seek(0)
+    return run_file
+
+
+def read_run(run_file):
+    """Read back the items of a file from write_run."""
+    unpickler = pickle.Unpickler(run_file)
+    while True:
+        try:
+            yield unpickler.load()
+        except EOFError:
+            return
+
+
+def join_pairs(ordered, other, join_type, memory_budget):
+    """
+    Join two inputs on their first columns and return the byte offsets of the joined rows.
+
+    A hash index is built on the smaller input. If the index does not fit the
+    memory budget, both inputs are sorted by key externally and merge-joined.
+    Pairs come out in the order of the ordered input, with rows of other that
+    match the same row in file order, which is the order pandas.merge gives
+    for left, inner and right joins. For outer joins, rows of other without a
+    match come last, in file order.
+
+    Args:
+        ordered (JoinSide): Input whose row order the output follows
+        other (JoinSide): The other input
+        join_type (str): One of STREAMING_JOIN_TYPES
+        memory_budget (int): Memory budget in bytes
+
+    Yields:
+        tuple: (ordered offset, other offset), with -1 for a missing side
+            and LAST for the ordered offset of unmatched rows of other
+    """
+    keep_ordered = join_type != 'inner'
+    keep_other = join_type == 'outer'
+    run_size = max(memory_budget // 200, 1000)
+
+    # Index on the other input: probe the ordered input and stream pairs directly
+    if other.size <= ordered.size and other.build_index(memory_budget):
+        matched = set()
+        for offset, fields in ordered.records():
+            offsets = other.index.get(fields[0])
+            if offsets:
+                for other_offset in offsets:
+                    yield offset, other_offset
+                if keep_other:
+                    matched.update(offsets)
+            elif keep_ordered:
+                yield offset, -1
+        if keep_other:
+            unmatched = (o for offsets in other.index.values() for o in offsets if o not in matched)
+            for other_offset in sorted(unmatched):
+                yield LAST, other_offset
+        return
+
+    # Index on the ordered input: matches arrive in the order of the other
+    # input, so the offset pairs are collected and sorted back into order
+    if ordered.build_index(memory_budget):
+        def pairs():
+            matched = set()
+            for offset, fields in other.records():
+                offsets = ordered.index.get(fields[0])
+                if offsets:
+                    for ordered_offset in offsets:
+                        yield ordered_offset, offset
+                    if keep_ordered:
+                        matched.update(offsets)
+                elif keep_other:
+                    yield LAST, offset
+            if keep_ordered:
+                for offsets in ordered.index.values():
+                    for ordered_offset in offsets:
+                        if ordered_offset not in matched:
+                            yield ordered_offset, -1
+        yield from external_sort(pairs(), run_size)
+        return
+
+    # Neither index fits: sort both inputs by key and merge-join them
+    ordered_keys = external_sort(((f[0], o) for o, f in ordered.records()), run_size)
+    other_keys = external_sort(((f[0], o) for o, f in other.records()), run_size)
+
+    def pairs():
+        ordered_groups = group_by_key(ordered_keys)
+        other_groups = group_by_key(other_keys)
+        ordered_group = next(ordered_groups, None)
+        other_group = next(other_groups, None)
+        while ordered_group is not None or other_group is not None:
+            if other_group is None or (ordered_group is not None and ordered_group[0] < other_group[0]):
+                if keep_ordered:
+                    for ordered_offset in ordered_group[1]:
+                        yield ordered_offset, -1
+                ordered_group = next(ordered_groups, None)
+            elif ordered_group is None or other_group[0] < ordered_group[0]:
+                if keep_other:
+                    for other_offset in other_group[1]:
+                        yield LAST, other_offset
+                other_group = next(other_groups, None)
+            else:
+                for ordered_offset in ordered_group[1]:
+                    for other_offset in other_group[1]:
+                        yield ordered_offset, other_offset
+                ordered_group = next(ordered_groups, None)
+                other_group = next(other_groups, None)
+
+    yield from external_sort(pairs(), run_size)
+
+
+def group_by_key(sorted_items):
+    """
+    Group sorted (key, offset) items by key.
+
+    Args:
+        sorted_items: (key, offset) tuples sorted by key
+
+    Yields:
+        tuple: (key, list of offsets)
+    """
+    current_key = None
+    offsets = []
+    for key, offset in sorted_items:
+        if offsets and key != current_key:
+            yield current_key, offsets
+            offsets = []
+        current_key = key
+        offsets.append(offset)
+    if offsets:
+        yield current_key, offsets
+
+
+def stream_merge_csv_files(primary_file, secondary_file, output_file, join_type='left',
+                           remove_first_column=False, memory_budget_mb=512):
+    """
+    Merge two CSV files on their first columns without loading them into DataFrames.
+
+    Each file is read in a single pass that takes the header and the data
+    together. Joined rows are written to the output as they are produced. The
+    output has the same columns as merge_csv_files. Values are copied as they
+    appear in the input rather than being parsed and re-formatted by pandas.
+    Row order matches pandas.merge for left, inner and right joins. For outer
+    joins, secondary rows without a match come after the primary rows.
+
+    Args:
+        primary_file (str): Path to the primary CSV file
+        secondary_file (str): Path to the secondary CSV file
+        output_file (str): Path for the output merged CSV file
+        join_type (str): Type of join to perform (default: 'left')
+        remove_first_column (bool): Whether to remove the first column from the output file (default: False)
+        memory_budget_mb (int): Memory the join index may use before falling back
+            to an external sort-merge, in MB (default: 512)
+
+    Returns:
+        dict: Match statistics, as returned by merge_csv_files
+    """
+    if join_type not in STREAMING_JOIN_TYPES:
+        raise ValueError(f"Unsupported join type for streaming merge: {join_type}. "
+                         f"Choose one of {STREAMING_JOIN_TYPES}")
+
+    primary = JoinSide(primary_file)
+    try:
+        secondary = JoinSide(secondary_file)
+    except Exception:
+        primary.close()
+        raise
+
+    try:
+        ordered, other = (secondary, primary) if join_type == 'right' else (primary, secondary)
+        columns = merged_columns(primary.columns, secondary.columns, remove_first_column)
+        empty_primary = [''] * primary.width
+        empty_secondary = [''] * secondary.width
+
+        # Pairs come sorted by ordered offset, so the matched rows of the ordered
+        # input are counted as runs; those of the other input are collected
+        matched_ordered = 0
+        matched_other = set()
+        previous = -1
+        with open(output_file, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(columns)
+            for ordered_offset, other_offset in join_pairs(ordered, other, join_type, memory_budget_mb * 1024 * 1024):
+                if other_offset >= 0 and ordered_offset != LAST:
+                    if ordered_offset != previous:
+                        matched_ordered += 1
+                        previous = ordered_offset
+                    matched_other.add(other_offset)
+                ordered_row = ordered.fetch(ordered_offset) if 0 <= ordered_offset < LAST else None
+                other_row = other.fetch(other_offset) if other_offset >= 0 else None
+                primary_row, secondary_row = (
+                    (other_row, ordered_row) if ordered is secondary else (ordered_row, other_row)
+                )
+                primary_row = primary_row or empty_primary
+                secondary_row = secondary_row or empty_secondary
+                key = primary_row[0] if primary_row is not empty_primary else secondary_row[0]
+                row = [] if remove_first_column else [key]
+                writer.writerow(row + primary_row[1:] + secondary_row[1:])
+    finally:
+        primary.close()
+        secondary.close()
+
+    if ordered is secondary:
+        primary_matched, secondary_matched = len(matched_other), matched_ordered
+    else:
+        primary_matched, secondary_matched = matched_ordered, len(matched_other)
+    return {'file': secondary_file, 'rows': secondary.row_count, 'matched': primary_matched,
+            'missed': primary.row_count - primary_matched, 'unmatched': secondary.row_count - secondary_matched}
+
+
+def multi_merged_columns(column_lists, remove_first_column=False):
+    """
+    Work out the header of an N-way merge on the first columns. Like
+    merged_columns, but a name shared by several inputs gets a suffix per
+    input: _x and _y for the first two, then _3, _4 and so on.
+
+    Args:
+        column_lists (list): Unique column names of each input, primary first
+        remove_first_column (bool): Whether the key column is dropped from the output
+
+    Returns:
+        list: Output column names
+    """
+    counts = {}
+    for columns in column_lists:
+        for col in columns[1:]:
+            counts[col] = counts.get(col, 0) + 1
+
+    suffixes = ['_x', '_y'] + [f"_{position + 1}" for position in range(2, len(column_lists))]
+    result = [] if remove_first_column else [column_lists[0][0]]
+    for columns, suffix in zip(column_lists, suffixes):
+        result += [f"{col}{suffix}" if counts[col] > 1 else col for col in columns[1:]]
+    return result
+
+
+def multi_merge_csv_files(input_files, output_file, join_types='left', remove_first_column=False,
+                          memory_budget_mb=512):
+    """
+    Merge any number of CSV files on their first columns in a single pass.
+
+    The first file is the primary input. One shared hash index maps each key
+    to the matching rows of every other input. The primary file is then
+    streamed once, and each of its rows is joined against all other inputs
+    at the same time. With several matches in more than one input, every
+    combination is written, as chained pandas merges would do.
+
+    Join types are given per secondary input:
+    - left: keep primary rows without a match in this input
+    - inner: drop primary rows without a match in this input
+    - outer: like left, and also add this input's rows whose key is not in the
+      primary file; they come last, one group per key with the matching rows
+      of all other inputs, and are still dropped by an inner join on another input
+
+    Args:
+        input_files (list): Paths to the CSV files, primary first
+        output_file (str): Path for the output merged CSV file
+        join_types (str or list): One join type for all secondary inputs,
+            or one per secondary input (default: 'left')
+        remove_first_column (bool): Whether to remove the first column from the output file (default: False)
+        memory_budget_mb (int): Above this size in MB, secondary rows are read back
+            from disk by offset instead of being kept in memory (default: 512)
+
+    Returns:
+        list: Per secondary input, a dict with the file name, rows, matched
+            primary rows, unmatched primary rows and unmatched input rows
+    """
+    if len(input_files) < 2:
+        raise ValueError("At least two input files are needed to merge")
+    if isinstance(join_types, str):
+        join_types = [join_types] * (len(input_files) - 1)
+    if len(join_types) != len(input_files) - 1:
+        raise ValueError(f"Expected 1 or {len(input_files) - 1} join types, got {len(join_types)}")
+    for join_type in join_types:
+        if join_type not in MULTI_JOIN_TYPES:
+            raise ValueError(f"Unsupported join type for N-way merge: {join_type}. "
+                             f"Choose one of {MULTI_JOIN_TYPES}")
+
+    sides = []
+    try:
+        for file_path in input_files:
+            sides.append(JoinSide(file_path))
+        primary, secondaries = sides[0], sides[1:]
+
+        # Shared index: key -> one list of row offsets per secondary input
+        keep_rows = sum(side.size for side in secondaries) * 4 <= memory_budget_mb * 1024 * 1024
+        index = {}
+        stats = []
+        for position, side in enumerate(secondaries):
+            side.rows = {} if keep_rows else None
+            rows = 0
+            for offset, fields in side.records():
+                entry = index.get(fields[0])
+                if entry is None:
+                    entry = index[fields[0]] = [[] for _ in secondaries]
+                entry[position].append(offset)
+                if keep_rows:
+                    side.rows[offset] = fields
+                rows += 1
+            stats.append({'file': side.file_path, 'rows': rows, 'matched': 0, 'missed': 0, 'unmatched': 0})
+
+        columns = multi_merged_columns([side.columns for side in sides], remove_first_column)
+        empty_rows = [[''] * side.width for side in sides]
+        seen_keys = set()
+
+        def joined_rows(key, primary_row, entry):
+            # Every combination of the matching rows of each secondary input
+            combinations = [([] if remove_first_column else [key]) + primary_row[1:]]
+            for position, side in enumerate(secondaries):
+                offsets = entry[position] if entry is not None else []
+                if not offsets:
+                    matches = [empty_rows[position + 1]]
+                else:
+                    matches = [side.fetch(offset) for offset in offsets]
+                combinations = [row + match[1:] for row in combinations for match in matches]
+            return combinations
+
+        with open(output_file, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.writer(out, lineterminator='\n')
+            writer.writerow(columns)
+
+            for offset, fields in primary.records():
+                key = fields[0]
+                seen_keys.add(key)
+                entry = index.get(key)
+                keep = True
+                for position, join_type in enumerate(join_types):
+                    if entry is not None and entry[position]:
+                        stats[position]['matched'] += 1
+                    else:
+                        stats[position]['missed'] += 1
+                        if join_type == 'inner':
+                            keep = False
+                if keep:
+                    writer.writerows(joined_rows(key, fields, entry))
+
+            # Keys that never occur in the primary file
+            outer = [position for position, join_type in enumerate(join_types) if join_type == 'outer']
+            inner = [position for position, join_type in enumerate(join_types) if join_type == 'inner']
+            for key, entry in index.items():
+                if key in seen_keys:
+                    continue
+                for position, offsets in enumerate(entry):
+                    stats[position]['unmatched'] += len(offsets)
+                # Kept once, with all matching rows, when an outer input has the
+                # key; an inner join on any other input applies to them as well
+                if (any(entry[position] for position in outer)
+                        and all(entry[position] for position in inner)):
+                    writer.writerows(joined_rows(key, empty_rows[0], entry))
+    finally:
+        for side in sides:
+            side.close()
+
+    return stats
+
+
+def print_stats(stats):
+    """Print the match statistics of each secondary input."""
+    for stat in stats:
+        print(f"{stat['file']}: {stat['rows']} rows, {stat['matched']} primary rows matched, "
+              f"{stat['missed']} primary rows without a match, "
+              f"{stat['unmatched']} rows without a primary row")
 
 
 def main():
@@ -71,21 +727,42 @@ def main():
     Main function to handle command-line arguments and execute the merge operation.
     """
     parser = argparse.ArgumentParser(
-        description='Merge two CSV files based on a common column.')
-    parser.add_argument('primary_file', help='Path to the primary CSV file')
-    parser.add_argument(
-        'secondary_file', help='Path to the secondary CSV file')
-    parser.add_argument(
-        'output_file', help='Path for the output merged CSV file')
-    parser.add_argument('--join-type', default='left',
-                        help='Type of join to perform (default: left)')
+        description='Merge CSV files based on their first columns. '
+                    'With more than two input files, all of them are merged in a single pass.')
+    parser.add_argument('files', nargs='+', metavar='file',
+                        help='Paths to the primary CSV file, one or more secondary CSV files, '
+                             'and the output merged CSV file, in that order')
+    parser.add_argument('--join-type', action='append', default=None,
+                        help='Type of join to perform, either once for all secondary files or once per '
+                             'secondary file, by repeating the option or separating the types with commas '
+                             '(default: left)')
     parser.add_argument('--remove-first-column', action='store_true',
                         help='Remove the first column from the output file')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Join two files out of core, streaming rows to the output instead of loading both files')
+    parser.add_argument('--memory-budget', type=int, default=512,
+                        help='Memory budget of the streaming join in MB; beyond it, an external sort-merge is used (default: 512)')
 
     args = parser.parse_args()
 
-    merge_csv_files(args.primary_file, args.secondary_file, args.output_file,
-                    args.join_type, args.remove_first_column)
+    if len(args.files) < 3:
+        parser.error('need a primary file, at least one secondary file and an output file')
+    input_files, output_file = args.files[:-1], args.files[-1]
+    join_types = [join_type.strip() for value in (args.join_type or ['left']) for join_type in value.split(',')]
+
+    if len(input_files) == 2 and len(join_types) == 1:
+        stats = merge_csv_files(input_files[0], input_files[1], output_file,
+                                join_types[0], args.remove_first_column,
+                                args.streaming, args.memory_budget)
+        print_stats([stats])
+        return
+
+    if args.streaming:
+        print("WARNING: --streaming only applies to two input files; the N-way merge streams the "
+              "primary file and keeps secondary rows in memory up to --memory-budget")
+    stats = multi_merge_csv_files(input_files, output_file, join_types[0] if len(join_types) == 1 else join_types,
+                                  args.remove_first_column, args.memory_budget)
+    print_stats(stats)
 
 
 if __name__ == "__main__":
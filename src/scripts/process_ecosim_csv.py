@@ -8,10 +8,151 @@ Script to process the bervo_for_sheet.csv file:
 """
 
 import pandas as pd
+import numpy as np
 import argparse
+import hashlib
+import json
 import re
 import os
 
+from id_registry import IdRegistry
+from row_cache import RowCache, hash_rows
+from stage_profiler import StageProfiler
+
+# Version of the row transformations in fix_malformed_ids and
+# remove_prefixes_from_columns. Bump it when their behaviour changes in a way
+# the rule lists below do not show, so cached rows are recomputed.
+RULES_VERSION = 1
+
+
+# Full IRIs that are collapsed to their prefixed form, applied in order
+IRI_REWRITE_RULES = [
+    (re.compile(r'http://purl\.obolibrary\.org/obo/ECOSIM_(.+)'), r'BERVO:\1'),
+    (re.compile(r'http://purl\.obolibrary\.org/obo/ECOSIMCONCEPT_(.+)'), r'ECOSIMCONCEPT:\1'),
+]
+
+# Prefixes removed from the start of each value
+PREFIX_STRIP_RULES = [
+    (re.compile(r'^(?:BERVO:)?(?:ECOSIMCONCEPT:)?'), ''),
+]
+
+# The same prefixes, removed from the start of every term in a pipe-separated
+# value. Whitespace around each term is stripped as well, so rewriting a whole
+# cell gives the same result as splitting on |, stripping and rewriting each
+# term, and joining the terms again.
+TERM_PREFIX_STRIP_RULES = [
+    (re.compile(r'\s*(^|\||$)\s*(?:BERVO:)?(?:ECOSIMCONCEPT:)?'), r'\1'),
+]
+
+# Pipe-separated columns produced by get-ecosim-subclasses.sparql
+MULTI_VALUED_COLUMNS = [
+    'has_units',
+    'qualifiers',
+    'attributes',
+    'measured_ins',
+    'measurement_ofs',
+    'contexts',
+    'parents'
+]
+
+
+# Progress messages are printed unless they are turned off, as --profile does
+# to print a summary table of the stages instead
+SHOW_PROGRESS = True
+
+
+def log(message: str) -> None:
+    """
+    Print a progress message, unless progress messages are turned off.
+
+    Args:
+        message: Message to print
+    """
+    if SHOW_PROGRESS:
+        print(message)
+
+
+def profiled_chunks(chunks, profiler: StageProfiler, name: str):
+    """
+    Iterate over a chunked CSV reader, measuring the reading of each chunk as a stage.
+
+    Args:
+        chunks: Iterator of DataFrame chunks, e.g. from pd.read_csv(..., chunksize=...)
+        profiler: StageProfiler to record the reads in
+        name: Stage name
+
+    Yields:
+        DataFrame chunks
+    """
+    chunks = iter(chunks)
+    while True:
+        with profiler.stage(name) as stage:
+            chunk = next(chunks, None)
+            stage.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def as_str(values: pd.Series) -> pd.Series:
+    """
+    Convert a column to strings the way str(x) would, so missing values become 'nan'.
+
+    Args:
+        values: Column to convert
+
+    Returns:
+        Column of Python strings
+    """
+    return values.astype(object).where(values.notna(), 'nan').astype(str)
+
+
+def rewrite_values(values: pd.Series, rules: list) -> pd.Series:
+    """
+    Apply a list of precompiled (pattern, replacement) rules to a column of strings.
+    Each rule is a single vectorized pass over the column.
+
+    Args:
+        values: Column of strings
+        rules: List of (compiled pattern, replacement) tuples
+
+    Returns:
+        Rewritten column
+    """
+    for pattern, replacement in rules:
+        # Pass the pattern source rather than the compiled object, so pandas can
+        # hand Arrow-backed string columns to its native regex kernel
+        values = values.str.replace(pattern.pattern, replacement, regex=True)
+    return values
+
+
+def find_secondary_id_columns(df: pd.DataFrame, id_col: str) -> tuple:
+    """
+    Find the secondary and tertiary ID columns that accompany id_col.
+
+    Args:
+        df: DataFrame containing the CSV data
+        id_col: The name of the ID column in the DataFrame
+
+    Returns:
+        Tuple of (secondary column, tertiary column), either may be None
+    """
+    id_col2 = None
+    id_col3 = None
+
+    # Try different patterns for secondary ID columns
+    for candidate in [f"{id_col}.1", "oboInOwl:id.1", "ID.1"]:
+        if candidate in df.columns:
+            id_col2 = candidate
+            break
+
+    for candidate in [f"{id_col}.2", "oboInOwl:id.2", "ID.2"]:
+        if candidate in df.columns:
+            id_col3 = candidate
+            break
+
+    return id_col2, id_col3
+
 
 def fix_malformed_ids(df: pd.DataFrame, id_col: str) -> pd.DataFrame:
     """
@@ -25,66 +166,23 @@ def fix_malformed_ids(df: pd.DataFrame, id_col: str) -> pd.DataFrame:
     Returns:
         DataFrame with fixed IDs
     """
-    # Regular expression to match full IRIs for ECOSIM and ECOSIMCONCEPT
-    bervo_iri_pattern = r'http://purl\.obolibrary\.org/obo/ECOSIM_(.+)'
-    bervoconcept_iri_pattern = r'http://purl\.obolibrary\.org/obo/ECOSIMCONCEPT_(.+)'
-
     # Also get the other id columns - handle different possible naming patterns
-    id_col2 = None
-    id_col3 = None
-    
-    # Try different patterns for secondary ID columns
-    if f"{id_col}.1" in df.columns:
-        id_col2 = f"{id_col}.1"
-    elif "oboInOwl:id.1" in df.columns:
-        id_col2 = "oboInOwl:id.1"
-    elif "ID.1" in df.columns:
-        id_col2 = "ID.1"
-        
-    if f"{id_col}.2" in df.columns:
-        id_col3 = f"{id_col}.2"
-    elif "oboInOwl:id.2" in df.columns:
-        id_col3 = "oboInOwl:id.2"
-    elif "ID.2" in df.columns:
-        id_col3 = "ID.2"
-    
-    print(f"Using ID column: {id_col}")
+    id_col2, id_col3 = find_secondary_id_columns(df, id_col)
+
+    log(f"Using ID column: {id_col}")
     if id_col2:
-        print(f"Using secondary ID column: {id_col2}")
+        log(f"Using secondary ID column: {id_col2}")
     if id_col3:
-        print(f"Using tertiary ID column: {id_col3}")
-    
+        log(f"Using tertiary ID column: {id_col3}")
+
     # Make sure the main ID column exists
     if id_col not in df.columns:
         raise KeyError(f"Column '{id_col}' not found in the CSV file. Available columns: {df.columns.tolist()}")
 
-    # Fix IDs in the ID column
-    df[id_col] = df[id_col].apply(
-        lambda x: re.sub(bervo_iri_pattern, r'BERVO:\1', str(x))
-    )
-    df[id_col] = df[id_col].apply(
-        lambda x: re.sub(bervoconcept_iri_pattern,
-                         r'ECOSIMCONCEPT:\1', str(x))
-    )
-
-    # Also fix in the other ID columns
-    if id_col2 in df.columns:
-        df[id_col2] = df[id_col2].apply(
-            lambda x: re.sub(bervo_iri_pattern, r'BERVO:\1', str(x))
-        )
-        df[id_col2] = df[id_col2].apply(
-            lambda x: re.sub(bervoconcept_iri_pattern,
-                            r'ECOSIMCONCEPT:\1', str(x))
-        )
-
-    if id_col3 in df.columns:
-        df[id_col3] = df[id_col3].apply(
-            lambda x: re.sub(bervo_iri_pattern, r'BERVO:\1', str(x))
-        )
-        df[id_col3] = df[id_col3].apply(
-            lambda x: re.sub(bervoconcept_iri_pattern,
-                            r'ECOSIMCONCEPT:\1', str(x))
-        )
+    # Fix IDs in the ID column and the other ID columns
+    for col in [id_col, id_col2, id_col3]:
+        if col in df.columns:
+            df[col] = rewrite_values(as_str(df[col]), IRI_REWRITE_RULES)
 
     return df
 
@@ -105,84 +203,132 @@ def remove_prefixes_from_columns(df: pd.DataFrame) -> pd.DataFrame:
     id_col2 = 'oboInOwl:id.1'
     id_col3 = 'oboInOwl:id.2'
 
-    # Additional columns to process
-    additional_columns = [
-        'has_units',        
-        'qualifiers',       
-        'attributes',       
-        'measured_ins',     
-        'measurement_ofs',  
-        'contexts',         
-        'parents'           
-    ]
+    log(f"Processing ID column 2: {id_col2}")
+    log(f"Processing ID column 3: {id_col3}")
 
-    print(f"Processing ID column 2: {id_col2}")
-    print(f"Processing ID column 3: {id_col3}")
-    
     if id_col2 in df.columns:
-        print(f"Sample values from {id_col2} before: {df[id_col2].iloc[2:7].tolist()}")
-
-        # Remove prefixes from second column
-        df[id_col2] = df[id_col2].apply(
-            lambda x: re.sub(r'^BERVO:', '', str(x))
-        )
-        df[id_col2] = df[id_col2].apply(
-            lambda x: re.sub(r'^ECOSIMCONCEPT:', '', str(x))
-        )
-
-        print(f"Sample values from {id_col2} after: {df[id_col2].iloc[2:7].tolist()}")
-    
+        log(f"Sample values from {id_col2} before: {df[id_col2].iloc[2:7].tolist()}")
+        df[id_col2] = rewrite_values(as_str(df[id_col2]), PREFIX_STRIP_RULES)
+        log(f"Sample values from {id_col2} after: {df[id_col2].iloc[2:7].tolist()}")
+
+    # Replace NaN values with empty strings first in the additional columns
+    additional_columns = [col for col in MULTI_VALUED_COLUMNS if col in df.columns]
+    for col_name in additional_columns:
+        df[col_name] = df[col_name].fillna('')
+
+    # The third ID column and the additional columns may contain
+    # multiple values separated by |
+    multi_valued = ([id_col3] if id_col3 in df.columns else []) + additional_columns
+    if id_col3 in df.columns:
+        log(f"Sample values from {id_col3} before: {df[id_col3].iloc[2:7].tolist()}")
+    if additional_columns:
+        log(f"Processing columns: {additional_columns}")
+
+    for col_name in multi_valued:
+        df[col_name] = rewrite_values(as_str(df[col_name]), TERM_PREFIX_STRIP_RULES)
+
     if id_col3 in df.columns:
-        print(f"Sample values from {id_col3} before: {df[id_col3].iloc[2:7].tolist()}")
-
-        # Remove prefixes from third column
-        # This column might contain multiple values separated by |
-        df[id_col3] = df[id_col3].apply(
-            lambda x: '|'.join([
-                re.sub(r'^BERVO:', '', term.strip()) for term in str(x).split('|')
-            ])
-        )
-        df[id_col3] = df[id_col3].apply(
-            lambda x: '|'.join([
-                re.sub(r'^ECOSIMCONCEPT:', '', term.strip()) for term in str(x).split('|')
-            ])
-        )
-
-        print(f"Sample values from {id_col3} after: {df[id_col3].iloc[2:7].tolist()}")
-
-    # Process additional columns
+        log(f"Sample values from {id_col3} after: {df[id_col3].iloc[2:7].tolist()}")
+
+    # Replace string 'nan' with empty string
     for col_name in additional_columns:
-        if col_name in df.columns:
-            print(f"Processing column: {col_name}")
-            # Replace NaN values with empty strings first
-            df[col_name] = df[col_name].fillna('')
-            # Each column may contain multiple values separated by |
-            df[col_name] = df[col_name].apply(
-                lambda x: '|'.join([
-                    re.sub(r'^BERVO:', '', term.strip()) for term in str(x).split('|')
-                ])
-            )
-            df[col_name] = df[col_name].apply(
-                lambda x: '|'.join([
-                    re.sub(r'^ECOSIMCONCEPT:', '', term.strip()) for term in str(x).split('|')
-                ])
-            )
-            # Replace string 'nan' with empty string
-            df[col_name] = df[col_name].apply(
-                lambda x: '' if str(x).lower() == 'nan' else str(x)
-            )
-            # Show sample of changes for first additional column
-            if col_name == additional_columns[0]:
-                print(f"Sample values from {col_name} after: {df[col_name].iloc[2:7].tolist()}")
+        df[col_name] = df[col_name].where(df[col_name].str.lower() != 'nan', '')
+
+    if additional_columns:
+        # Show sample of changes for first additional column
+        col_name = additional_columns[0]
+        log(f"Sample values from {col_name} after: {df[col_name].iloc[2:7].tolist()}")
 
     return df
 
 
-def replace_ids_with_numeric(df: pd.DataFrame) -> pd.DataFrame:
+def rules_fingerprint(columns: list, id_col: str) -> str:
     """
-    Replace text IDs with unique numerical identifiers.
-    All identifiers will use the ECOSIM prefix with a five-digit pattern.
-    
+    Fingerprint the row transformations applied to a file with the given columns.
+
+    Args:
+        columns: Column names of the CSV file
+        id_col: The name of the ID column
+
+    Returns:
+        Hex digest that changes whenever the rules or the column layout change
+    """
+    rules = IRI_REWRITE_RULES + PREFIX_STRIP_RULES + TERM_PREFIX_STRIP_RULES
+    parts = [
+        RULES_VERSION,
+        [(pattern.pattern, replacement) for pattern, replacement in rules],
+        MULTI_VALUED_COLUMNS,
+        list(columns),
+        id_col,
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def transformed_columns(columns: list, id_col: str) -> list:
+    """
+    List the columns that fix_malformed_ids and remove_prefixes_from_columns rewrite.
+
+    Args:
+        columns: Column names of the CSV file
+        id_col: The name of the ID column
+
+    Returns:
+        Names of the rewritten columns, in file order
+    """
+    id_columns = [id_col, 'oboInOwl:id.1', 'oboInOwl:id.2']
+    id_columns += [col for col in find_secondary_id_columns(pd.DataFrame(columns=columns), id_col) if col]
+    return [col for col in columns if col in id_columns or col in MULTI_VALUED_COLUMNS]
+
+
+def transform_rows(df: pd.DataFrame, id_col: str, cache: RowCache = None) -> pd.DataFrame:
+    """
+    Fix malformed IDs and remove prefixes, row by row.
+    With a cache, rows already seen in an earlier run are taken from the
+    cache and only new or changed rows are transformed.
+
+    Args:
+        df: DataFrame containing the CSV data
+        id_col: The name of the ID column in the DataFrame
+        cache: Optional cache of transformed rows
+
+    Returns:
+        Transformed DataFrame
+    """
+    if cache is None:
+        df = fix_malformed_ids(df, id_col)
+        return remove_prefixes_from_columns(df)
+
+    columns = transformed_columns(df.columns.tolist(), id_col)
+    hashes = hash_rows(df)
+    hit, cached = cache.get(hashes)
+    dirty = ~hit
+    log(f"Reusing {int(hit.sum())} cached rows, transforming {int(dirty.sum())} new or changed rows")
+
+    if dirty.any():
+        changed = fix_malformed_ids(df[dirty].copy(), id_col)
+        changed = remove_prefixes_from_columns(changed)
+        cache.put(hashes[dirty], changed[columns])
+
+    # The other columns are left as they are, so only the rewritten ones
+    # are rebuilt from the cached and the freshly transformed rows
+    for col in columns:
+        values = np.empty(len(df), dtype=object)
+        if hit.any():
+            values[hit] = cached[col].to_numpy(dtype=object)
+        if dirty.any():
+            values[dirty] = changed[col].to_numpy(dtype=object)
+        df[col] = values
+
+    return df
+
+
+def build_id_mapping(df: pd.DataFrame, id_mapping: dict = None, counter: int = 1,
+                     skip_rows: int = 2, registry: IdRegistry = None) -> tuple:
+    """
+    Assign a new identifier to every distinct ID in the data rows.
+    The mapping and counter may be passed back in to continue numbering
+    over the next chunk of the same file.
+
     Special handling for:
     - Object properties: Use label with ECOSIM prefix (e.g., BERVO:has_unit)
     - Annotation properties: Use IRI from first column
@@ -190,182 +336,368 @@ def replace_ids_with_numeric(df: pd.DataFrame) -> pd.DataFrame:
 
     Args:
         df: DataFrame containing the CSV data
+        id_mapping: Mapping of old IDs to new IDs built so far
+        counter: Next number to hand out
+        skip_rows: Number of leading template header rows to leave untouched
+        registry: If given, numeric IDs are looked up in and allocated from
+            this persistent registry instead of being counted from 1
 
     Returns:
-        DataFrame with numeric IDs
+        Tuple of (mapping of old IDs to new IDs, next counter value)
     """
-    # Create a mapping of old IDs to new IDs
-    id_mapping = {}
-    counter = 1
-    
+    if id_mapping is None:
+        id_mapping = {}
+
     # Get column names
     iri_col_name = 'IRI'
     id_col = 'oboInOwl:id'
     label_col = 'LABEL'
     type_col = 'Type'
-    
-    # Skip the header rows (first 2 rows)
-    for idx, row in df.iloc[2:].iterrows():
-        old_id = row[id_col]
-        # Skip if already mapped
-        if old_id in id_mapping:
-            continue
-
-        # Check if this is an object or annotation property
-        if type_col in df.columns and row[type_col] in ['Object property', 'Annotation property']:
-            # For annotation properties, use the IRI from the first column
-            # because these are generally imported
-            if row[type_col] == 'Annotation property':
-                # Extract the local name from the IRI
-                iri = str(row[iri_col_name]).strip()
-                new_id = iri
-            # For object properties, check if Label is available
-            elif row[type_col] == 'Object property' and label_col in df.columns and pd.notna(row[label_col]) and str(row[label_col]).strip() != '':
-                # Clean the label for object properties
-                cleaned_label = str(row[label_col]).strip().lower()
-                cleaned_label = re.sub(r'[^a-z0-9_]', '_', cleaned_label)
-                new_id = f"BERVO:{cleaned_label}"
-            # If no appropriate value found but we have a non-empty ID, keep the original ID
-            elif pd.notna(old_id) and str(old_id).strip() != '' and str(old_id).lower() != 'nan':
-                new_id = str(old_id)
-            else:
-                # Last resort - generate a numeric ID
-                new_id = f"BERVO:{counter:05d}"
-                counter += 1
+
+    # Skip the header rows, and only look at the first row of each ID
+    # that has not been mapped yet
+    rows = df.iloc[skip_rows:].drop_duplicates(subset=id_col)
+    rows = rows[[old_id not in id_mapping for old_id in rows[id_col]]]
+    old_ids = rows[id_col]
+    new_ids = pd.Series(pd.NA, index=rows.index, dtype=object)
+
+    # Check if this is an object or annotation property
+    if type_col in df.columns:
+        # For annotation properties, use the IRI from the first column
+        # because these are generally imported
+        is_annotation = (rows[type_col] == 'Annotation property').to_numpy()
+        new_ids[is_annotation] = as_str(rows[iri_col_name][is_annotation]).str.strip().to_numpy()
+
+        # For object properties, use the cleaned label if it is available
+        is_object = (rows[type_col] == 'Object property').to_numpy()
+        has_label = np.zeros(len(rows), dtype=bool)
+        if label_col in df.columns:
+            labels = rows[label_col]
+            has_label = (labels.notna() & (as_str(labels).str.strip() != '')).to_numpy()
+            labelled = is_object & has_label
+            cleaned_labels = as_str(labels[labelled]).str.strip().str.lower()
+            cleaned_labels = cleaned_labels.str.replace(r'[^a-z0-9_]', '_', regex=True)
+            new_ids[labelled] = ("BERVO:" + cleaned_labels).to_numpy()
+
+        # If no label is available but we have a non-empty ID, keep the original ID
+        text_ids = as_str(old_ids)
+        has_id = (old_ids.notna() & (text_ids.str.strip() != '') & (text_ids.str.lower() != 'nan')).to_numpy()
+        keep_id = is_object & ~has_label & has_id
+        new_ids[keep_id] = text_ids[keep_id].to_numpy()
+
+    # Regular classes, and properties without a usable ID, get a numeric ID
+    # in order of first appearance
+    needs_number = new_ids.isna().to_numpy()
+    if needs_number.any():
+        if registry is not None:
+            new_ids[needs_number] = registry.assign(as_str(old_ids[needs_number])).to_numpy()
         else:
-            # For regular classes, create new numeric ID with ECOSIM prefix
-            new_id = f"BERVO:{counter:05d}"
-            counter += 1
+            numbers = np.arange(counter, counter + int(needs_number.sum()))
+            new_ids[needs_number] = [f"BERVO:{number:05d}" for number in numbers]
+            counter += len(numbers)
+
+    id_mapping.update(zip(old_ids, new_ids))
+    return id_mapping, counter
 
-        id_mapping[old_id] = new_id
 
-    # Apply the mapping to the ID column
-    # For the first two rows (headers), keep the original values
-    header_rows = df.iloc[:2].copy()
-    data_rows = df.iloc[2:].copy()
+def apply_id_mapping(df: pd.DataFrame, id_mapping: dict, skip_rows: int = 2) -> pd.DataFrame:
+    """
+    Replace the IDs of the data rows using a mapping from build_id_mapping.
+    IDs without an entry in the mapping are kept as they are.
+
+    Args:
+        df: DataFrame containing the CSV data
+        id_mapping: Mapping of old IDs to new IDs
+        skip_rows: Number of leading template header rows to leave untouched
+
+    Returns:
+        DataFrame with mapped IDs
+    """
+    id_col = 'oboInOwl:id'
 
     # Convert mapping to string keys
     string_id_mapping = {str(k): v for k, v in id_mapping.items()}
 
-    # Apply mapping with fallback
-    data_rows[id_col] = data_rows[id_col].apply(
-        lambda x: string_id_mapping.get(str(x), str(x))
-    )
-
-    # Combine header and data rows
-    result_df = pd.concat([header_rows, data_rows], ignore_index=True)
+    # Apply mapping with fallback; the header rows keep their original values
+    old_ids = as_str(df[id_col].iloc[skip_rows:])
+    new_ids = old_ids.map(string_id_mapping).fillna(old_ids)
+    df[id_col] = pd.concat([df[id_col].iloc[:skip_rows], new_ids])
 
-    return result_df
+    return df.reset_index(drop=True)
 
 
-def process_csv_file(input_file: str, output_file: str) -> None:
+def replace_ids_with_numeric(df: pd.DataFrame, registry: IdRegistry = None) -> pd.DataFrame:
     """
-    Process the bervo_for_sheet.csv file according to requirements.
+    Replace text IDs with unique numerical identifiers.
+    All identifiers will use the ECOSIM prefix with a five-digit pattern, or with
+    the seven digits of the ID ranges file when a registry is given.
+    See build_id_mapping for how properties are handled.
 
     Args:
-        input_file: Path to the input CSV file
-        output_file: Path to the output CSV file
+        df: DataFrame containing the CSV data
+        registry: Optional persistent registry to take numeric IDs from
+
+    Returns:
+        DataFrame with numeric IDs
     """
-    print(f"Reading CSV file: {input_file}")
+    id_mapping, _ = build_id_mapping(df, registry=registry)
+    return apply_id_mapping(df, id_mapping)
 
-    # Read the CSV file
-    try:
-        df = pd.read_csv(input_file)
-        print(f"Successfully read CSV with {len(df)} rows")
-        print(f"Columns in CSV: {df.columns.tolist()}")
-        
-        # Store the name of the first column (IRI column) to remove it later
-        iri_column = df.columns[0] if len(df.columns) > 0 else 'IRI'
-        print(f"First column (assumed to be IRI column): {iri_column}")
-        
-        # Identify the ID column - look for 'oboInOwl:id' or 'ID'
-        id_col = None
-        if 'oboInOwl:id' in df.columns:
-            id_col = 'oboInOwl:id'
-            print(f"Found ID column: {id_col}")
-        elif 'ID' in df.columns:
-            id_col = 'ID'
-            print(f"Found ID column: {id_col}")
-        else:
-            # Look for columns that might be ID columns
-            id_like_columns = [col for col in df.columns if 'id' in col.lower()]
-            if id_like_columns:
-                id_col = id_like_columns[0]
-                print(f"No standard ID column found. Using {id_col} as the ID column")
-            else:
-                print(f"WARNING: No ID column found in the CSV file. Available columns: {df.columns.tolist()}")
-                # Use the second column as a fallback (after the IRI column)
-                if len(df.columns) > 1:
-                    id_col = df.columns[1]
-                    print(f"Using {id_col} as a fallback ID column")
-                else:
-                    raise ValueError("Cannot identify an ID column in the CSV file")
-        
-        # Debugging: Check for Type values
-        if 'Type' in df.columns:
-            type_values = df['Type'].unique()
-            print(f"Unique Type values: {type_values}")
-            
-            # Count object and annotation properties
-            obj_props = df[df['Type'] == 'Object property'].shape[0]
-            ann_props = df[df['Type'] == 'Annotation property'].shape[0]
-            print(f"Found {obj_props} object properties and {ann_props} annotation properties")
-        
-    except Exception as e:
-        print(f"Error reading CSV file: {e}")
-        return
 
-    # Apply the processing steps
-    print("Fixing malformed IDs...")
-    df = fix_malformed_ids(df, id_col)
+def find_id_column(columns: list) -> str:
+    """
+    Identify the ID column - look for 'oboInOwl:id' or 'ID'.
 
-    print("Removing prefixes from columns...")
-    df = remove_prefixes_from_columns(df)
+    Args:
+        columns: Column names of the CSV file
 
-    print("Replacing text IDs with numeric IDs...")
-    df = replace_ids_with_numeric(df)
+    Returns:
+        Name of the ID column
+    """
+    if 'oboInOwl:id' in columns:
+        id_col = 'oboInOwl:id'
+        log(f"Found ID column: {id_col}")
+        return id_col
+    if 'ID' in columns:
+        id_col = 'ID'
+        log(f"Found ID column: {id_col}")
+        return id_col
+
+    # Look for columns that might be ID columns
+    id_like_columns = [col for col in columns if 'id' in col.lower()]
+    if id_like_columns:
+        id_col = id_like_columns[0]
+        log(f"No standard ID column found. Using {id_col} as the ID column")
+        return id_col
+
+    print(f"WARNING: No ID column found in the CSV file. Available columns: {list(columns)}")
+    # Use the second column as a fallback (after the IRI column)
+    if len(columns) > 1:
+        id_col = columns[1]
+        log(f"Using {id_col} as a fallback ID column")
+        return id_col
+    raise ValueError("Cannot identify an ID column in the CSV file")
+
+
+def finalize_columns(df: pd.DataFrame, iri_column: str, id_col: str, verbose: bool = True) -> pd.DataFrame:
+    """
+    Convert missing values to empty strings, remove the IRI column and
+    rename the ID column back to 'ID'.
 
+    Args:
+        df: DataFrame containing the processed CSV data
+        iri_column: Name of the IRI column to remove
+        id_col: Name of the ID column to rename
+        verbose: Whether to report each step
+
+    Returns:
+        DataFrame ready to be written out
+    """
     # Convert NaN values to empty strings
-    print("Converting NaN values to empty strings...")
+    if verbose:
+        log("Converting NaN values to empty strings...")
     df = df.fillna('')
 
     # Replace string 'nan' values with empty strings
-    print("Replacing string 'nan' values with empty strings...")
+    if verbose:
+        log("Replacing string 'nan' values with empty strings...")
     for col in df.columns:
-        df[col] = df[col].apply(lambda x: '' if str(
-            x).lower() == 'nan' else str(x))
-    
+        values = as_str(df[col])
+        df[col] = values.where(values.str.lower() != 'nan', '')
+
     # Remove the IRI column (first column)
-    print(f"Removing IRI column: {iri_column}")
+    if verbose:
+        log(f"Removing IRI column: {iri_column}")
     if iri_column in df.columns:
         df = df.drop(columns=[iri_column])
-    
+
     # Rename the ID column back to 'ID' to maintain compatibility
     if id_col in df.columns:
         df = df.rename(columns={id_col: 'ID'})
-        print(f"Renamed {id_col} to ID")
+        if verbose:
+            log(f"Renamed {id_col} to ID")
     elif 'ID' not in df.columns:
         # If neither oboInOwl:id nor ID exists, we have a problem
         print(f"WARNING: Neither '{id_col}' nor 'ID' column found in the data. Available columns: {df.columns.tolist()}")
         # Check if we have any columns with 'id' in their name (case insensitive)
         id_like_columns = [col for col in df.columns if 'id' in col.lower()]
         if id_like_columns:
-            print(f"Found possible ID columns: {id_like_columns}")
+            log(f"Found possible ID columns: {id_like_columns}")
             # Use the first one as a fallback
             df = df.rename(columns={id_like_columns[0]: 'ID'})
-            print(f"Renamed {id_like_columns[0]} to ID as a fallback")
+            log(f"Renamed {id_like_columns[0]} to ID as a fallback")
+
+    return df
+
+
+def process_csv_file(input_file: str, output_file: str, chunksize: int = None,
+                     registry: IdRegistry = None, row_cache_file: str = None,
+                     profiler: StageProfiler = None) -> None:
+    """
+    Process the bervo_for_sheet.csv file according to requirements.
+
+    Args:
+        input_file: Path to the input CSV file
+        output_file: Path to the output CSV file
+        chunksize: If given, stream the file in chunks of this many rows
+            (see process_csv_file_chunked)
+        registry: Optional persistent registry to take numeric IDs from,
+            so terms keep their IDs across runs
+        row_cache_file: Optional path to a cache of transformed rows, so
+            only rows changed since the last run are transformed again
+        profiler: Optional StageProfiler to record the time and memory of
+            each stage in
+    """
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    if chunksize:
+        process_csv_file_chunked(input_file, output_file, chunksize, registry, row_cache_file, profiler)
+        return
+
+    log(f"Reading CSV file: {input_file}")
+
+    # Read the CSV file
+    try:
+        with profiler.stage('read') as stage:
+            df = pd.read_csv(input_file)
+            stage.rows = len(df)
+        log(f"Successfully read CSV with {len(df)} rows")
+        log(f"Columns in CSV: {df.columns.tolist()}")
+
+        # Store the name of the first column (IRI column) to remove it later
+        iri_column = df.columns[0] if len(df.columns) > 0 else 'IRI'
+        log(f"First column (assumed to be IRI column): {iri_column}")
+
+        id_col = find_id_column(df.columns.tolist())
+
+        # Debugging: Check for Type values
+        if 'Type' in df.columns:
+            type_values = df['Type'].unique()
+            log(f"Unique Type values: {type_values}")
+
+            # Count object and annotation properties
+            obj_props = df[df['Type'] == 'Object property'].shape[0]
+            ann_props = df[df['Type'] == 'Annotation property'].shape[0]
+            log(f"Found {obj_props} object properties and {ann_props} annotation properties")
+
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return
+
+    # Apply the processing steps
+    log("Fixing malformed IDs and removing prefixes from columns...")
+    with profiler.stage('transform') as stage:
+        stage.rows = len(df)
+        if row_cache_file:
+            cache = RowCache(row_cache_file, rules_fingerprint(df.columns.tolist(), id_col))
+            df = transform_rows(df, id_col, cache)
+            cache.save()
+        else:
+            df = transform_rows(df, id_col)
+
+    log("Replacing text IDs with numeric IDs...")
+    with profiler.stage('assign_ids') as stage:
+        stage.rows = len(df)
+        df = replace_ids_with_numeric(df, registry)
+
+    with profiler.stage('finalize') as stage:
+        stage.rows = len(df)
+        df = finalize_columns(df, iri_column, id_col, verbose=SHOW_PROGRESS)
 
     # Write the processed data to the output file
     try:
-        print(f"Writing processed CSV to: {output_file}")
+        log(f"Writing processed CSV to: {output_file}")
         # Use na_rep='' to ensure NaN values are represented as empty strings in the CSV
-        df.to_csv(output_file, index=False, na_rep='')
-        print(f"Processed CSV saved to {output_file}")
+        with profiler.stage('write') as stage:
+            stage.rows = len(df)
+            df.to_csv(output_file, index=False, na_rep='')
+        log(f"Processed CSV saved to {output_file}")
     except Exception as e:
         print(f"Error writing to output file: {e}")
         raise
 
 
+def process_csv_file_chunked(input_file: str, output_file: str, chunksize: int,
+                             registry: IdRegistry = None, row_cache_file: str = None,
+                             profiler: StageProfiler = None) -> None:
+    """
+    Process the bervo_for_sheet.csv file in chunks, so memory use does not grow with file size.
+
+    The file is read twice. The first pass only reads the columns needed to
+    assign IDs and builds the ID mapping, numbering terms in file order exactly
+    as the in-memory mode does. The second pass transforms each chunk, applies
+    the mapping and appends it to the output. Only the mapping is kept between
+    chunks. All values are read as strings so that type inference cannot
+    differ from one chunk to the next.
+
+    Args:
+        input_file: Path to the input CSV file
+        output_file: Path to the output CSV file
+        chunksize: Number of rows per chunk
+        registry: Optional persistent registry to take numeric IDs from
+        row_cache_file: Optional path to a cache of transformed rows; note
+            that the cache itself is held in memory while the file is processed
+        profiler: Optional StageProfiler; each stage adds up over the chunks
+    """
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    log(f"Reading CSV file in chunks of {chunksize} rows: {input_file}")
+
+    try:
+        columns = pd.read_csv(input_file, nrows=0).columns.tolist()
+        log(f"Columns in CSV: {columns}")
+
+        # Store the name of the first column (IRI column) to remove it later
+        iri_column = columns[0] if len(columns) > 0 else 'IRI'
+        log(f"First column (assumed to be IRI column): {iri_column}")
+
+        id_col = find_id_column(columns)
+    except Exception as e:
+        print(f"Error reading CSV file: {e}")
+        return
+
+    # First pass: build the ID mapping from the columns it depends on
+    log("Assigning numeric IDs...")
+    id_columns = [col for col in ['IRI', id_col, 'oboInOwl:id', 'LABEL', 'Type'] if col in columns]
+    id_mapping = {}
+    counter = 1
+    skip_rows = 2
+    chunks = pd.read_csv(input_file, usecols=id_columns, dtype=str, chunksize=chunksize)
+    for chunk in profiled_chunks(chunks, profiler, 'read_ids'):
+        with profiler.stage('assign_ids') as stage:
+            stage.rows = len(chunk)
+            chunk[id_col] = rewrite_values(as_str(chunk[id_col]), IRI_REWRITE_RULES)
+            id_mapping, counter = build_id_mapping(chunk, id_mapping, counter, skip_rows, registry)
+        skip_rows = max(skip_rows - len(chunk), 0)
+    log(f"Assigned IDs to {len(id_mapping)} distinct terms")
+
+    # Second pass: transform each chunk and append it to the output
+    log(f"Writing processed CSV to: {output_file}")
+    rows = 0
+    skip_rows = 2
+    cache = RowCache(row_cache_file, rules_fingerprint(columns, id_col)) if row_cache_file else None
+    with open(output_file, 'w', newline='') as out:
+        chunks = pd.read_csv(input_file, dtype=str, chunksize=chunksize)
+        for i, chunk in enumerate(profiled_chunks(chunks, profiler, 'read')):
+            with profiler.stage('transform') as stage:
+                stage.rows = len(chunk)
+                chunk = transform_rows(chunk, id_col, cache)
+            with profiler.stage('apply_ids') as stage:
+                stage.rows = len(chunk)
+                chunk = apply_id_mapping(chunk, id_mapping, skip_rows)
+            with profiler.stage('finalize') as stage:
+                stage.rows = len(chunk)
+                chunk = finalize_columns(chunk, iri_column, id_col, verbose=False)
+            with profiler.stage('write') as stage:
+                stage.rows = len(chunk)
+                chunk.to_csv(out, index=False, header=(i == 0), na_rep='')
+            skip_rows = max(skip_rows - len(chunk), 0)
+            rows += len(chunk)
+    if cache is not None:
+        cache.save()
+    log(f"Processed CSV with {rows} rows saved to {output_file}")
+
+
 def main() -> None:
     """
     Main function to handle command-line arguments and execute the processing.
@@ -379,9 +711,30 @@ def main() -> None:
                         help='Path for the output processed CSV file (default: ../ontology/bervo_for_sheet_processed.csv)')
     parser.add_argument('--verbose', action='store_true',
                         help='Enable verbose output')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Stream the file in chunks of this many rows to bound memory use (default: read the whole file)')
+    parser.add_argument('--id-registry', default=None,
+                        help='Path to a persistent SQLite ID registry; existing terms keep their IDs and only new terms are allocated (default: number terms from 1 on every run)')
+    parser.add_argument('--id-ranges', default=None,
+                        help='ID ranges file to allocate new IDs from (default: bervo-idranges.owl next to the registry)')
+    parser.add_argument('--released-obo', default=None,
+                        help='Released ontology, e.g. bervo.obo, whose term numbers the registry never hands out (default: none)')
+    parser.add_argument('--id-range-owner', default='ONTOLOGY-CREATOR',
+                        help='Owner of the ID range to allocate from, as given in the ID ranges file (default: ONTOLOGY-CREATOR)')
+    parser.add_argument('--row-cache', default=None,
+                        help='Path to a cache of transformed rows; only rows changed since the last run are transformed again (default: no cache)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Measure the time, rows and memory of each stage; prints a summary table instead of the progress messages')
+    parser.add_argument('--metrics', default=None,
+                        help='Path of the JSON metrics file written with --profile (default: the output path with .metrics.json appended)')
 
     args = parser.parse_args()
 
+    global SHOW_PROGRESS
+    profiler = StageProfiler(enabled=args.profile, name='process_ecosim_csv')
+    if args.profile:
+        SHOW_PROGRESS = False
+
     # Get absolute paths
     input_file = os.path.abspath(args.input)
     output_file = os.path.abspath(args.output)
@@ -402,7 +755,28 @@ def main() -> None:
             print(f"Creating output directory: {output_dir}")
         os.makedirs(output_dir, exist_ok=True)
 
-    process_csv_file(input_file, output_file)
+    row_cache_file = os.path.abspath(args.row_cache) if args.row_cache else None
+
+    if args.id_registry is None:
+        process_csv_file(input_file, output_file, args.chunksize, row_cache_file=row_cache_file,
+                         profiler=profiler)
+    else:
+        registry_file = os.path.abspath(args.id_registry)
+        id_ranges_file = args.id_ranges or os.path.join(os.path.dirname(registry_file), 'bervo-idranges.owl')
+        with IdRegistry.from_id_ranges(registry_file, id_ranges_file, args.id_range_owner) as registry:
+            if args.released_obo:
+                reserved = registry.reserve_released(args.released_obo)
+                if args.verbose:
+                    print(f"Reserved {reserved} new numbers of released terms from {args.released_obo}")
+            if args.verbose:
+                print(f"Using ID registry {registry_file} with {len(registry)} terms")
+            process_csv_file(input_file, output_file, args.chunksize, registry, row_cache_file, profiler)
+
+    if args.profile:
+        metrics_file = args.metrics or f"{output_file}.metrics.json"
+        profiler.write_json(metrics_file)
+        print(profiler.summary())
+        print(f"Metrics written to {metrics_file}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+"""
+On-disk cache of processed sheet rows.
+
+Each input row is keyed on a 64-bit hash of its values. The cache stores the
+rewritten columns of every row it has seen, together with a fingerprint of
+the transformation rules and the column layout it was filled with; when the
+fingerprint changes, every cached row is dropped. Rows that are unchanged
+since the last run can then be served from the cache, and only new or edited
+rows have to be transformed again.
+
+The cache is a pickled DataFrame indexed by row hash, so it is loaded and
+joined against the input in a few vectorized operations. It is a local build
+artifact and should not be shared or loaded from untrusted sources.
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """
+    Compute a stable 64-bit hash of every row of a DataFrame.
+
+    Args:
+        df: DataFrame to hash
+
+    Returns:
+        Array of 64-bit hashes, one per row
+    """
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+class RowCache:
+    """
+    Cache of transformed rows, keyed on input row hashes.
+
+    Args:
+        path: Path to the cache file, created when the cache is saved
+        fingerprint: Fingerprint of the rules and columns the rows are
+            transformed with; cached rows with another fingerprint are evicted
+    """
+
+    def __init__(self, path: str, fingerprint: str):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.rows = pd.DataFrame(index=pd.Index([], dtype='uint64'))
+        self.added = []
+        self.seen = []
+
+        if os.path.exists(path):
+            rows = pd.read_pickle(path)
+            if rows.attrs.get('fingerprint') == fingerprint:
+                self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, hashes: np.ndarray) -> tuple:
+        """
+        Fetch cached rows and remember the hashes as seen in this run.
+
+        Args:
+            hashes: Row hashes from hash_rows
+
+        Returns:
+            Tuple of (boolean array marking the cached hashes,
+            DataFrame of the cached rows in the order of those hashes)
+        """
+        self.seen.append(hashes)
+        positions = self.rows.index.get_indexer(hashes)
+        hit = positions >= 0
+        return hit, self.rows.iloc[positions[hit]]
+
+    def put(self, hashes: np.ndarray, df: pd.DataFrame) -> None:
+        """
+        Add transformed rows; they are written out by save.
+
+        Args:
+            hashes: Hashes of the input rows the transformed rows came from
+            df: Transformed values to cache for each row, aligned with hashes
+        """
+        self.added.append(df.set_axis(pd.Index(hashes, dtype='uint64'), axis=0))
+
+    def save(self, prune: bool = True) -> None:
+        """
+        Write the cache to disk.
+
+        Args:
+            prune: Drop cached rows that were not requested since the cache was opened
+        """
+        rows = self.rows
+        if prune and self.seen:
+            rows = rows[rows.index.isin(np.concatenate(self.seen))]
+        rows = pd.concat([rows] + self.added) if self.added else rows
+        rows = rows[~rows.index.duplicated(keep='last')]
+        rows.attrs['fingerprint'] = self.fingerprint
+
+        # Write to a temporary file of its own first, so neither an interrupted run
+        # nor two runs sharing the cache can leave a truncated one
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                                 prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                rows.to_pickle(file)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
@@ -0,0 +1,176 @@
+"""
+Stage-level timing and memory measurements for the processing scripts.
+
+A StageProfiler records, for every named stage of a run, the number of times
+it ran, its wall and CPU time, the rows it processed and the peak memory
+allocated while it ran, as measured by tracemalloc. Stages are marked with a
+context manager or a decorator, and a stage that runs once per chunk adds up
+over its calls:
+
+    profiler = StageProfiler()
+    with profiler.stage('read') as stage:
+        df = pd.read_csv(input_file)
+        stage.rows = len(df)
+
+    @profiler.profile('write')
+    def write(df): ...
+
+    profiler.write_json('metrics.json')
+    print(profiler.summary())
+
+Stages may be nested; the peak allocation of an outer stage includes that of
+its inner stages. A disabled profiler does not start tracemalloc and costs
+next to nothing, so the scripts always mark their stages and only measure
+them when run with --profile. Tracing allocations slows allocation-heavy
+code down several times, so compare the wall times of profiled runs with
+each other rather than with normal runs.
+"""
+
+import functools
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+
+
+class Stage:
+    """Measurements of one named stage, summed over its calls."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.peak = 0
+
+    def as_dict(self) -> dict:
+        return {
+            'stage': self.name,
+            'calls': self.calls,
+            'wall_s': round(self.wall, 6),
+            'cpu_s': round(self.cpu, 6),
+            'rows': self.rows,
+            'rows_per_s': round(self.rows / self.wall, 1) if self.wall and self.rows else None,
+            'peak_alloc_mb': round(self.peak / MB, 3),
+        }
+
+
+class StageCall:
+    """Handle of a running stage, on which the stage's row count is set."""
+
+    __slots__ = ('rows',)
+
+    def __init__(self):
+        self.rows = 0
+
+
+class StageProfiler:
+    """
+    Collect per-stage wall time, CPU time, rows and peak allocation.
+
+    Args:
+        enabled: If False, stages are not measured and tracemalloc is not started
+        name: Name of the run, e.g. the script, written to the metrics file
+    """
+
+    def __init__(self, enabled: bool = True, name: str = None):
+        self.enabled = enabled
+        self.name = name
+        self.stages = {}
+        self.stack = []
+        self.max_traced = 0
+        self.started = time.time()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Measure the code in the with block as stage name.
+
+        Yields:
+            StageCall; set its rows attribute to the number of rows processed
+        """
+        call = StageCall()
+        if not self.enabled:
+            yield call
+            return
+
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        self._flush_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        # Open calls: [stage, traced memory at the start, highest traced memory since]
+        frame = [stage, base, base]
+        self.stack.append(frame)
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        try:
+            yield call
+        finally:
+            stage.wall += time.perf_counter() - start_wall
+            stage.cpu += time.process_time() - start_cpu
+            stage.calls += 1
+            stage.rows += call.rows
+            self._flush_peak()
+            self.stack.pop()
+            stage.peak = max(stage.peak, frame[2] - frame[1])
+
+    def _flush_peak(self):
+        """Record the traced peak since the last flush in every open stage call, and restart it."""
+        _, peak = tracemalloc.get_traced_memory()
+        for frame in self.stack:
+            frame[2] = max(frame[2], peak)
+        self.max_traced = max(self.max_traced, peak)
+        tracemalloc.reset_peak()
+
+    def profile(self, name: str = None):
+        """Decorate a function so each call is measured as stage name (default: the function name)."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or function.__name__):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def metrics(self) -> dict:
+        """Return the measurements as a JSON-serializable dictionary."""
+        if self.enabled:
+            self._flush_peak()
+        return {
+            'name': self.name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'pid': os.getpid(),
+            'wall_s': round(time.perf_counter() - self.start_wall, 6),
+            'cpu_s': round(time.process_time() - self.start_cpu, 6),
+            'peak_traced_mb': round(self.max_traced / MB, 3),
+            'stages': [stage.as_dict() for stage in self.stages.values()],
+        }
+
+    def write_json(self, path: str) -> None:
+        """Write the measurements to a JSON file."""
+        with open(path, 'w') as file:
+            json.dump(self.metrics(), file, indent=2)
+            file.write('\n')
+
+    def summary(self) -> str:
+        """Return the measurements as a plain-text table, one line per stage and a total."""
+        metrics = self.metrics()
+        width = max([len('total')] + [len(stage['stage']) for stage in metrics['stages']])
+        lines = [f"{'stage':<{width}} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'rows':>10} {'rows/s':>11} {'peak MB':>9}"]
+        for stage in metrics['stages']:
+            rate = f"{stage['rows_per_s']:,.0f}" if stage['rows_per_s'] else ''
+            lines.append(f"{stage['stage']:<{width}} {stage['calls']:>6} {stage['wall_s']:>9.3f} "
+                         f"{stage['cpu_s']:>9.3f} {stage['rows'] or '':>10} {rate:>11} "
+                         f"{stage['peak_alloc_mb']:>9.1f}")
+        lines.append(f"{'total':<{width}} {'':>6} {metrics['wall_s']:>9.3f} {metrics['cpu_s']:>9.3f} "
+                     f"{'':>10} {'':>11} {metrics['peak_traced_mb']:>9.1f}")
+        return '\n'.join(lines)
@@ -0,0 +1,438 @@
+"""
+Scaling benchmarks for the sheet and Fortran harvesting scripts.
+
+Synthetic inputs are generated in the shape of the real ones, at any number of
+rows or files:
+
+- sheet: bervo_for_sheet.csv as it reaches process_ecosim_csv.py, with the
+  robot export header (three oboInOwl:id columns, which pandas reads as
+  oboInOwl:id, oboInOwl:id.1 and oboInOwl:id.2), two ROBOT template rows, IRI
+  and prefixed IDs, a share of malformed full-IRI IDs, object and annotation
+  properties, and the pipe-separated facet columns of get-ecosim-subclasses
+- classes / sc: the two exports that merge_csv.py joins into the sheet
+- fortran: a tree of EcoSIM-style type modules, with allocatable arrays,
+  multi-variable declarations, & continuations and `description, [units]`
+  comments, 1,000 files per directory
+
+Each benchmark runs in a fresh interpreter, so the peak RSS it reports is its
+own, and records the wall time of the call, its throughput in rows or files
+per second and the peak RSS of the process. Results are written as JSON, and
+can be compared with a stored baseline: a benchmark regresses when its wall
+time or peak RSS exceeds the baseline by more than the given threshold, and
+its wall time by more than an absolute floor. Each benchmark is run as many
+times as it was for the baseline, keeping the fastest run.
+
+Usage:
+    python benchmark_pipeline.py --scales 1000 10000 100000 -o results.json
+    python benchmark_pipeline.py --baseline benchmark_baseline.json
+    python benchmark_pipeline.py --scales 1000 10000 --save-baseline benchmark_baseline.json
+"""
+import argparse
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+UTILS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(UTILS_DIR), 'src', 'scripts')
+
+# Header written by the robot export and merge in bervo.Makefile
+CLASSES_COLUMNS = ['IRI', 'oboInOwl:id', 'oboInOwl:id', 'oboInOwl:id', 'oboInOwl:inSubset', 'LABEL',
+                   'obo:IAO_0000115', 'rdfs:comment', 'oboInOwl:hasRelatedSynonym',
+                   'oboInOwl:hasExactSynonym', 'Type', 'oboInOwl:hasDbXref']
+FACET_COLUMNS = ['has_units', 'qualifiers', 'attributes', 'measured_ins', 'measurement_ofs', 'contexts', 'parents']
+SHEET_COLUMNS = CLASSES_COLUMNS + FACET_COLUMNS
+
+# ROBOT template rows under the header
+TEMPLATE_ROWS = [
+    ['ID', 'ID', 'A oio:hasRelatedSynonym', 'A oio:hasRelatedSynonym SPLIT=|', 'AI oio:inSubset SPLIT=|',
+     'LABEL', 'A IAO:0000115', 'A rdfs:comment', 'A oio:hasRelatedSynonym SPLIT=|',
+     'A oio:hasExactSynonym SPLIT=|', 'TYPE', 'AI oio:hasDbXref SPLIT=|', 'AI BERVO:has_unit SPLIT=|',
+     'AI BERVO:Qualifier SPLIT=|', 'AI BERVO:Attribute SPLIT=|', 'AI BERVO:measured_in SPLIT=|',
+     'AI BERVO:measurement_of SPLIT=|', 'AI BERVO:Context SPLIT=|', 'SC % SPLIT=|'],
+    ['', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', ''],
+]
+
+UNITS = ['MJ d-2 h-1', 'g d-2', 'g m-3', 'mol m-3', 'K', 'm', 'm3 m-3', 'kg m-2 s-1', '-', 'gC m-2 h-1']
+QUALIFIERS = ['Maximum', 'Average', 'Fraction', 'Total', 'Threshold', 'Primary']
+ATTRIBUTES = ['Activity', 'Carbon', 'Concentration', 'Content', 'Depth', 'Diffusivity', 'Drainage', 'Flux']
+MEASURED_INS = ['Soil', 'Leaf', 'Root', 'Canopy', 'Snow', 'Litter', 'Microbe']
+MEASUREMENT_OFS = ['Carbon', 'Nitrogen', 'Phosphorus', 'Water', 'Heat', 'Oxygen']
+CONTEXTS = ['soil', 'plant', 'atmosphere', 'surface water']
+PARENTS = ['biogeochemical flux type', 'plant trait type', 'soil property type', 'canopy flux type']
+WORDS = ['soil', 'leaf', 'root', 'carbon', 'nitrogen', 'water', 'heat', 'flux', 'layer', 'canopy',
+         'temperature', 'concentration', 'maximum', 'ecosystem', 'microbial', 'litter', 'snow', 'rate']
+
+FORTRAN_FILES_PER_DIRECTORY = 1000
+
+
+def pick(rng, values, most=3):
+    """Pick up to most distinct values, joined with | as in the sheet."""
+    return '|'.join(rng.sample(values, rng.randint(0, most)))
+
+
+def sheet_row(rng, number):
+    """Return one data row of the sheet, in SHEET_COLUMNS order."""
+    name = f"Var{number}"
+    kind = rng.random()
+    if kind < 0.01:
+        row_type, label = 'Object property', f"has {rng.choice(WORDS)} {number}"
+    elif kind < 0.015:
+        row_type, label = 'Annotation property', f"annotation {number}"
+    else:
+        row_type, label = 'Class', ' '.join(rng.sample(WORDS, 3)) + f" {number}"
+    # A share of the IDs come as full IRIs, as fix_malformed_ids expects
+    if rng.random() < 0.05:
+        term_id = f"http://purl.obolibrary.org/obo/ECOSIM_{name}"
+    else:
+        term_id = f"BERVO:{name}"
+    other_names = '|'.join(f"BERVO:{name}_{suffix}" for suffix in rng.sample(['col', 'vr', 'pft', 'snl'], 2))
+    return [
+        f"http://purl.obolibrary.org/obo/ECOSIM_{name}", term_id, f"BERVO:{name}_col", other_names,
+        '', label, f"The {label} of the ecosystem." if rng.random() < 0.6 else '',
+        'EcosimBGCFluxType.txt', f"{name}_col", '', row_type,
+        'PO:0025034' if rng.random() < 0.02 else '',
+        pick(rng, UNITS, 1), pick(rng, [f"ECOSIMCONCEPT:{value}" for value in QUALIFIERS]),
+        pick(rng, [f"ECOSIMCONCEPT:{value}" for value in ATTRIBUTES]),
+        pick(rng, [f"ECOSIMCONCEPT:{value}" for value in MEASURED_INS]),
+        pick(rng, [f"ECOSIMCONCEPT:{value}" for value in MEASUREMENT_OFS]),
+        pick(rng, CONTEXTS, 2), pick(rng, [f"BERVO:{value}" for value in PARENTS], 1),
+    ]
+
+
+def write_sheet(path, rows, seed=0):
+    """Write a synthetic bervo_for_sheet.csv with a header, two template rows and rows data rows."""
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(SHEET_COLUMNS)
+        writer.writerows(TEMPLATE_ROWS)
+        for number in range(rows):
+            writer.writerow(sheet_row(rng, number))
+
+
+def write_merge_inputs(classes_path, sc_path, rows, seed=0):
+    """
+    Write synthetic classes.csv and sc.csv exports of rows terms each.
+    sc.csv lists the terms in a different order and leaves out a tenth of them.
+    """
+    rng = random.Random(seed)
+    facets = []
+    with open(classes_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(CLASSES_COLUMNS)
+        for number in range(rows):
+            row = sheet_row(rng, number)
+            writer.writerow(row[:len(CLASSES_COLUMNS)])
+            if rng.random() < 0.9:
+                facets.append([row[0]] + row[len(CLASSES_COLUMNS):])
+    rng.shuffle(facets)
+    with open(sc_path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['class'] + FACET_COLUMNS)
+        writer.writerows(facets)
+
+
+def fortran_module(rng, number, declarations):
+    """Return the source of an EcoSIM-style type module with about declarations documented variables."""
+    name = f"Synthetic{number}DataType"
+    lines = [
+        f"module {name}",
+        "  use data_kind_mod, only : r8 => DAT_KIND_R8",
+        "  use GridConsts",
+        "  implicit none",
+        "  public",
+        "  save",
+        "  character(len=*), private, parameter :: mod_filename = &",
+        "  __FILE__",
+        "",
+    ]
+    count = 0
+    while count < declarations:
+        variable = f"{rng.choice(WORDS).capitalize()}{rng.choice(WORDS).capitalize()}_{count}"
+        description = ' '.join(rng.sample(WORDS, 4))
+        units = rng.choice(UNITS)
+        style = rng.random()
+        if style < 0.6:
+            dims = rng.choice(['(:)', '(:,:)', '(:,:,:)', '(:,:,:,:)'])
+            lines.append(f"  real(r8),target,allocatable ::  {variable}{dims}"
+                         f"{' ' * max(1, 40 - len(variable))}!{description}, [{units}]")
+            count += 1
+        elif style < 0.8:
+            lines.append(f"  integer, allocatable :: {variable}(:,:), &   !{description}, [-]")
+            lines.append(f"                          {variable}b(:,:)     !lower {description}, [-]")
+            count += 2
+        elif style < 0.9:
+            lines.append(f"  real(r8) :: {variable} = 0._r8   !{description}, [{units}]")
+            count += 1
+        else:
+            lines.append(f"  logical :: {variable}_flag   !{description}")
+            count += 1
+    lines += [
+        "",
+        "  contains",
+        f"  subroutine Init{name}",
+        "  implicit none",
+        "  end subroutine",
+        f"end module {name}",
+        "",
+    ]
+    return '\n'.join(lines)
+
+
+def write_fortran_tree(directory, files, declarations=20, seed=0):
+    """Write files type modules under directory, 1,000 per subdirectory."""
+    rng = random.Random(seed)
+    for number in range(files):
+        subdirectory = os.path.join(directory, f"mod{number // FORTRAN_FILES_PER_DIRECTORY:04d}")
+        if number % FORTRAN_FILES_PER_DIRECTORY == 0:
+            os.makedirs(subdirectory, exist_ok=True)
+        with open(os.path.join(subdirectory, f"Synthetic{number}DataType.F90"), 'w', encoding='utf-8') as file:
+            file.write(fortran_module(rng, number, declarations))
+
+
+def prepare(benchmark, scale, data_dir):
+    """
+    Generate the input of a benchmark at a scale, unless it is already in data_dir.
+
+    Returns:
+        Dictionary of input name -> path
+    """
+    kind = BENCHMARKS[benchmark]['input']
+    marker = os.path.join(data_dir, f"{kind}-{scale}.done")
+    if kind == 'sheet':
+        paths = {'sheet': os.path.join(data_dir, f"sheet-{scale}.csv")}
+        if not os.path.exists(marker):
+            write_sheet(paths['sheet'], scale)
+    elif kind == 'merge':
+        paths = {'classes': os.path.join(data_dir, f"classes-{scale}.csv"),
+                 'sc': os.path.join(data_dir, f"sc-{scale}.csv")}
+        if not os.path.exists(marker):
+            write_merge_inputs(paths['classes'], paths['sc'], scale)
+    else:
+        paths = {'tree': os.path.join(data_dir, f"fortran-{scale}")}
+        if not os.path.exists(marker):
+            write_fortran_tree(paths['tree'], scale)
+    open(marker, 'w').close()
+    return paths
+
+
+def run_process_csv(paths, output, chunksize=None):
+    from process_ecosim_csv import process_csv_file
+    process_csv_file(paths['sheet'], output, chunksize)
+
+
+def run_merge_csv(paths, output, streaming=False):
+    from merge_csv import merge_csv_files
+    merge_csv_files(paths['classes'], paths['sc'], output, streaming=streaming)
+
+
+def run_fortran2params(paths, output):
+    from fortran2params import traverse_and_extract_parameters
+    traverse_and_extract_parameters(paths['tree'])
+
+
+# Benchmark name -> input kind, unit of scale, module under test and function of (paths, output file)
+BENCHMARKS = {
+    'process_csv': {'input': 'sheet', 'unit': 'rows', 'module': 'process_ecosim_csv',
+                    'run': run_process_csv},
+    'process_csv_chunked': {'input': 'sheet', 'unit': 'rows', 'module': 'process_ecosim_csv',
+                            'run': lambda paths, output: run_process_csv(paths, output, chunksize=50000)},
+    'merge_csv': {'input': 'merge', 'unit': 'rows', 'module': 'merge_csv', 'run': run_merge_csv},
+    'merge_csv_streaming': {'input': 'merge', 'unit': 'rows', 'module': 'merge_csv',
+                            'run': lambda paths, output: run_merge_csv(paths, output, streaming=True)},
+    'fortran2params': {'input': 'fortran', 'unit': 'files', 'module': 'fortran2params',
+                       'run': run_fortran2params},
+}
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(benchmark, scale, data_dir):
+    """
+    Run one benchmark in this process and return its measurements.
+    Called in a fresh interpreter by measure, so the peak RSS is the benchmark's own.
+    """
+    sys.path[:0] = [SCRIPTS_DIR, UTILS_DIR]
+    paths = prepare(benchmark, scale, data_dir)
+    output = os.path.join(data_dir, f"{benchmark}-{scale}.out")
+    spec = BENCHMARKS[benchmark]
+    # Import the module before timing, and keep its progress prints out of the results
+    importlib.import_module(spec['module'])
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec['run'](paths, output)
+    wall = time.perf_counter() - start
+    if os.path.isfile(output):
+        os.remove(output)
+    return {
+        'benchmark': benchmark,
+        'scale': scale,
+        'unit': spec['unit'],
+        'wall_s': round(wall, 4),
+        'throughput': round(scale / wall, 1) if wall else None,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'rss_before_mb': round(rss_before, 1),
+    }
+
+
+def measure(benchmark, scale, data_dir, repeat=1):
+    """Run a benchmark repeat times, each in a fresh interpreter, and keep the fastest run."""
+    runs = []
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-case', benchmark, str(scale), data_dir],
+            check=True, capture_output=True, text=True)
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    best = min(runs, key=lambda run: run['wall_s'])
+    best['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    best['repeat'] = repeat
+    return best
+
+
+def baseline_repeat(baseline):
+    """Return the number of runs per benchmark the baseline was recorded with."""
+    return max((result.get('repeat', 1) for result in baseline['results']), default=1)
+
+
+def compare(results, baseline, time_threshold, rss_threshold, time_floor=0.0):
+    """
+    Compare results with a baseline.
+
+    Args:
+        results: List of result dictionaries
+        baseline: Baseline results file contents
+        time_threshold: Allowed relative increase of wall time, e.g. 0.25 for 25%
+        rss_threshold: Allowed relative increase of peak RSS
+        time_floor: Wall time increases of at most this many seconds are never
+            regressions, as short benchmarks vary by more than the relative threshold
+
+    Returns:
+        List of (result, baseline result or None, list of regression messages)
+    """
+    previous = {(result['benchmark'], result['scale']): result for result in baseline['results']}
+    comparisons = []
+    for result in results:
+        base = previous.get((result['benchmark'], result['scale']))
+        regressions = []
+        if base is not None:
+            if (result['wall_s'] > base['wall_s'] * (1 + time_threshold)
+                    and result['wall_s'] - base['wall_s'] > time_floor):
+                regressions.append(f"wall time {result['wall_s']:.3f} s > {base['wall_s']:.3f} s "
+                                   f"+{time_threshold:.0%}")
+            if result['peak_rss_mb'] > base['peak_rss_mb'] * (1 + rss_threshold):
+                regressions.append(f"peak RSS {result['peak_rss_mb']:.0f} MB > {base['peak_rss_mb']:.0f} MB "
+                                   f"+{rss_threshold:.0%}")
+        comparisons.append((result, base, regressions))
+    return comparisons
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the sheet and Fortran harvesting scripts on synthetic inputs.')
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='Benchmarks to run (default: all)')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1000, 10000],
+                        help='Numbers of rows or files to run each benchmark at (default: 1000 10000)')
+    parser.add_argument('--repeat', type=int, default=None,
+                        help='Runs per benchmark, keeping the fastest; must match the baseline when comparing '
+                             '(default: that of the baseline, or 1)')
+    parser.add_argument('--data-dir', help='Directory for the generated inputs, reused between runs (default: a temporary directory)')
+    parser.add_argument('-o', '--output', help='Path to write the results JSON to')
+    parser.add_argument('--baseline', help='Baseline results JSON to compare with; exits 1 on regressions')
+    parser.add_argument('--save-baseline', help='Path to write the results as a new baseline')
+    parser.add_argument('--time-threshold', type=float, default=0.25,
+                        help='Allowed relative increase of wall time over the baseline (default: 0.25)')
+    parser.add_argument('--time-floor', type=float, default=0.05,
+                        help='Wall time increases of at most this many seconds are never regressions (default: 0.05)')
+    parser.add_argument('--rss-threshold', type=float, default=0.25,
+                        help='Allowed relative increase of peak RSS over the baseline (default: 0.25)')
+    parser.add_argument('--run-case', nargs=3, metavar=('BENCHMARK', 'SCALE', 'DATA_DIR'), help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.run_case:
+        benchmark, scale, data_dir = args.run_case
+        print(json.dumps(run_case(benchmark, int(scale), data_dir)))
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        # Best-of-n timings are only comparable with the same n
+        if args.repeat is None:
+            args.repeat = baseline_repeat(baseline)
+        elif args.repeat != baseline_repeat(baseline):
+            parser.error(f"--repeat {args.repeat} differs from the {baseline_repeat(baseline)} runs per benchmark "
+                         f"of {args.baseline}")
+    if args.repeat is None:
+        args.repeat = 1
+
+    temporary = None
+    if args.data_dir:
+        data_dir = args.data_dir
+        os.makedirs(data_dir, exist_ok=True)
+    else:
+        temporary = tempfile.TemporaryDirectory(prefix='bervo-bench-')
+        data_dir = temporary.name
+
+    results = []
+    try:
+        for benchmark in args.benchmarks:
+            for scale in args.scales:
+                result = measure(benchmark, scale, os.path.abspath(data_dir), args.repeat)
+                results.append(result)
+                print(f"{benchmark:<22} {scale:>9} {result['unit']:<5} {result['wall_s']:>9.3f} s "
+                      f"{result['throughput']:>12,.0f} {result['unit']}/s {result['peak_rss_mb']:>8.1f} MB")
+    finally:
+        if temporary is not None:
+            temporary.cleanup()
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+                file.write('\n')
+
+    if baseline is not None:
+        failed = False
+        print(f"\nCompared with {args.baseline} ({baseline.get('created')}, {baseline.get('platform')}):")
+        for result, base, regressions in compare(results, baseline, args.time_threshold, args.rss_threshold,
+                                                 args.time_floor):
+            if base is None:
+                status = 'no baseline'
+            else:
+                change = result['wall_s'] / base['wall_s'] - 1 if base['wall_s'] else 0.0
+                status = f"{change:+.0%} time, {result['peak_rss_mb'] - base['peak_rss_mb']:+.1f} MB"
+            if regressions:
+                failed = True
+                status += ' REGRESSION: ' + '; '.join(regressions)
+            print(f"{result['benchmark']:<22} {result['scale']:>9} {status}")
+        if failed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
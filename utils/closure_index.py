@@ -0,0 +1,352 @@
+"""
+Transitive closure index of the BERVO is_a hierarchy.
+
+Terms are numbered in depth-first order from the roots of the hierarchy, so the
+descendants of a term in the DFS spanning tree have consecutive numbers. Each
+term is labelled with the intervals of numbers of all its descendants: one
+interval for its own subtree, plus the intervals of descendants it reaches
+through a second parent. In a tree, which is what BERVO currently is, every
+term has exactly one interval.
+
+With these labels:
+- "is X a descendant of Y" is an interval test, O(1) for a tree
+- "all descendants of Y" is a slice of the terms in DFS order, O(k)
+- the lowest common ancestor walks up from the deeper term, O(depth)
+
+The index is written as JSON next to the release files (bervo-closure.json) by
+the release target of the top-level Makefile.
+
+Usage:
+    from closure_index import ClosureIndex
+
+    closure = ClosureIndex.load('bervo-closure.json')
+    closure.is_descendant('bervo:BERVO_0000001', 'bervo:BERVO_9000000')
+    mask = closure.descendant_mask(record_term_ids, 'bervo:BERVO_9000000')
+
+    python closure_index.py bervo.obo -o bervo-closure.json
+    python closure_index.py --check
+"""
+import argparse
+import bisect
+import json
+import time
+
+import numpy as np
+
+from obo_loader import load_obo
+
+# Bump when the layout of the serialized index changes
+INDEX_FORMAT = 1
+
+
+def merge_intervals(intervals):
+    """Merge overlapping or adjacent [start, end] intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class ClosureIndex:
+    """
+    Interval-labelled is_a closure.
+
+    Attributes:
+        ids: Term ids in DFS order; the position of a term is its DFS number
+        parents: DFS numbers of the direct parents of each term
+        depth: Length of the longest is_a path from a root to each term
+        intervals: For each term, sorted [start, end] ranges of DFS numbers of
+            the term and all its descendants
+        data_version: data-version of the OBO file the index was built from
+    """
+
+    def __init__(self, ids, parents, depth, intervals, data_version=None):
+        self.ids = ids
+        self.parents = parents
+        self.depth = depth
+        self.intervals = intervals
+        self.data_version = data_version
+        self.number = {term_id: position for position, term_id in enumerate(ids)}
+        # Intervals can merge into one range in a DAG too, so test the parents
+        self.tree = all(len(term_parents) <= 1 for term_parents in parents)
+
+    @classmethod
+    def from_ontology(cls, ontology):
+        """
+        Build the index from an Ontology loaded by obo_loader.
+
+        Args:
+            ontology: Ontology
+
+        Returns:
+            ClosureIndex
+        """
+        n = len(ontology.terms)
+        parent_lists = [list(ontology.is_a_parent[ontology.is_a_start[i]:ontology.is_a_start[i + 1]])
+                        for i in range(n)]
+        child_lists = [[] for _ in range(n)]
+        for child, parents in enumerate(parent_lists):
+            for parent in parents:
+                child_lists[parent].append(child)
+
+        # Iterative DFS from the roots, in file order, numbering terms on entry
+        order = []
+        number = [-1] * n
+        end = [0] * n
+        roots = [i for i in range(n) if not parent_lists[i]]
+        # Terms on an is_a cycle have no root; start from them after the roots
+        for root in roots + list(range(n)):
+            if number[root] >= 0:
+                continue
+            number[root] = len(order)
+            order.append(root)
+            stack = [(root, iter(child_lists[root]))]
+            while stack:
+                term, children = stack[-1]
+                for child in children:
+                    if number[child] < 0:
+                        number[child] = len(order)
+                        order.append(child)
+                        stack.append((child, iter(child_lists[child])))
+                        break
+                else:
+                    end[term] = len(order) - 1
+                    stack.pop()
+
+        # Topological order, parents before children (Kahn); terms on an is_a
+        # cycle, which a valid release does not have, are appended at the end
+        pending = [len(parents) for parents in parent_lists]
+        topological = [i for i in range(n) if not pending[i]]
+        for term in topological:
+            for child in child_lists[term]:
+                pending[child] -= 1
+                if not pending[child]:
+                    topological.append(child)
+        if len(topological) < n:
+            placed = set(topological)
+            topological += [i for i in range(n) if i not in placed]
+
+        # A term's intervals cover its own subtree and every child's intervals,
+        # which adds the descendants reached through a second parent
+        intervals = [None] * n
+        for term in reversed(topological):
+            ranges = [[number[term], end[term]]]
+            ranges += [interval for child in child_lists[term] if intervals[child] for interval in intervals[child]]
+            intervals[term] = merge_intervals(ranges)
+
+        depth = [0] * n
+        for term in topological:
+            depth[term] = max((depth[parent] + 1 for parent in parent_lists[term]), default=0)
+
+        return cls(
+            ids=[ontology.terms[term].id for term in order],
+            parents=[[number[parent] for parent in parent_lists[term]] for term in order],
+            depth=[depth[term] for term in order],
+            intervals=[intervals[term] for term in order],
+            data_version=ontology.data_version,
+        )
+
+    @classmethod
+    def load(cls, index_file):
+        """Load an index written by save."""
+        with open(index_file, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get('format') != INDEX_FORMAT:
+            raise ValueError(f"{index_file} has index format {data.get('format')}, expected {INDEX_FORMAT}")
+        return cls(data['ids'], data['parents'], data['depth'], data['intervals'], data.get('data_version'))
+
+    def save(self, index_file):
+        """Write the index as JSON."""
+        with open(index_file, 'w', encoding='utf-8') as file:
+            json.dump({
+                'format': INDEX_FORMAT,
+                'data_version': self.data_version,
+                'ids': self.ids,
+                'parents': self.parents,
+                'depth': self.depth,
+                'intervals': self.intervals,
+            }, file, separators=(',', ':'))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, term_id):
+        return term_id in self.number
+
+    def is_descendant(self, term_id, ancestor_id, reflexive=True):
+        """
+        Return whether a term is a (transitive) is_a descendant of another.
+
+        Args:
+            term_id: Term to test
+            ancestor_id: Candidate ancestor
+            reflexive: Whether a term counts as its own descendant
+
+        Returns:
+            bool
+        """
+        position = self.number[term_id]
+        ancestor = self.number[ancestor_id]
+        if position == ancestor:
+            return reflexive
+        ranges = self.intervals[ancestor]
+        if len(ranges) == 1:
+            return ranges[0][0] <= position <= ranges[0][1]
+        i = bisect.bisect_right(ranges, [position, float('inf')]) - 1
+        return i >= 0 and ranges[i][0] <= position <= ranges[i][1]
+
+    def descendants(self, ancestor_id, reflexive=False):
+        """Return the ids of all descendants of a term, in DFS order."""
+        ancestor = self.number[ancestor_id]
+        result = [term_id for start, end in self.intervals[ancestor] for term_id in self.ids[start:end + 1]]
+        if not reflexive:
+            result.remove(ancestor_id)
+        return result
+
+    def ancestors(self, term_id, reflexive=False):
+        """Return the ids of all ancestors of a term, nearest first."""
+        start = self.number[term_id]
+        seen = {start}
+        frontier = [start]
+        result = [start] if reflexive else []
+        while frontier:
+            next_frontier = []
+            for position in frontier:
+                for parent in self.parents[position]:
+                    if parent not in seen:
+                        seen.add(parent)
+                        result.append(parent)
+                        next_frontier.append(parent)
+            frontier = next_frontier
+        return [self.ids[position] for position in result]
+
+    def lca(self, term_id, other_id):
+        """
+        Return the lowest common ancestor of two terms (a term is its own ancestor),
+        or None if they are in different hierarchies. When several common ancestors
+        are equally low, which happens only with multiple parents, the deepest one
+        first in DFS order is returned.
+        """
+        if self.tree:
+            first, second = self.number[term_id], self.number[other_id]
+            while self.depth[first] > self.depth[second]:
+                first = self.parents[first][0]
+            while self.depth[second] > self.depth[first]:
+                second = self.parents[second][0]
+            while first != second:
+                if not self.parents[first] or not self.parents[second]:
+                    return None
+                first, second = self.parents[first][0], self.parents[second][0]
+            return self.ids[first]
+
+        common = set(self.ancestors(term_id, reflexive=True)) & set(self.ancestors(other_id, reflexive=True))
+        if not common:
+            return None
+        return min(common, key=lambda candidate: (-self.depth[self.number[candidate]], self.number[candidate]))
+
+    def descendant_mask(self, term_ids, ancestor_id, reflexive=True):
+        """
+        Test many terms at once, e.g. the BERVO ids of model output records.
+
+        Args:
+            term_ids: Sequence of term ids; ids that are not in the index never match
+            ancestor_id: Candidate ancestor
+            reflexive: Whether the ancestor itself matches
+
+        Returns:
+            NumPy boolean array aligned with term_ids
+        """
+        get = self.number.get
+        positions = np.fromiter((get(term_id, -1) for term_id in term_ids), dtype=np.int64)
+        mask = np.zeros(len(positions), dtype=bool)
+        for start, end in self.intervals[self.number[ancestor_id]]:
+            mask |= (positions >= start) & (positions <= end)
+        if not reflexive:
+            mask &= positions != self.number[ancestor_id]
+        return mask
+
+
+# Diamond R <- A, B <- C: C has two parents, and its intervals merge into one range
+CHECK_OBO = """format-version: 1.2
+
+[Term]
+id: X:R
+
+[Term]
+id: X:A
+is_a: X:R
+
+[Term]
+id: X:B
+is_a: X:R
+
+[Term]
+id: X:C
+is_a: X:A
+is_a: X:B
+"""
+
+# (method, arguments, expected result) on the CHECK_OBO index
+CHECK_CASES = [
+    ('is_descendant', ('X:C', 'X:B'), True),
+    ('is_descendant', ('X:C', 'X:A'), True),
+    ('is_descendant', ('X:A', 'X:B'), False),
+    ('lca', ('X:C', 'X:B'), 'X:B'),
+    ('lca', ('X:C', 'X:A'), 'X:A'),
+    ('lca', ('X:A', 'X:B'), 'X:R'),
+    ('lca', ('X:C', 'X:C'), 'X:C'),
+]
+
+
+def check():
+    """Check the index of the CHECK_OBO diamond. Returns a list of failure messages, empty if all pass."""
+    import os
+    import tempfile
+
+    with tempfile.NamedTemporaryFile('w', suffix='.obo', delete=False) as file:
+        file.write(CHECK_OBO)
+    try:
+        closure = ClosureIndex.from_ontology(load_obo(file.name, use_cache=False))
+    finally:
+        os.unlink(file.name)
+    failures = []
+    if closure.tree:
+        failures.append('the diamond is indexed as a tree')
+    for method, arguments, expected in CHECK_CASES:
+        found = getattr(closure, method)(*arguments)
+        if found != expected:
+            failures.append(f"{method}{arguments}: expected {expected!r}, found {found!r}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the is_a closure index of an OBO file.')
+    parser.add_argument('obo', nargs='?', help='Path to the OBO file, e.g. bervo.obo')
+    parser.add_argument('--check', action='store_true',
+                        help='Check the index of a small diamond-shaped hierarchy instead')
+    parser.add_argument('-o', '--output', default='bervo-closure.json',
+                        help='Path to the index file (default: bervo-closure.json)')
+
+    args = parser.parse_args()
+    if args.check:
+        failures = check()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"{len(failures)} failures in {len(CHECK_CASES)} checks")
+        raise SystemExit(1 if failures else 0)
+    if args.obo is None:
+        parser.error('the obo argument is required')
+
+    start = time.perf_counter()
+    closure = ClosureIndex.from_ontology(load_obo(args.obo))
+    closure.save(args.output)
+    shape = 'tree' if closure.tree else 'DAG'
+    print(f"Indexed {len(closure)} terms ({shape}, depth {max(closure.depth, default=0)}) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms; written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Bitmap index over the facets of BERVO terms.
+
+Terms in bervo.obo are annotated with facet values through five properties,
+which come from the attributes, contexts, qualifiers, measured_ins and
+measurement_ofs columns of the sheet:
+
+    property_value: bervo:BERVO_Attribute bervo:BERVO_8000023     (Concentration)
+    property_value: bervo:BERVO_measured_in bervo:BERVO_8000062   (Soil)
+
+For every facet value, the index keeps a bitmap of the terms that carry it, as
+a Python integer whose bit i is set for the i-th term. A conjunctive query such
+as "measurement_of = Carbon AND qualifier = Maximum AND context = soil" is then
+the AND of three integers, and counting the terms of a facet value within a
+selection is a population count. With about 2,000 terms a bitmap is at most
+250 bytes, so plain integers are smaller and faster than a compressed format.
+
+Facet values can be given by id or by label, case-insensitively.
+
+Usage:
+    from facet_index import FacetIndex
+
+    facets = FacetIndex.from_obo('bervo.obo')
+    facets.query(measurement_of='Carbon', qualifier='Maximum', context='soil')
+    facets.counts('measured_in', attribute='Concentration')
+"""
+import argparse
+
+from obo_loader import load_obo
+
+# Facet name -> annotation property
+FACET_PROPERTIES = {
+    'attribute': 'bervo:BERVO_Attribute',
+    'context': 'bervo:BERVO_Context',
+    'qualifier': 'bervo:BERVO_Qualifier',
+    'measured_in': 'bervo:BERVO_measured_in',
+    'measurement_of': 'bervo:BERVO_measurement_of',
+}
+
+
+def bit_positions(bitmap):
+    """Yield the positions of the set bits of a bitmap, lowest first."""
+    while bitmap:
+        low = bitmap & -bitmap
+        yield low.bit_length() - 1
+        bitmap ^= low
+
+
+class FacetIndex:
+    """
+    Bitmaps of terms per facet value.
+
+    Attributes:
+        ids: Term ids; bit i of a bitmap stands for ids[i]
+        bitmaps: Facet name -> facet value id -> bitmap of terms
+        value_labels: Facet value id -> label
+    """
+
+    def __init__(self, ontology):
+        self.ids = []
+        self.bitmaps = {facet: {} for facet in FACET_PROPERTIES}
+        self.value_labels = {}
+        self.value_ids = {}
+        properties = {prop: facet for facet, prop in FACET_PROPERTIES.items()}
+
+        for term in ontology:
+            if term.name is None:
+                continue
+            bit = 1 << len(self.ids)
+            self.ids.append(term.id)
+            for prop, value in ontology.property_values(term.id):
+                facet = properties.get(prop)
+                if facet is None:
+                    continue
+                values = self.bitmaps[facet]
+                values[value] = values.get(value, 0) | bit
+                if value not in self.value_labels:
+                    target = ontology.get(value)
+                    label = target.name if target is not None and target.name else value
+                    self.value_labels[value] = label
+                    self.value_ids.setdefault(label.lower(), value)
+                    self.value_ids.setdefault(value.lower(), value)
+        self.all = (1 << len(self.ids)) - 1
+
+    @classmethod
+    def from_obo(cls, obo_file):
+        """Build the index from an OBO file, loading it through the obo_loader cache."""
+        return cls(load_obo(obo_file))
+
+    def value_id(self, value):
+        """Return the id of a facet value given by id or label, or None if it is unknown."""
+        return self.value_ids.get(value.lower())
+
+    def bitmap(self, **selection):
+        """
+        Return the bitmap of the terms matching all of the selected facet values.
+
+        Args:
+            selection: Facet name -> value id or label, or a list of them (any of which matches)
+
+        Returns:
+            int bitmap
+        """
+        result = self.all
+        for facet, values in selection.items():
+            if facet not in self.bitmaps:
+                raise ValueError(f"Unknown facet: {facet}. Choose from {', '.join(FACET_PROPERTIES)}")
+            if isinstance(values, str):
+                values = [values]
+            union = 0
+            for value in values:
+                union |= self.bitmaps[facet].get(self.value_id(value), 0)
+            result &= union
+            if not result:
+                break
+        return result
+
+    def query(self, **selection):
+        """Return the ids of the terms matching all of the selected facet values."""
+        return [self.ids[position] for position in bit_positions(self.bitmap(**selection))]
+
+    def count(self, **selection):
+        """Return the number of terms matching all of the selected facet values."""
+        return self.bitmap(**selection).bit_count()
+
+    def counts(self, facet, **selection):
+        """
+        Count the terms of each value of a facet within a selection.
+
+        Args:
+            facet: Facet to aggregate, e.g. 'measured_in'
+            selection: Facet values that restrict the terms, as for query
+
+        Returns:
+            Dictionary of value label -> count, largest first, without zero counts
+        """
+        if facet not in self.bitmaps:
+            raise ValueError(f"Unknown facet: {facet}. Choose from {', '.join(FACET_PROPERTIES)}")
+        within = self.bitmap(**selection)
+        counts = []
+        for value, bitmap in self.bitmaps[facet].items():
+            count = (bitmap & within).bit_count()
+            if count:
+                counts.append((self.value_labels[value], count))
+        counts.sort(key=lambda item: (-item[1], item[0]))
+        return dict(counts)
+
+    def all_counts(self, **selection):
+        """Count the terms of every value of every facet within a selection, for a browsing UI."""
+        return {facet: self.counts(facet, **selection) for facet in self.bitmaps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query BERVO terms by facet values.')
+    parser.add_argument('obo', help='Path to bervo.obo')
+    for facet in FACET_PROPERTIES:
+        parser.add_argument(f"--{facet.replace('_', '-')}", dest=facet, action='append',
+                            help=f'Value of the {facet} facet, by id or label (repeat for any of several)')
+    parser.add_argument('--counts', action='store_true', help='Print counts by facet value instead of terms')
+
+    args = parser.parse_args()
+
+    ontology = load_obo(args.obo)
+    facets = FacetIndex(ontology)
+    selection = {facet: getattr(args, facet) for facet in FACET_PROPERTIES if getattr(args, facet)}
+
+    if args.counts:
+        for facet, counts in facets.all_counts(**selection).items():
+            print(f"{facet}: " + ', '.join(f"{label} ({count})" for label, count in counts.items()))
+        return
+
+    for term_id in facets.query(**selection):
+        print(f"{term_id}\t{ontology[term_id].name}")
+
+
+if __name__ == "__main__":
+    main()
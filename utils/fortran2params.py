@@ -4,43 +4,172 @@ Convert bervo fortran code to parameters.
 This code was authored by ChatGPT: https://chat.openai.com/share/e6e723ec-ea87-44ac-b728-c919a568325a
 
 You can use the code by setting directory_path to the path of your Fortran directory and then calling the traverse_and_extract_parameters function. The function will return a list of dictionaries containing the extracted parameters, their descriptions, and units.
+
+For large source trees, run it as a script instead: files are parsed in a process pool,
+results are cached per file (keyed on path, modification time and size) so a re-scan only
+parses the files that changed, and the parameters are streamed out as JSON lines.
 """
+import argparse
+import json
 import os
-import re
+import pickle
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from fortran_tokenizer import iter_declarations
+
+# Bump when the extracted records change, so cached results are not reused
+CACHE_VERSION = 4
 
 def extract_parameters_from_file(file_path):
     """
     Extract parameters, descriptions, and units from a Fortran file.
+    Every declared variable of any kind is considered, including ones on continuation lines
+    and in multi-variable declarations; those documented with a `description, [units]` comment are kept.
     """
-    with open(file_path, 'r') as file:
-        content = file.read()
-    
-    # Regular expression pattern to capture potential parameter declarations
-    pattern = r"\breal\(r8\)\s*,\s*target\s*,\s*allocatable\s*::\s*(\w+)\s*(?:\((.*?)\))?\s*!\s*(.*?)\s*,\s*\[(.*?)\]"
-    matches = re.findall(pattern, content, re.IGNORECASE)
-    
-    # Extract parameters, descriptions, and units
-    extracted_data = [{"variable_name": match[0].strip(),
-                       "description": match[2].strip(),
-                       "units": match[3].strip()}
-                      for match in matches]
-    
+    extracted_data = [{"variable_name": declaration.name,
+                       "description": declaration.description,
+                       "units": declaration.units,
+                       "kind": declaration.kind,
+                       "dimensions": declaration.dimensions,
+                       "line": declaration.line}
+                      for declaration in iter_declarations(file_path)
+                      if declaration.units]
+
     return extracted_data
 
-def traverse_and_extract_parameters(directory_path):
+def find_fortran_files(directory_path):
     """
-    Traverse through a directory and extract parameters from all Fortran files.
+    Yield the path, modification time and size of every Fortran file in a directory tree, in a stable order.
     """
-    extracted_params = []
-    
     for root, dirs, files in os.walk(directory_path):
-        for file in files:
+        dirs.sort()
+        for file in sorted(files):
             if file.endswith('.F90'):
                 file_path = os.path.join(root, file)
-                extracted_params.extend(extract_parameters_from_file(file_path))
-                
+                stat = os.stat(file_path)
+                yield file_path, stat.st_mtime_ns, stat.st_size
+
+def load_cache(cache_file):
+    """
+    Load the per-file extraction cache, or return an empty one if it is missing or outdated.
+    """
+    if not cache_file or not os.path.exists(cache_file):
+        return {}
+    with open(cache_file, 'rb') as file:
+        cache = pickle.load(file)
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache['files']
+
+def save_cache(cache_file, files):
+    """
+    Write the per-file extraction cache, going through a temporary file of its own in the same directory,
+    so neither an interrupted run nor two runs sharing the cache can truncate it.
+    The cache is a local pickle file and should not be loaded from untrusted sources.
+    """
+    descriptor, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_file)),
+                                             prefix=os.path.basename(cache_file) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump({'version': CACHE_VERSION, 'files': files}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except BaseException:
+        os.unlink(temp_file)
+        raise
+
+def iter_extracted_parameters(directory_path, workers=1, cache_file=None):
+    """
+    Extract parameters from all Fortran files in a directory tree, one file at a time.
+
+    Files whose path, modification time and size match the cache are not parsed again;
+    the others are parsed in a pool of worker processes. The cache is updated once the
+    whole tree has been read, and then only keeps the files that were found in it; it is
+    not rewritten when nothing changed.
+
+    Args:
+        directory_path: Path to the Fortran source tree
+        workers: Number of worker processes; 1 parses the files in this process
+        cache_file: Path to the cache file, or None to parse every file
+
+    Yields:
+        Tuples of (file path, list of extracted parameters), in a stable file order
+    """
+    cache = load_cache(cache_file)
+    files = list(find_fortran_files(directory_path))
+    stale = [file_path for file_path, mtime, size in files
+             if cache.get(file_path, {}).get('key') != [mtime, size]]
+
+    pool = None
+    if workers > 1 and len(stale) > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(stale) // (workers * 4))
+        parsed = pool.map(extract_parameters_from_file, stale, chunksize=chunksize)
+    else:
+        parsed = map(extract_parameters_from_file, stale)
+
+    updated = {}
+    try:
+        # Results come back in the order of stale, which follows the order of files
+        for file_path, mtime, size in files:
+            entry = cache.get(file_path)
+            if entry is None or entry['key'] != [mtime, size]:
+                entry = {'key': [mtime, size], 'parameters': next(parsed)}
+            updated[file_path] = entry
+            yield file_path, entry['parameters']
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if cache_file and (stale or len(updated) != len(cache)):
+        save_cache(cache_file, updated)
+
+def traverse_and_extract_parameters(directory_path, workers=1, cache_file=None):
+    """
+    Traverse through a directory and extract parameters from all Fortran files.
+    """
+    extracted_params = []
+
+    for file_path, params in iter_extracted_parameters(directory_path, workers, cache_file):
+        extracted_params.extend(params)
+
     return extracted_params
 
+def write_jsonl(directory_path, output, workers=1, cache_file=None):
+    """
+    Stream the parameters of a Fortran tree as JSON lines, one parameter per line with its source file.
+    Returns the number of files and parameters written.
+    """
+    n_files = n_params = 0
+    for file_path, params in iter_extracted_parameters(directory_path, workers, cache_file):
+        n_files += 1
+        for param in params:
+            output.write(json.dumps({**param, "file": file_path}) + "\n")
+            n_params += 1
+    return n_files, n_params
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract parameters, descriptions and units from Fortran sources as JSON lines.')
+    parser.add_argument('directory', help='Path to the Fortran source directory')
+    parser.add_argument('-o', '--output', help='Path to the output JSONL file (default: standard output)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--cache', help='Path to a cache file; only files changed since the last run are parsed again')
+
+    args = parser.parse_args()
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            n_files, n_params = write_jsonl(args.directory, output, args.workers, args.cache)
+    else:
+        n_files, n_params = write_jsonl(args.directory, sys.stdout, args.workers, args.cache)
+
+    print(f"Extracted {n_params} parameters from {n_files} files", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
+
 # Usage:
 # directory_path = "path_to_your_fortran_directory"
 # extracted_parameters = traverse_and_extract_parameters(directory_path)
@@ -0,0 +1,341 @@
+"""
+Line-oriented tokenizer for Fortran variable declarations.
+
+The file is memory-mapped and read one line at a time, so the cost of a scan is
+linear in the size of the file and a large source file is never held in memory
+as one string. Declaration statements are recognised by their type specifier
+and the `::` separator, and may span several `&` continuation lines. Every
+variable of a statement is yielded as a Declaration, together with the trailing
+comment of the line it appears on, split the EcoSIM way into a description and
+the units in square brackets:
+
+    real(r8),target,allocatable :: TKS(:,:,:)   !mean annual soil temperature, [K]
+    integer, allocatable :: NU(:,:), &          !upper soil layer number, [-]
+                            NL(:,:)             !lowest soil layer number, [-]
+
+A variable whose dimensions continue onto the next lines takes the comment of
+the line it ends on when its first line has no units; otherwise a variable
+whose line has no comment has no description or units.
+
+Usage:
+    python fortran_tokenizer.py EcoSIMCtrlMod.F90     # print the declarations of files
+    python fortran_tokenizer.py --check               # check the declaration forms in CHECK_CASES
+"""
+import bisect
+import mmap
+import re
+from typing import Iterator, NamedTuple
+
+# Type specifier at the start of the part of a declaration before `::`, with an optional
+# kind or length selector, followed by attributes or by nothing
+TYPE_SPEC_PATTERN = re.compile(
+    r"\s*(real|integer|logical|complex|character|double\s+precision|double\s+complex|type|class)\s*"
+    r"(\((?:[^()]|\([^()]*\))*\)|\*\s*\d+)?\s*(?=,|$)",
+    re.IGNORECASE
+)
+
+# Variable name with optional dimensions, before any initializer
+ENTITY_PATTERN = re.compile(r"\s*(\w+)\s*(?:\((.*?)\))?\s*(?:\*\s*\S+)?\s*(?:=.*)?$", re.DOTALL)
+
+# dimension(...) attribute, giving the dimensions of variables that do not declare their own
+DIMENSION_PATTERN = re.compile(r"\bdimension\s*\((.*)\)", re.IGNORECASE | re.DOTALL)
+
+# Characters that matter when splitting a list on its top-level commas
+SEPARATOR_PATTERN = re.compile(r"[,()\[\]'\"]")
+
+# Documenting comment: description, [units]
+COMMENT_PATTERN = re.compile(r"\s*(.*?)\s*,\s*\[(.*?)\]")
+
+
+class Declaration(NamedTuple):
+    """One declared variable."""
+    name: str
+    kind: str
+    dimensions: str
+    description: str
+    units: str
+    file: str
+    line: int
+
+
+def split_comment(line):
+    """
+    Split a source line into its code and the text of its trailing comment.
+    An exclamation mark inside a quoted string does not start a comment.
+    """
+    position = line.find('!')
+    if position < 0:
+        return line, ''
+    if "'" not in line and '"' not in line:
+        return line[:position], line[position + 1:]
+
+    quote = None
+    for position, char in enumerate(line):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == '!':
+            return line[:position], line[position + 1:]
+    return line, ''
+
+
+def split_top_level(text, start=0):
+    """
+    Split text on the commas that are not inside parentheses or quotes.
+    Returns (offset, item) pairs, with offsets relative to the start of text plus start.
+    """
+    if ',' not in text:
+        return [(start, text)]
+    if '(' not in text and '[' not in text and "'" not in text and '"' not in text:
+        items = []
+        for item in text.split(','):
+            items.append((start, item))
+            start += len(item) + 1
+        return items
+
+    items = []
+    depth = 0
+    quote = None
+    begin = 0
+    for match in SEPARATOR_PATTERN.finditer(text):
+        char = match.group()
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == '(' or char == '[':
+            depth += 1
+        elif char == ')' or char == ']':
+            depth -= 1
+        elif depth == 0:
+            position = match.start()
+            items.append((start + begin, text[begin:position]))
+            begin = position + 1
+    items.append((start + begin, text[begin:]))
+    return items
+
+
+def parse_comment(comment):
+    """
+    Split a comment into a description and units.
+    Comments without a `, [units]` part are kept whole as the description.
+    """
+    match = COMMENT_PATTERN.match(comment)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return comment.strip(), ''
+
+
+def iter_lines(file_path):
+    """
+    Yield (line number, decoded line) for every line of a file, reading it through a memory map.
+    """
+    with open(file_path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
+        with mapped:
+            for number, raw in enumerate(iter(mapped.readline, b''), start=1):
+                yield number, raw.decode('utf-8', errors='replace').rstrip('\r\n')
+
+
+def iter_statements(file_path):
+    """
+    Group the lines of a file into statements, joining `&` continuation lines.
+    Single lines without `::` cannot be declarations and are skipped.
+
+    Yields:
+        Lists of (line number, code, comment) fragments, one list per statement
+    """
+    fragments = []
+    for number, line in iter_lines(file_path):
+        if not fragments:
+            # Most lines are neither declarations nor continued
+            if '::' not in line and '&' not in line:
+                continue
+            stripped = line.lstrip()
+            if not stripped or stripped[0] in '!#':
+                continue
+        code, comment = split_comment(line)
+        code = code.strip()
+        if fragments:
+            # Blank and comment-only lines may sit between continuation lines
+            if not code:
+                continue
+            if code.startswith('&'):
+                code = code[1:].lstrip()
+        if code.endswith('&'):
+            fragments.append((number, code[:-1].rstrip(), comment))
+            continue
+        fragments.append((number, code, comment))
+        yield fragments
+        fragments = []
+    if fragments:
+        yield fragments
+
+
+def parse_type_spec(header):
+    """
+    Parse the part of a declaration before `::` into the kind of its variables and the
+    dimensions given by a dimension(...) attribute. Returns None if it is not a variable declaration.
+    """
+    match = TYPE_SPEC_PATTERN.match(header)
+    if not match:
+        return None
+    type_name = re.sub(r'\s+', ' ', match.group(1).lower())
+    if type_name in ('type', 'class') and not match.group(2):
+        # A derived type definition, not a variable of that type
+        return None
+    kind = type_name + re.sub(r'\s+', '', match.group(2) or '').lower()
+
+    dimension = DIMENSION_PATTERN.search(header, match.end())
+    return kind, dimension.group(1).strip() if dimension else ''
+
+
+def parse_declaration(fragments, file_path, type_specs):
+    """
+    Parse a statement into one Declaration per variable, or nothing if it is not a declaration.
+    type_specs caches parse_type_spec by header, since a file repeats the same few headers.
+    """
+    if len(fragments) == 1:
+        code = fragments[0][1]
+    else:
+        code = ' '.join(code for _, code, _ in fragments)
+    separator = code.find('::')
+    if separator < 0:
+        return
+
+    header = code[:separator]
+    type_spec = type_specs.get(header, False)
+    if type_spec is False:
+        type_spec = type_specs[header] = parse_type_spec(header)
+    if type_spec is None:
+        return
+    kind, default_dimensions = type_spec
+
+    # Offset at which each fragment starts in the joined statement
+    starts = []
+    offset = 0
+    for _, fragment, _ in fragments:
+        starts.append(offset)
+        offset += len(fragment) + 1
+
+    comments = [comment for _, _, comment in fragments]
+    for entity_start, entity in split_top_level(code[separator + 2:], separator + 2):
+        entity_match = ENTITY_PATTERN.match(entity)
+        if not entity_match:
+            continue
+        if len(fragments) == 1:
+            index = end_index = 0
+        else:
+            index = bisect.bisect_right(starts, entity_start + entity_match.start(1)) - 1
+            end_index = bisect.bisect_right(starts, entity_start + len(entity.rstrip()) - 1) - 1
+
+        # The comment of the line the variable starts on documents it, or, when
+        # its dimensions run onto continuation lines, that of the line it ends on
+        description, units = parse_comment(comments[index])
+        if not units and end_index != index:
+            end_description, end_units = parse_comment(comments[end_index])
+            if end_units:
+                description, units = end_description, end_units
+        dimensions = entity_match.group(2)
+        yield Declaration(
+            name=entity_match.group(1),
+            kind=kind,
+            dimensions=dimensions.strip() if dimensions is not None else default_dimensions,
+            description=description,
+            units=units,
+            file=file_path,
+            line=fragments[index][0],
+        )
+
+
+def iter_declarations(file_path) -> Iterator[Declaration]:
+    """
+    Yield every variable declared in a Fortran source file.
+
+    Args:
+        file_path: Path to the Fortran source file
+
+    Yields:
+        Declaration records, in source order
+    """
+    type_specs = {}
+    for fragments in iter_statements(file_path):
+        yield from parse_declaration(fragments, file_path, type_specs)
+
+
+# Pattern of the regex extractor that fortran2params used before this tokenizer
+LEGACY_PATTERN = re.compile(
+    r"\breal\(r8\)\s*,\s*target\s*,\s*allocatable\s*::\s*(\w+)\s*(?:\((.*?)\))?\s*!\s*(.*?)\s*,\s*\[(.*?)\]",
+    re.IGNORECASE
+)
+
+# Declaration forms of the check: (source line, expected (name, kind, description, units) per variable)
+CHECK_CASES = [
+    ("  real(r8),target,allocatable ::  TKS(:,:,:)   !mean annual soil temperature, [K]",
+     [('TKS', 'real(r8)', 'mean annual soil temperature', 'K')]),
+    ("  integer :: nlev   !number of levels, [-]", [('nlev', 'integer', 'number of levels', '-')]),
+    ("  logical :: flag   !switch, [-]", [('flag', 'logical', 'switch', '-')]),
+    ("  real(r8) :: x(10)   !ten values, [m]", [('x', 'real(r8)', 'ten values', 'm')]),
+    ("  real*8 :: y   !double value, [K]", [('y', 'real*8', 'double value', 'K')]),
+    ("  character(len=10) :: s = 'a!b'   !name, [-]", [('s', 'character(len=10)', 'name', '-')]),
+    ("  real(r8) :: Var = 0._r8 !soil carbon, [g m-2]", [('Var', 'real(r8)', 'soil carbon', 'g m-2')]),
+    ("  integer, parameter :: k = 3   !count, [-]", [('k', 'integer', 'count', '-')]),
+    ("  integer, allocatable :: NU(:,:), &   !upper soil layer number, [-]\n"
+     "                          NL(:,:)\n",
+     [('NU', 'integer', 'upper soil layer number', '-'), ('NL', 'integer', '', '')]),
+    ("  real(r8) :: Bar(JZ, &\n"
+     "                  JY)   !bar description, [m]",
+     [('Bar', 'real(r8)', 'bar description', 'm')]),
+    ("  real(r8),target,allocatable :: Foo(:,:, &   !\n"
+     "                                     :)   !foo description, [g m-2]",
+     [('Foo', 'real(r8)', 'foo description', 'g m-2')]),
+    ("  type :: soil_type", []),
+]
+
+
+def check():
+    """
+    Check the tokenizer on CHECK_CASES, and check that it agrees with LEGACY_PATTERN on every
+    declaration that pattern finds. Returns a list of failure messages, empty if all pass.
+    """
+    import os
+    import tempfile
+
+    failures = []
+    for source, expected in CHECK_CASES:
+        with tempfile.NamedTemporaryFile('w', suffix='.F90', delete=False) as file:
+            file.write(source + '\n')
+        try:
+            found = [(declaration.name, declaration.kind, declaration.description, declaration.units)
+                     for declaration in iter_declarations(file.name)]
+        finally:
+            os.unlink(file.name)
+        if found != expected:
+            failures.append(f"{source.strip()!r}: expected {expected}, found {found}")
+        legacy = [(name, 'real(r8)', description, units)
+                  for name, _, description, units in LEGACY_PATTERN.findall(source)]
+        missing = [match for match in legacy if match not in found]
+        if missing:
+            failures.append(f"{source.strip()!r}: {missing} found by the legacy pattern only")
+    return failures
+
+
+if __name__ == "__main__":
+    import sys
+
+    if sys.argv[1:] == ['--check']:
+        failures = check()
+        for failure in failures:
+            print(f"FAIL {failure}")
+        print(f"{len(failures)} failures in {len(CHECK_CASES)} declaration forms")
+        sys.exit(1 if failures else 0)
+    for path in sys.argv[1:]:
+        for declaration in iter_declarations(path):
+            print('\t'.join(str(value) for value in declaration))
@@ -0,0 +1,164 @@
+"""
+Write bervo.obo as a query-ready SQLite release artifact.
+
+The database has one normalized table per kind of statement, all keyed on the
+integer term key tid, with indexes for lookups in both directions and an FTS5
+table over labels, synonyms and definitions:
+
+    term(tid, id, label, definition, comment, obsolete)
+    edge(child, parent, predicate)                    -- is_a edges
+    synonym(tid, text, scope)
+    xref(tid, xref)
+    property(tid, property, value, datatype)          -- property_value, incl. units and facets
+    term_fts(label, synonyms, definition)             -- rowid = tid
+    meta(key, value)                                  -- data-version, schema version
+
+Consumers open it read-only and query only the rows they need, without loading
+the ontology:
+
+    conn = sqlite3.connect('file:bervo.sqlite?mode=ro&immutable=1', uri=True)
+    conn.execute('SELECT label FROM term WHERE id = ?', ('bervo:BERVO_0000001',))
+    conn.execute('SELECT t.id FROM term_fts JOIN term t ON t.tid = term_fts.rowid '
+                 'WHERE term_fts MATCH ?', ('radiation',))
+
+The release target of the top-level Makefile writes it next to bervo.obo.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+
+from obo_loader import load_obo
+
+# Bump when the tables change
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT) WITHOUT ROWID;
+CREATE TABLE term (
+    tid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    label TEXT,
+    definition TEXT,
+    comment TEXT,
+    obsolete INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE edge (
+    child INTEGER NOT NULL REFERENCES term (tid),
+    parent INTEGER NOT NULL REFERENCES term (tid),
+    predicate TEXT NOT NULL,
+    PRIMARY KEY (child, predicate, parent)
+) WITHOUT ROWID;
+CREATE TABLE synonym (tid INTEGER NOT NULL REFERENCES term (tid), text TEXT NOT NULL, scope TEXT NOT NULL);
+CREATE TABLE xref (tid INTEGER NOT NULL REFERENCES term (tid), xref TEXT NOT NULL);
+CREATE TABLE property (
+    tid INTEGER NOT NULL REFERENCES term (tid),
+    property TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT
+);
+CREATE VIRTUAL TABLE term_fts USING fts5(label, synonyms, definition, tokenize = 'unicode61');
+"""
+
+INDEXES = """
+CREATE INDEX term_label ON term (label COLLATE NOCASE);
+CREATE INDEX edge_parent ON edge (parent, predicate);
+CREATE INDEX synonym_tid ON synonym (tid);
+CREATE INDEX synonym_text ON synonym (text COLLATE NOCASE);
+CREATE INDEX xref_tid ON xref (tid);
+CREATE INDEX xref_xref ON xref (xref);
+CREATE INDEX property_tid ON property (tid, property);
+CREATE INDEX property_value ON property (property, value);
+"""
+
+
+def write_sqlite(ontology, output_file):
+    """
+    Write an Ontology loaded by obo_loader to a new SQLite file.
+
+    The database is built in a temporary file and moved into place, so readers
+    never see a partly written release.
+
+    Args:
+        ontology: Ontology
+        output_file: Path to the SQLite file, replaced if it exists
+
+    Returns:
+        Dictionary of table name -> number of rows
+    """
+    # A temporary file of its own, so concurrent builds do not write into each other's
+    descriptor, temp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)),
+                                             prefix=os.path.basename(output_file) + '.', suffix='.tmp')
+    os.close(descriptor)
+    try:
+        conn = sqlite3.connect(temp_file)
+    except BaseException:
+        os.unlink(temp_file)
+        raise
+    try:
+        conn.executescript(SCHEMA)
+        strings = ontology.strings
+        with conn:
+            conn.executemany('INSERT INTO meta VALUES (?, ?)', [
+                ('schema_version', str(SCHEMA_VERSION)),
+                ('data_version', ontology.data_version or ''),
+            ] + [(f"header:{tag}", '\n'.join(values)) for tag, values in ontology.header.items()])
+
+            # Term keys are the positions of the terms in the ontology, plus one
+            conn.executemany(
+                'INSERT INTO term VALUES (?, ?, ?, ?, ?, ?)',
+                ((term.index + 1, term.id, term.name, term.definition, term.comment, int(term.obsolete))
+                 for term in ontology))
+            conn.executemany(
+                'INSERT OR IGNORE INTO edge VALUES (?, ?, ?)',
+                ((child + 1, parent + 1, 'is_a')
+                 for child, parent in zip(ontology.is_a_child, ontology.is_a_parent)))
+            conn.executemany(
+                'INSERT INTO synonym VALUES (?, ?, ?)',
+                ((term.index + 1, text, scope) for term in ontology for text, scope in term.synonyms))
+            conn.executemany(
+                'INSERT INTO xref VALUES (?, ?)',
+                ((term.index + 1, xref) for term in ontology for xref in term.xrefs))
+            conn.executemany(
+                'INSERT INTO property VALUES (?, ?, ?, ?)',
+                ((term + 1, strings[prop], strings[value], strings[datatype] or None)
+                 for term, prop, value, datatype in zip(ontology.pv_term, ontology.pv_property,
+                                                        ontology.pv_value, ontology.pv_datatype)))
+            conn.executemany(
+                'INSERT INTO term_fts (rowid, label, synonyms, definition) VALUES (?, ?, ?, ?)',
+                ((term.index + 1, term.name, ' | '.join(text for text, _ in term.synonyms), term.definition)
+                 for term in ontology if term.name is not None))
+        conn.executescript(INDEXES)
+        conn.execute("INSERT INTO term_fts (term_fts) VALUES ('optimize')")
+        conn.commit()
+        conn.execute('ANALYZE')
+        conn.execute('VACUUM')
+        counts = {table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                  for table in ('term', 'edge', 'synonym', 'xref', 'property')}
+        conn.close()
+        # mkstemp creates the file readable by its owner only
+        os.chmod(temp_file, 0o644)
+        os.replace(temp_file, output_file)
+    except BaseException:
+        conn.close()
+        os.unlink(temp_file)
+        raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write an OBO file as a query-ready SQLite database.')
+    parser.add_argument('obo', help='Path to the OBO file, e.g. bervo.obo')
+    parser.add_argument('-o', '--output', default='bervo.sqlite', help='Path to the SQLite file (default: bervo.sqlite)')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = write_sqlite(load_obo(args.obo), args.output)
+    print(', '.join(f"{count} {table} rows" for table, count in counts.items()) +
+          f"; written to {args.output} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
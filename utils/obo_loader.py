@@ -0,0 +1,424 @@
+"""
+Fast loader for bervo.obo.
+
+The OBO file is parsed in one streaming pass into a compact Ontology:
+
+- one Term record per term, with __slots__ instead of a per-object dict
+- identifiers, property names and other repeated strings interned
+- is_a edges and property values stored in flat arrays of integers, sorted by
+  term, with per-term offsets, instead of one list per term
+
+The parsed Ontology is cached in a binary file next to the OBO file. The cache
+records the data-version, size and modification time of the OBO file it was
+built from (and the format version of this module), so it is rebuilt after a
+new release or any edit of the file; later loads only unpickle the cache. A cache that cannot be read is ignored and one that cannot be
+written is skipped, so a read-only checkout still loads. The cache is a local
+build artifact, ignored by git, and should not be loaded from untrusted sources.
+
+Usage:
+    from obo_loader import load_obo
+
+    bervo = load_obo('bervo.obo')
+    term = bervo['bervo:BERVO_0000001']
+    print(term.name, bervo.parents(term.id), bervo.property_values(term.id, 'bervo:BERVO_has_unit'))
+"""
+import argparse
+import os
+import pickle
+import sys
+import tempfile
+import time
+from array import array
+
+# Bump when the layout of the parsed Ontology changes, so older caches are rebuilt
+CACHE_FORMAT = 1
+
+CACHE_MAGIC = 'bervo-obo-cache'
+
+
+class Term:
+    """
+    One [Term] stanza. Terms that are only referenced (e.g. as an is_a parent)
+    but not declared in the file have a name of None.
+    """
+    __slots__ = ('index', 'id', 'name', 'definition', 'comment', 'synonyms', 'xrefs', 'obsolete')
+
+    def __init__(self, index, term_id):
+        self.index = index
+        self.id = term_id
+        self.name = None
+        self.definition = None
+        self.comment = None
+        self.synonyms = ()
+        self.xrefs = ()
+        self.obsolete = False
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in Term.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(Term.__slots__, state):
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        return f"Term({self.id!r}, {self.name!r})"
+
+
+class Ontology:
+    """
+    Terms of an OBO file with array-backed is_a and property_value tables.
+
+    Attributes:
+        header: Header tags of the file, as a dict of tag to list of values
+        data_version: Value of the data-version header tag, or None
+        terms: Term records, in order of first appearance, including referenced-only terms
+        strings: Interned property names, property values and datatypes, referenced by index
+        is_a_child, is_a_parent: Term indices of the is_a edges, sorted by child
+        pv_term, pv_property, pv_value, pv_datatype: property_value table, sorted by term;
+            property, value and datatype are indices into strings (datatype 0 is none)
+    """
+
+    def __init__(self):
+        self.header = {}
+        self.data_version = None
+        self.terms = []
+        self.index = {}
+        self.strings = ['']
+        self.string_index = {'': 0}
+        self.is_a_child = array('I')
+        self.is_a_parent = array('I')
+        self.is_a_start = array('I')
+        self.pv_term = array('I')
+        self.pv_property = array('I')
+        self.pv_value = array('I')
+        self.pv_datatype = array('I')
+        self.pv_start = array('I')
+        self.children_start = None
+        self.children_list = None
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __contains__(self, term_id):
+        return term_id in self.index
+
+    def __getitem__(self, term_id):
+        return self.terms[self.index[term_id]]
+
+    def get(self, term_id, default=None):
+        """Return the term with an id, or default."""
+        position = self.index.get(term_id)
+        return default if position is None else self.terms[position]
+
+    def __getstate__(self):
+        # The string lookup table and the children index are rebuilt when needed
+        state = dict(self.__dict__)
+        del state['string_index']
+        state['children_start'] = state['children_list'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.string_index = None
+
+    def term_id(self, term_id):
+        """Return the index of a term id, adding a referenced-only term if it is new."""
+        position = self.index.get(term_id)
+        if position is None:
+            term_id = sys.intern(term_id)
+            position = self.index[term_id] = len(self.terms)
+            self.terms.append(Term(position, term_id))
+        return position
+
+    def string_id(self, text):
+        """Return the index of a string in the string table, adding it if it is new."""
+        if self.string_index is None:
+            self.string_index = {text: position for position, text in enumerate(self.strings)}
+        position = self.string_index.get(text)
+        if position is None:
+            position = self.string_index[text] = len(self.strings)
+            self.strings.append(sys.intern(text))
+        return position
+
+    def finish(self):
+        """Sort the edge and property tables by term and compute the per-term offsets."""
+        n = len(self.terms)
+        order = sorted(range(len(self.is_a_child)), key=self.is_a_child.__getitem__)
+        self.is_a_child = array('I', (self.is_a_child[i] for i in order))
+        self.is_a_parent = array('I', (self.is_a_parent[i] for i in order))
+        self.is_a_start = offsets(self.is_a_child, n)
+
+        order = sorted(range(len(self.pv_term)), key=self.pv_term.__getitem__)
+        for name in ('pv_term', 'pv_property', 'pv_value', 'pv_datatype'):
+            column = getattr(self, name)
+            setattr(self, name, array('I', (column[i] for i in order)))
+        self.pv_start = offsets(self.pv_term, n)
+
+    def parents(self, term_id):
+        """Return the ids of the direct is_a parents of a term."""
+        position = self.index[term_id]
+        return [self.terms[parent].id for parent in
+                self.is_a_parent[self.is_a_start[position]:self.is_a_start[position + 1]]]
+
+    def children(self, term_id):
+        """Return the ids of the direct is_a children of a term."""
+        if self.children_start is None:
+            order = sorted(range(len(self.is_a_parent)), key=self.is_a_parent.__getitem__)
+            self.children_list = array('I', (self.is_a_child[i] for i in order))
+            self.children_start = offsets(array('I', (self.is_a_parent[i] for i in order)), len(self.terms))
+        position = self.index[term_id]
+        return [self.terms[child].id for child in
+                self.children_list[self.children_start[position]:self.children_start[position + 1]]]
+
+    def property_values(self, term_id, property_name=None):
+        """
+        Return the property values of a term.
+
+        Args:
+            term_id: Term id
+            property_name: Only return values of this property, e.g. bervo:BERVO_has_unit
+
+        Returns:
+            List of values if property_name is given, otherwise list of (property, value) pairs
+        """
+        position = self.index[term_id]
+        start, end = self.pv_start[position], self.pv_start[position + 1]
+        strings = self.strings
+        if property_name is not None:
+            return [strings[self.pv_value[i]] for i in range(start, end)
+                    if strings[self.pv_property[i]] == property_name]
+        return [(strings[self.pv_property[i]], strings[self.pv_value[i]]) for i in range(start, end)]
+
+
+def offsets(sorted_keys, n):
+    """
+    Compute CSR offsets: entries of key k are at positions offsets[k] to offsets[k + 1].
+    """
+    counts = [0] * (n + 1)
+    for key in sorted_keys:
+        counts[key + 1] += 1
+    for position in range(n):
+        counts[position + 1] += counts[position]
+    return array('I', counts)
+
+
+def unquote(value):
+    """
+    Split a value that starts with a quoted string into the unescaped string and the rest of the line.
+    """
+    chars = []
+    position = 1
+    while position < len(value):
+        char = value[position]
+        if char == '\\' and position + 1 < len(value):
+            chars.append(value[position + 1])
+            position += 2
+            continue
+        if char == '"':
+            break
+        chars.append(char)
+        position += 1
+    return ''.join(chars), value[position + 1:].strip()
+
+
+def strip_comment(value):
+    """Remove a trailing ' ! comment' from a tag value."""
+    position = value.find(' !')
+    return value[:position].strip() if position >= 0 else value.strip()
+
+
+def parse_obo(obo_file):
+    """
+    Parse an OBO file into an Ontology in one streaming pass.
+    Only [Term] stanzas are loaded; other stanza types are skipped.
+
+    Args:
+        obo_file: Path to the OBO file
+
+    Returns:
+        Ontology
+    """
+    ontology = Ontology()
+    intern = sys.intern
+    term = None
+    in_header = True
+    synonyms = []
+    xrefs = []
+
+    def close_term():
+        if term:
+            term.synonyms = tuple(synonyms)
+            term.xrefs = tuple(xrefs)
+
+    with open(obo_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.rstrip('\n')
+            if not line or line.startswith('!'):
+                continue
+            if line[0] == '[':
+                in_header = False
+                close_term()
+                synonyms, xrefs = [], []
+                if line.startswith('[Term]'):
+                    term = False  # Created when its id is read
+                else:
+                    term = None
+                continue
+
+            tag, _, value = line.partition(': ')
+            if in_header:
+                ontology.header.setdefault(tag, []).append(value.strip())
+                continue
+            if term is None or (term is False and tag != 'id'):
+                continue
+
+            if tag == 'id':
+                position = ontology.term_id(value.strip())
+                term = ontology.terms[position]
+            elif tag == 'name':
+                term.name = value.strip()
+            elif tag == 'def':
+                term.definition = unquote(value)[0]
+            elif tag == 'comment':
+                term.comment = intern(value.strip())
+            elif tag == 'synonym':
+                text, rest = unquote(value)
+                scope = rest.split(' ', 1)[0] if rest else 'RELATED'
+                synonyms.append((text, intern(scope)))
+            elif tag == 'xref':
+                xrefs.append(intern(strip_comment(value)))
+            elif tag == 'is_a':
+                ontology.is_a_child.append(term.index)
+                ontology.is_a_parent.append(ontology.term_id(strip_comment(value)))
+            elif tag == 'property_value':
+                property_name, _, rest = value.partition(' ')
+                if rest.startswith('"'):
+                    text, datatype = unquote(rest)
+                else:
+                    text, datatype = strip_comment(rest), ''
+                ontology.pv_term.append(term.index)
+                ontology.pv_property.append(ontology.string_id(property_name))
+                ontology.pv_value.append(ontology.string_id(text))
+                ontology.pv_datatype.append(ontology.string_id(datatype))
+            elif tag == 'is_obsolete':
+                term.obsolete = value.strip() == 'true'
+    close_term()
+
+    ontology.data_version = ontology.header.get('data-version', [None])[0]
+    ontology.finish()
+    return ontology
+
+
+def read_data_version(obo_file):
+    """
+    Read the data-version of an OBO file from its header, without parsing the rest.
+    Files without one are identified by their size and modification time instead.
+    """
+    with open(obo_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            if line.startswith('['):
+                break
+            if line.startswith('data-version:'):
+                return line.split(':', 1)[1].strip()
+    stat = os.stat(obo_file)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def default_cache_file(obo_file):
+    """Return the default cache path of an OBO file, e.g. bervo.obo.cache."""
+    return f"{obo_file}.cache"
+
+
+def load_obo(obo_file, cache_file=None, use_cache=True):
+    """
+    Load an OBO file, from its binary cache when the cache matches the file's
+    data-version, size and modification time.
+
+    Args:
+        obo_file: Path to the OBO file
+        cache_file: Path to the cache file (default: the OBO path plus .cache)
+        use_cache: Whether to read and write the cache at all
+
+    Returns:
+        Ontology
+    """
+    if not use_cache:
+        return parse_obo(obo_file)
+
+    cache_file = cache_file or default_cache_file(obo_file)
+    # The data-version stays the same when a file is edited or rebuilt on the
+    # same day, so the size and modification time are part of the key as well
+    stat = os.stat(obo_file)
+    key = (CACHE_MAGIC, CACHE_FORMAT, read_data_version(obo_file), stat.st_size, stat.st_mtime_ns)
+    ontology = read_cache(cache_file, key)
+    if ontology is not None:
+        return ontology
+
+    ontology = parse_obo(obo_file)
+    write_cache(cache_file, key, ontology)
+    return ontology
+
+
+def read_cache(cache_file, key):
+    """
+    Return the Ontology of a cache file written with key, or None if the file is
+    missing, unreadable, written with another key or cannot be unpickled.
+    """
+    try:
+        with open(cache_file, 'rb') as file:
+            if pickle.load(file) == key:
+                return pickle.load(file)
+    except FileNotFoundError:
+        pass
+    except Exception as error:
+        print(f"Ignoring unreadable cache {cache_file}: {error}", file=sys.stderr)
+    return None
+
+
+def write_cache(cache_file, key, ontology):
+    """
+    Write the cache of an Ontology. It is written to a temporary file of its own
+    in the same directory and then moved into place, so neither an interrupted
+    run nor several processes writing at once can leave a truncated cache. A
+    cache that cannot be written is skipped with a warning.
+    """
+    directory = os.path.dirname(os.path.abspath(cache_file))
+    try:
+        descriptor, temp_file = tempfile.mkstemp(dir=directory, prefix=os.path.basename(cache_file) + '.',
+                                                 suffix='.tmp')
+    except OSError as error:
+        print(f"Not writing cache {cache_file}: {error}", file=sys.stderr)
+        return
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            pickle.dump(key, file, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(ontology, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, cache_file)
+    except OSError as error:
+        print(f"Not writing cache {cache_file}: {error}", file=sys.stderr)
+        try:
+            os.unlink(temp_file)
+        except OSError:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse an OBO file and build its binary cache.')
+    parser.add_argument('obo', help='Path to the OBO file, e.g. bervo.obo')
+    parser.add_argument('--cache', help='Path to the cache file (default: the OBO path plus .cache)')
+
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ontology = load_obo(args.obo, args.cache)
+    elapsed = time.perf_counter() - start
+    declared = sum(1 for term in ontology if term.name is not None)
+    print(f"Loaded {declared} terms, {len(ontology.is_a_child)} is_a edges and "
+          f"{len(ontology.pv_term)} property values ({ontology.data_version}) in {elapsed * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
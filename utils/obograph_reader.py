@@ -0,0 +1,325 @@
+"""
+Streaming reader for OBO Graphs JSON files such as bervo.json.
+
+json.load builds the whole document, including the meta block, synonyms and
+basicPropertyValues of every node, before a single node can be used. This
+reader walks the document incrementally instead: it reads the file in chunks,
+finds the nodes and edges arrays of the first graph, and decodes their elements
+one at a time, so memory stays bounded by the largest element rather than the
+file. Each node is projected to the requested fields and filtered as soon as it
+is decoded, and iter_nodes stops reading at the end of the nodes array.
+
+Fields are named as in the document (id, lbl, type) or by the meta entry they
+come from:
+
+    definition      meta.definition.val
+    comments        meta.comments
+    synonyms        values of meta.synonyms
+    xrefs           values of meta.xrefs
+    deprecated      meta.deprecated
+    <name>          values of meta.basicPropertyValues whose predicate has
+                    the local name name or <idspace>_name, e.g. has_unit
+                    for https://w3id.org/bervo/BERVO_has_unit
+
+Property values, synonyms, comments and xrefs are lists; the rest are single
+values, or None when the node has no such entry.
+
+Usage:
+    from obograph_reader import iter_nodes, iter_edges
+
+    for node in iter_nodes('bervo.json', fields=['id', 'lbl', 'has_unit'], where=has_fields('has_unit')):
+        ...
+
+    python obograph_reader.py bervo.json --fields id lbl has_unit --has has_unit --curie --tsv
+"""
+import argparse
+import csv
+import json
+import sys
+
+# Characters read from the file at a time
+CHUNK_SIZE = 1 << 16
+
+WHITESPACE = ' \t\n\r'
+
+# IRI prefix -> CURIE prefix, for compact ids that match the OBO files
+PREFIXES = {
+    'https://w3id.org/bervo/': 'bervo:',
+    'http://www.geneontology.org/formats/oboInOwl#': 'oboInOwl:',
+}
+
+# Other OBO Foundry IRIs compact to PREFIX:LOCAL, e.g. PO:0025034
+OBO_PURL = 'http://purl.obolibrary.org/obo/'
+
+
+def curie(iri):
+    """Compact an IRI with a known prefix, e.g. https://w3id.org/bervo/BERVO_0000001 -> bervo:BERVO_0000001."""
+    for prefix, replacement in PREFIXES.items():
+        if iri.startswith(prefix):
+            return replacement + iri[len(prefix):]
+    if iri.startswith(OBO_PURL) and '_' in iri[len(OBO_PURL):]:
+        return iri[len(OBO_PURL):].replace('_', ':', 1)
+    return iri
+
+
+class JSONStream:
+    """
+    Decode JSON values one at a time from a text file read in chunks.
+
+    Only the values the caller asks for are decoded; the structure around them
+    (object braces, keys, commas) is consumed by expect and the key helpers.
+    """
+
+    def __init__(self, file, chunk_size=CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """Read the next chunk, dropping what has been consumed. Return False at end of file."""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Skip whitespace and return the next character, or '' at end of file."""
+        while True:
+            buffer = self.buffer
+            pos = self.pos
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(buffer):
+                return buffer[pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters):
+        """Consume the next character, which must be one of characters, and return it."""
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f"Expected one of {characters!r} but found {character or 'end of file'!r}")
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value runs past the end of the buffer
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk
+            if end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def keys(self):
+        """
+        Iterate over the keys of the object that starts at the current position.
+
+        After each key is yielded, the caller must consume its value, either with
+        value() or by walking into it; the closing brace is consumed at the end.
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def items(self):
+        """Iterate over the elements of the array that starts at the current position, decoding each."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_graph(stream, keys):
+    """
+    Walk the first graph of an OBO Graphs document.
+
+    Args:
+        stream: JSONStream positioned at the start of the document
+        keys: Graph keys to yield, e.g. {'nodes', 'edges'}. The elements of the
+            nodes and edges arrays are yielded one at a time, other values such
+            as meta whole; arrays that are not wanted are skipped one element at
+            a time
+
+    Yields:
+        Tuples of (key, element or value), in document order
+    """
+    remaining = set(keys)
+    for key in stream.keys():
+        if key != 'graphs':
+            stream.value()
+            continue
+        stream.expect('[')
+        if stream.peek() == ']':
+            return
+        for graph_key in stream.keys():
+            if graph_key in ('nodes', 'edges', 'equivalentNodesSets', 'logicalDefinitionAxioms'):
+                wanted = graph_key in remaining
+                for element in stream.items():
+                    if wanted:
+                        yield graph_key, element
+                remaining.discard(graph_key)
+                if not remaining:
+                    return
+            else:
+                value = stream.value()
+                if graph_key in remaining:
+                    yield graph_key, value
+                    remaining.discard(graph_key)
+                    if not remaining:
+                        return
+        return
+
+
+def local_name(iri):
+    """Return the part of an IRI after the last / or #."""
+    return iri[max(iri.rfind('/'), iri.rfind('#')) + 1:]
+
+
+def node_field(node, field):
+    """Return one field of an OBO Graphs node, named as described in the module docstring."""
+    if field in ('id', 'lbl', 'type'):
+        return node.get(field)
+    meta = node.get('meta') or {}
+    if field == 'definition':
+        return (meta.get('definition') or {}).get('val')
+    if field == 'comments':
+        return list(meta.get('comments', []))
+    if field in ('synonyms', 'xrefs'):
+        return [entry['val'] for entry in meta.get(field, [])]
+    if field == 'deprecated':
+        return meta.get('deprecated', False)
+    return [entry['val'] for entry in meta.get('basicPropertyValues', [])
+            if field in (local_name(entry['pred']), local_name(entry['pred']).split('_', 1)[-1])]
+
+
+def has_fields(*fields):
+    """Return a node filter that keeps nodes with a non-empty value for every one of fields."""
+    return lambda node: all(node_field(node, field) for field in fields)
+
+
+def _project(node, fields, compact):
+    if fields is None:
+        record = node
+    else:
+        record = {field: node_field(node, field) for field in fields}
+    if compact and 'id' in record and record['id'] is not None:
+        record['id'] = curie(record['id'])
+    return record
+
+
+def iter_nodes(json_file, fields=None, where=None, node_type='CLASS', compact=False):
+    """
+    Yield the nodes of the first graph of an OBO Graphs JSON file, one at a time.
+
+    Args:
+        json_file: Path to the JSON file, e.g. bervo.json
+        fields: Fields to keep, e.g. ['id', 'lbl', 'has_unit']; None keeps the node as it is
+        where: Function of the full node that returns True for the nodes to keep
+        node_type: Keep only nodes of this type; None keeps nodes of all types
+        compact: Replace the id with its CURIE
+
+    Yields:
+        Dictionaries of field -> value
+    """
+    with open(json_file, 'r', encoding='utf-8') as file:
+        for _, node in iter_graph(JSONStream(file), {'nodes'}):
+            if node_type is not None and node.get('type') != node_type:
+                continue
+            if where is not None and not where(node):
+                continue
+            yield _project(node, fields, compact)
+
+
+def iter_edges(json_file, predicate=None, compact=False):
+    """
+    Yield the edges of the first graph of an OBO Graphs JSON file, one at a time.
+
+    Args:
+        json_file: Path to the JSON file
+        predicate: Keep only edges with this predicate, e.g. 'is_a'
+        compact: Replace the subject and object with their CURIEs
+
+    Yields:
+        Dictionaries with sub, pred and obj
+    """
+    with open(json_file, 'r', encoding='utf-8') as file:
+        for _, edge in iter_graph(JSONStream(file), {'edges'}):
+            if predicate is not None and edge.get('pred') != predicate:
+                continue
+            if compact:
+                edge['sub'] = curie(edge['sub'])
+                edge['obj'] = curie(edge['obj'])
+            yield edge
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream the nodes or edges of an OBO Graphs JSON file.')
+    parser.add_argument('json_file', help='Path to the JSON file, e.g. bervo.json')
+    parser.add_argument('--fields', nargs='+', help='Node fields to write, e.g. id lbl has_unit (default: whole nodes)')
+    parser.add_argument('--has', nargs='+', default=[], help='Keep only nodes with values for these fields')
+    parser.add_argument('--type', default='CLASS', help="Node type to keep, or 'any' (default: CLASS)")
+    parser.add_argument('--edges', action='store_true', help='Write edges instead of nodes')
+    parser.add_argument('--predicate', help='Keep only edges with this predicate')
+    parser.add_argument('--curie', action='store_true', help='Write ids as CURIEs')
+    parser.add_argument('--tsv', action='store_true', help='Write TSV instead of JSON Lines (requires --fields or --edges)')
+    parser.add_argument('-o', '--output', help='Path to the output file (default: standard output)')
+
+    args = parser.parse_args()
+
+    if args.edges:
+        records = iter_edges(args.json_file, args.predicate, args.curie)
+        columns = ['sub', 'pred', 'obj']
+    else:
+        records = iter_nodes(args.json_file, args.fields, has_fields(*args.has) if args.has else None,
+                             None if args.type == 'any' else args.type, args.curie)
+        columns = args.fields
+    if args.tsv and not columns:
+        parser.error('--tsv requires --fields or --edges')
+
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        if args.tsv:
+            writer = csv.writer(output, delimiter='\t', lineterminator='\n')
+            writer.writerow(columns)
+            for record in records:
+                writer.writerow(['|'.join(value) if isinstance(value, list) else ('' if value is None else value)
+                                 for value in (record[column] for column in columns)])
+        else:
+            for record in records:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
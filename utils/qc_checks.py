@@ -0,0 +1,418 @@
+"""
+Fast QC checks for BERVO.
+
+The sparql_test target of the ODK Makefile runs every src/sparql/*-violation.sparql
+query through ROBOT, which loads the ontology and plans each query separately.
+This script evaluates the same checks in Python instead. The OBO file is read
+once into a small triple store, indexed by predicate and by subject, and every
+check is a lookup or a short walk over that index.
+
+OBO tags are read as the triples ROBOT would produce for them (name as
+rdfs:label, is_a as rdfs:subClassOf, replaced_by as IAO:0100001, property_value
+as an annotation, and so on). CURIEs are expanded with the idspace header tags
+of the file and the standard OBO rule (BERVO:X -> http://purl.obolibrary.org/obo/BERVO_X).
+
+All violations are written to one TSV in the layout of ROBOT report
+(Level, Rule Name, Subject, Property, Value), with the check name as the rule
+name, and the time spent in each check is written next to it.
+
+Usage:
+    python qc_checks.py ../src/ontology/bervo-core.obo -o ../src/ontology/reports/qc-violations.tsv
+"""
+import argparse
+import csv
+import re
+import sys
+import time
+
+from obo_loader import strip_comment, unquote
+
+OBO = 'http://purl.obolibrary.org/obo/'
+RDFS = 'http://www.w3.org/2000/01/rdf-schema#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+OIO = 'http://www.geneontology.org/formats/oboInOwl#'
+DCE = 'http://purl.org/dc/elements/1.1/'
+DCTERMS = 'http://purl.org/dc/terms/'
+
+# Prefixes that OBO files use without declaring them
+BUILTIN_PREFIXES = {
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'rdfs': RDFS,
+    'owl': OWL,
+    'xsd': XSD,
+    'oboInOwl': OIO,
+    'oio': OIO,
+    'dc': DCE,
+    'dce': DCE,
+    'dcterms': DCTERMS,
+    'dct': DCTERMS,
+    'foaf': 'http://xmlns.com/foaf/0.1/',
+    'skos': 'http://www.w3.org/2004/02/skos/core#',
+}
+
+LABEL = RDFS + 'label'
+SUBCLASS_OF = RDFS + 'subClassOf'
+EQUIVALENT_CLASS = OWL + 'equivalentClass'
+REPLACED_BY = OBO + 'IAO_0100001'
+TERM_TRACKER_ITEM = OBO + 'IAO_0000233'
+NEVER_IN_TAXON = OBO + 'RO_0002161'
+PRESENT_IN_TAXON = OBO + 'RO_0002175'
+
+# OBO tags that translate to a single annotation triple: tag -> (predicate, value is an IRI)
+TAG_PREDICATES = {
+    'name': (LABEL, False),
+    'comment': (RDFS + 'comment', False),
+    'xref': (OIO + 'hasDbXref', False),
+    'subset': (OIO + 'inSubset', True),
+    'replaced_by': (REPLACED_BY, True),
+    'consider': (OIO + 'consider', True),
+    'created_by': (OIO + 'created_by', False),
+    'creation_date': (OIO + 'creation_date', False),
+    'alt_id': (OIO + 'hasAlternativeId', False),
+    'is_obsolete': (OWL + 'deprecated', False),
+}
+
+SYNONYM_PREDICATES = {
+    'EXACT': OIO + 'hasExactSynonym',
+    'RELATED': OIO + 'hasRelatedSynonym',
+    'BROAD': OIO + 'hasBroadSynonym',
+    'NARROW': OIO + 'hasNarrowSynonym',
+}
+
+DEFAULT_TERM_PREFIX = OBO + 'BERVO_'
+
+
+class Value:
+    """
+    Object of a triple: an IRI, or a literal with an optional datatype IRI.
+    """
+    __slots__ = ('text', 'is_iri', 'datatype')
+
+    def __init__(self, text, is_iri=False, datatype=None):
+        self.text = text
+        self.is_iri = is_iri
+        self.datatype = datatype
+
+
+class TripleStore:
+    """
+    Triples read from the [Term] stanzas of an OBO file, indexed by predicate and by subject.
+
+    Args:
+        obo_file: Path to the OBO file
+    """
+
+    def __init__(self, obo_file):
+        self.prefixes = dict(BUILTIN_PREFIXES)
+        self.by_predicate = {}
+        self.by_subject = {}
+        # Class -> list of intersection_of elements as (relation IRI or None, filler IRI)
+        self.intersections = {}
+        self.triples = 0
+        self.load(obo_file)
+
+    def expand(self, curie):
+        """Expand a CURIE or OBO id to an IRI; full IRIs are returned unchanged."""
+        if curie.startswith(('http://', 'https://')):
+            return curie
+        prefix, sep, local = curie.partition(':')
+        if not sep:
+            return curie
+        base = self.prefixes.get(prefix)
+        return base + local if base is not None else f"{OBO}{prefix}_{local}"
+
+    def add(self, subject, predicate, value):
+        """Add one triple."""
+        self.by_predicate.setdefault(predicate, []).append((subject, value))
+        self.by_subject.setdefault(subject, {}).setdefault(predicate, []).append(value)
+        self.triples += 1
+
+    def objects(self, subject, predicate):
+        """Return the values of a subject for a predicate."""
+        return self.by_subject.get(subject, {}).get(predicate, [])
+
+    def load(self, obo_file):
+        """Read an OBO file into the store."""
+        subject = None
+        in_term = False
+        in_header = True
+        with open(obo_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.rstrip('\n')
+                if not line or line.startswith('!'):
+                    continue
+                if line[0] == '[':
+                    in_header = False
+                    in_term = line.startswith('[Term]')
+                    subject = None
+                    continue
+                tag, _, value = line.partition(': ')
+                value = value.strip()
+                if in_header:
+                    if tag == 'idspace':
+                        parts = value.split()
+                        if len(parts) >= 2:
+                            self.prefixes[parts[0]] = parts[1]
+                    continue
+                if not in_term:
+                    continue
+                if tag == 'id':
+                    subject = self.expand(value)
+                    continue
+                if subject is None:
+                    continue
+                self.add_tag(subject, tag, value)
+
+    def add_tag(self, subject, tag, value):
+        """Add the triples of one tag of a term stanza."""
+        if tag in TAG_PREDICATES:
+            predicate, is_iri = TAG_PREDICATES[tag]
+            if value.startswith('"'):
+                value = unquote(value)[0]
+            else:
+                value = strip_comment(value)
+            self.add(subject, predicate, Value(self.expand(value), True) if is_iri else Value(value))
+        elif tag == 'def':
+            self.add(subject, OBO + 'IAO_0000115', Value(unquote(value)[0]))
+        elif tag == 'synonym':
+            text, rest = unquote(value)
+            scope = rest.split(' ', 1)[0] if rest else 'RELATED'
+            self.add(subject, SYNONYM_PREDICATES.get(scope, SYNONYM_PREDICATES['RELATED']), Value(text))
+        elif tag == 'is_a':
+            parent = strip_comment(value).split(' {', 1)[0]
+            self.add(subject, SUBCLASS_OF, Value(self.expand(parent), True))
+        elif tag == 'intersection_of':
+            parts = strip_comment(value).split(' {', 1)[0].split()
+            if len(parts) == 1:
+                element = (None, self.expand(parts[0]))
+            else:
+                element = (self.expand(parts[0]), self.expand(parts[1]))
+            self.intersections.setdefault(subject, []).append(element)
+        elif tag == 'property_value':
+            predicate, _, rest = value.partition(' ')
+            predicate = self.expand(predicate)
+            if rest.startswith('"'):
+                text, datatype = unquote(rest)
+                self.add(subject, predicate, Value(text, False, self.expand(datatype) if datatype else None))
+            else:
+                self.add(subject, predicate, Value(self.expand(strip_comment(rest)), True))
+
+
+# Checks: each takes the store and a term IRI prefix, and yields (subject, property, value)
+
+def check_dc_properties(store, term_prefix):
+    """Terms annotated with the deprecated DC Elements 1.1 namespace."""
+    for predicate, pairs in store.by_predicate.items():
+        if predicate.startswith(DCE):
+            for subject, value in pairs:
+                if subject.startswith(term_prefix):
+                    yield subject, predicate, value.text
+
+
+DATE_PREDICATES = [DCTERMS + 'date', DCTERMS + 'issued', DCTERMS + 'created', OIO + 'creation_date']
+DATE_PATTERN = re.compile(r'^\d{4}-\d\d-\d\d$')
+DATETIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z')
+
+
+def check_illegal_date(store, term_prefix):
+    """Dates that are neither a well-formed xsd:date nor a well-formed xsd:dateTime."""
+    seen = set()
+    for predicate in DATE_PREDICATES:
+        for subject, value in store.by_predicate.get(predicate, []):
+            if value.is_iri:
+                continue
+            date_ok = value.datatype == XSD + 'date' and DATE_PATTERN.search(value.text)
+            datetime_ok = value.datatype == XSD + 'dateTime' and DATETIME_PATTERN.search(value.text)
+            row = (subject, predicate, value.text)
+            if not date_ok and not datetime_ok and row not in seen:
+                seen.add(row)
+                yield row
+
+
+def literal_values(store, term_prefix, predicates):
+    """Literal values of some predicates on terms, where IRIs are expected."""
+    for predicate in predicates:
+        for subject, value in store.by_predicate.get(predicate, []):
+            if subject.startswith(term_prefix) and not value.is_iri:
+                yield subject, predicate, value.text
+
+
+IRI_RANGE_PREDICATES = [NEVER_IN_TAXON, PRESENT_IN_TAXON, 'http://xmlns.com/foaf/0.1/depicted_by',
+                        OIO + 'inSubset', DCTERMS + 'contributor']
+
+
+def check_iri_range(store, term_prefix):
+    """Literal values of properties whose values must be IRIs."""
+    return literal_values(store, term_prefix, IRI_RANGE_PREDICATES)
+
+
+def check_iri_range_advanced(store, term_prefix):
+    """Literal values of properties whose values must be IRIs, including rdfs:seeAlso."""
+    return literal_values(store, term_prefix, IRI_RANGE_PREDICATES + [RDFS + 'seeAlso'])
+
+
+LABEL_IRI_PATTERN = re.compile(r'http[s]?[:]')
+
+
+def check_label_with_iri(store, term_prefix):
+    """Labels that contain an IRI."""
+    for subject, value in store.by_predicate.get(LABEL, []):
+        if subject.startswith(term_prefix) and LABEL_IRI_PATTERN.search(value.text):
+            yield subject, LABEL, value.text
+
+
+def check_multiple_replaced_by(store, term_prefix):
+    """Entities replaced by more than one entity; every ordered pair of values is reported."""
+    values = {}
+    for subject, value in store.by_predicate.get(REPLACED_BY, []):
+        values.setdefault(subject, []).append(value.text)
+    for subject, texts in values.items():
+        distinct = list(dict.fromkeys(texts))
+        for first in distinct:
+            for second in distinct:
+                if first != second:
+                    yield subject, REPLACED_BY, f"{first}|{second}"
+
+
+def check_owldef_self_reference(store, term_prefix):
+    """Logical definitions (intersection_of) that refer to the defined term itself."""
+    for subject, elements in store.intersections.items():
+        if subject.startswith(term_prefix) and any(filler == subject for _, filler in elements):
+            yield subject, EQUIVALENT_CLASS, ''
+
+
+def check_redundant_subclass_of(store, term_prefix):
+    """Direct superclasses that are also inferred through another direct superclass."""
+    ancestors = {}
+
+    def ancestors_of(term):
+        # Transitive rdfs:subClassOf+ over named classes, memoized
+        if term in ancestors:
+            return ancestors[term]
+        ancestors[term] = result = set()
+        stack = [term]
+        while stack:
+            current = stack.pop()
+            for value in store.objects(current, SUBCLASS_OF):
+                if value.is_iri and value.text not in result:
+                    result.add(value.text)
+                    stack.append(value.text)
+        return result
+
+    for subject, predicates in store.by_subject.items():
+        if not subject.startswith(term_prefix) or not predicates.get(LABEL):
+            continue
+        parents = [value.text for value in predicates.get(SUBCLASS_OF, []) if value.is_iri]
+        for y in parents:
+            if not store.objects(y, LABEL):
+                continue
+            for z in parents:
+                if z in ancestors_of(y) and store.objects(z, LABEL):
+                    yield subject, SUBCLASS_OF, f"{z} (via {y})"
+
+
+def check_taxon_range(store, term_prefix):
+    """Taxon constraints whose value is not an NCBITaxon class."""
+    for predicate in (NEVER_IN_TAXON, PRESENT_IN_TAXON):
+        for subject, value in store.by_predicate.get(predicate, []):
+            if subject.startswith(term_prefix) and not (value.is_iri and value.text.startswith(OBO + 'NCBITaxon_')):
+                yield subject, predicate, value.text
+
+
+def check_term_tracker_uri(store, term_prefix):
+    """Term tracker items that are literals not typed as xsd:anyURI."""
+    for subject, value in store.by_predicate.get(TERM_TRACKER_ITEM, []):
+        if not value.is_iri and value.datatype != XSD + 'anyURI':
+            yield subject, TERM_TRACKER_ITEM, value.text
+
+
+# Check name (as in src/sparql/<name>-violation.sparql) -> function
+CHECKS = {
+    'dc-properties': check_dc_properties,
+    'illegal-date': check_illegal_date,
+    'iri-range': check_iri_range,
+    'iri-range-advanced': check_iri_range_advanced,
+    'label-with-iri': check_label_with_iri,
+    'multiple-replaced_by': check_multiple_replaced_by,
+    'owldef-self-reference': check_owldef_self_reference,
+    'redundant-subClassOf': check_redundant_subclass_of,
+    'taxon-range': check_taxon_range,
+    'term-tracker-uri': check_term_tracker_uri,
+}
+
+
+def run_checks(obo_file, checks=None, term_prefix=DEFAULT_TERM_PREFIX):
+    """
+    Load an OBO file once and run QC checks on it.
+
+    Args:
+        obo_file: Path to the OBO file
+        checks: Names of the checks to run (default: all of CHECKS)
+        term_prefix: IRI prefix of the terms that are checked
+
+    Returns:
+        Tuple of (list of (check, subject, property, value) violations,
+        list of (check, number of violations, seconds) timings)
+    """
+    start = time.perf_counter()
+    store = TripleStore(obo_file)
+    timings = [('load', store.triples, time.perf_counter() - start)]
+
+    violations = []
+    for name in checks or CHECKS:
+        if name not in CHECKS:
+            raise ValueError(f"Unknown check: {name}. Choose from {', '.join(CHECKS)}")
+        start = time.perf_counter()
+        rows = [(name,) + row for row in CHECKS[name](store, term_prefix)]
+        timings.append((name, len(rows), time.perf_counter() - start))
+        violations.extend(rows)
+    return violations, timings
+
+
+def write_report(violations, report_file, level='ERROR'):
+    """Write violations as a TSV in the layout of ROBOT report."""
+    with open(report_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, delimiter='\t', lineterminator='\n')
+        writer.writerow(['Level', 'Rule Name', 'Subject', 'Property', 'Value'])
+        for check, subject, property_iri, value in violations:
+            writer.writerow([level, check, subject, property_iri, value])
+
+
+def write_timings(timings, timings_file):
+    """Write the number of violations (triples for the load) and the time of each check as a TSV."""
+    with open(timings_file, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, delimiter='\t', lineterminator='\n')
+        writer.writerow(['check', 'count', 'seconds'])
+        for name, count, seconds in timings:
+            writer.writerow([name, count, f"{seconds:.6f}"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the BERVO SPARQL violation checks in a single pass over an OBO file.')
+    parser.add_argument('obo', help='Path to the OBO file to check, e.g. src/ontology/bervo-core.obo')
+    parser.add_argument('-o', '--output', default='qc-violations.tsv', help='Path to the report TSV (default: qc-violations.tsv)')
+    parser.add_argument('--timings', help='Path to the per-check timings TSV (default: the report path with -timings.tsv)')
+    parser.add_argument('--checks', nargs='+', choices=list(CHECKS), help='Checks to run (default: all)')
+    parser.add_argument('--term-prefix', default=DEFAULT_TERM_PREFIX,
+                        help=f'IRI prefix of the terms to check (default: {DEFAULT_TERM_PREFIX})')
+    parser.add_argument('--no-fail', action='store_true', help='Exit with status 0 even if there are violations')
+
+    args = parser.parse_args()
+
+    violations, timings = run_checks(args.obo, args.checks, args.term_prefix)
+    write_report(violations, args.output)
+    timings_file = args.timings or re.sub(r'(\.tsv)?$', '-timings.tsv', args.output, count=1)
+    write_timings(timings, timings_file)
+
+    for name, count, seconds in timings:
+        label = 'triples' if name == 'load' else 'violations'
+        print(f"{name:<24}{count:>8} {label:<11}{seconds * 1000:>9.1f} ms")
+    print(f"{len(violations)} violations written to {args.output}")
+
+    if violations and not args.no_fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Reconcile parameters harvested from the EcoSIM Fortran sources with BERVO terms.
+
+BERVO keeps the EcoSIM variable name of each term as a RELATED synonym, and the
+source file it was harvested from as the term comment (e.g. EcosimBGCFluxType.txt
+for EcosimBGCFluxType.F90). This script indexes bervo.obo on those two fields once,
+then looks up every harvested variable from the JSON lines written by
+fortran2params.py, and classifies it as:
+
+- matched: a term exists, with the same units and description
+- drifted: a term exists, but the units or the description changed
+- new: no term exists for the variable
+
+Usage:
+    python fortran2params.py path/to/EcoSIM -o params.jsonl
+    python reconcile_params.py params.jsonl ../bervo.obo -o reconciliation.tsv
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from obo_loader import load_obo
+
+def normalize(text):
+    """
+    Normalize text for comparison: case, runs of whitespace and a trailing period are ignored.
+    """
+    return ' '.join(text.split()).rstrip('.').lower()
+
+def source_stem(file_name):
+    """
+    Return the bare module name of a source or harvest file, e.g. SoilBGCDataType for
+    src/SoilBGCDataType.F90 or SoilBGCDataType.txt.
+    """
+    return os.path.splitext(os.path.basename(file_name))[0]
+
+def iter_terms(obo_file):
+    """
+    Yield id, name, definition, comment, RELATED synonyms and units of every term of an OBO file.
+    """
+    ontology = load_obo(obo_file)
+    for term in ontology:
+        if term.name is None:
+            continue
+        yield {
+            'id': term.id,
+            'name': term.name,
+            'def': term.definition or '',
+            'comment': term.comment or '',
+            'synonyms': [text for text, scope in term.synonyms if scope == 'RELATED'],
+            'units': ontology.property_values(term.id, 'bervo:BERVO_has_unit'),
+        }
+
+class TermIndex:
+    """
+    Hash index of BERVO terms on (source module, variable name) and on variable name alone.
+    A variable name alone only identifies a term when no other term uses it.
+
+    Args:
+        obo_file: Path to bervo.obo
+    """
+
+    def __init__(self, obo_file):
+        self.by_source = {}
+        self.by_name = {}
+        self.terms = 0
+        for term in iter_terms(obo_file):
+            self.terms += 1
+            stem = source_stem(term['comment']) if term['comment'] else ''
+            for synonym in term['synonyms']:
+                self.by_source.setdefault((stem, synonym), term)
+                # None marks a name shared by several terms
+                self.by_name[synonym] = None if synonym in self.by_name else term
+
+    def lookup(self, variable_name, file_name=''):
+        """
+        Return the term of a variable, preferring the one harvested from the same source module, or None.
+        """
+        term = self.by_source.get((source_stem(file_name), variable_name))
+        if term is None:
+            term = self.by_name.get(variable_name)
+        return term
+
+def classify(param, term):
+    """
+    Compare a harvested parameter with its term.
+
+    Returns:
+        Tuple of (status, list of the fields that changed)
+    """
+    if term is None:
+        return 'new', []
+    changed = []
+    if normalize(param.get('units', '')) not in {normalize(units) for units in term['units']}:
+        if term['units'] or param.get('units'):
+            changed.append('units')
+    description = normalize(param.get('description', ''))
+    if description and description not in (normalize(term['name']), normalize(term['def'])):
+        changed.append('description')
+    return ('drifted' if changed else 'matched'), changed
+
+def iter_params(jsonl_file):
+    """
+    Yield the parameters of a fortran2params.py JSON lines file ('-' reads standard input).
+    """
+    file = sys.stdin if jsonl_file == '-' else open(jsonl_file, 'r', encoding='utf-8')
+    try:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+def reconcile(jsonl_file, obo_file, output_file):
+    """
+    Classify every harvested parameter against BERVO and write one TSV row per parameter.
+
+    Args:
+        jsonl_file: Path to the JSON lines written by fortran2params.py
+        obo_file: Path to bervo.obo
+        output_file: Path to the output TSV file
+
+    Returns:
+        Dictionary of the number of parameters per status
+    """
+    index = TermIndex(obo_file)
+    counts = {'matched': 0, 'drifted': 0, 'new': 0}
+
+    with open(output_file, 'w', newline='', encoding='utf-8') as out:
+        writer = csv.writer(out, delimiter='\t', lineterminator='\n')
+        writer.writerow(['status', 'variable_name', 'file', 'line', 'term_id', 'term_name',
+                         'changed', 'units', 'term_units', 'description'])
+        for param in iter_params(jsonl_file):
+            term = index.lookup(param['variable_name'], param.get('file', ''))
+            status, changed = classify(param, term)
+            counts[status] += 1
+            writer.writerow([
+                status,
+                param['variable_name'],
+                param.get('file', ''),
+                param.get('line', ''),
+                term['id'] if term else '',
+                term['name'] if term else '',
+                '|'.join(changed),
+                param.get('units', ''),
+                '|'.join(term['units']) if term else '',
+                param.get('description', ''),
+            ])
+
+    print(f"Indexed {index.terms} terms from {obo_file}")
+    print(f"{counts['matched']} matched, {counts['drifted']} drifted, {counts['new']} new; written to {output_file}")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify harvested Fortran parameters as matched, drifted or new BERVO terms.')
+    parser.add_argument('params', help="JSON lines file written by fortran2params.py ('-' for standard input)")
+    parser.add_argument('obo', help='Path to bervo.obo')
+    parser.add_argument('-o', '--output', default='reconciliation.tsv', help='Path to the output TSV file (default: reconciliation.tsv)')
+
+    args = parser.parse_args()
+    reconcile(args.params, args.obo, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Compare BERVO releases term by term.
+
+Each release, given as bervo.obo or bervo.json, is read in one streaming pass
+into a ReleaseIndex that keeps, for every term id, a short hash of each field
+group and a hash of the whole stanza. Long text (definitions, comments,
+synonyms) is kept only as hashes; the groups that changes are reported with
+(label, units, parents, facets, obsolete) also keep their values. Two indexes
+are compared by id in linear time: terms with equal stanza hashes are skipped,
+and for the others only the groups whose hashes differ are reported.
+
+Change types:
+
+    added, removed
+    relabeled          label
+    redefined          definition
+    comment_changed    comment
+    synonyms_changed   synonyms
+    xrefs_changed      xrefs
+    reparented         is_a parents
+    unit_changed       BERVO_has_unit values
+    facets_changed     attribute, context, qualifier, measured_in, measurement_of
+    properties_changed other property values
+    obsolete_changed   is_obsolete / deprecated
+
+Values are normalized before hashing (ids as CURIEs, multi-valued groups
+sorted), so an OBO and a JSON file of the same release compare equal.
+
+Given more than two releases, consecutive pairs are compared and every file is
+read once. The change log is written as JSON Lines, one record per term and
+change type, for downstream caches keyed on BERVO ids to invalidate only the
+terms that changed.
+
+Usage:
+    python release_diff.py old/bervo.obo new/bervo.obo -o changes.jsonl
+    python release_diff.py r1/bervo.json r2/bervo.json r3/bervo.json
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from collections import Counter
+
+from facet_index import FACET_PROPERTIES
+from obo_loader import strip_comment, unquote
+from obograph_reader import JSONStream, curie, iter_graph
+
+# Field groups, in the order of their hashes
+GROUPS = ('label', 'definition', 'comment', 'synonyms', 'xrefs', 'parents',
+          'units', 'facets', 'properties', 'obsolete')
+
+# Field groups whose values are kept for the change log
+KEPT_GROUPS = ('label', 'parents', 'units', 'facets', 'obsolete')
+
+CHANGE_TYPES = {
+    'label': 'relabeled',
+    'definition': 'redefined',
+    'comment': 'comment_changed',
+    'synonyms': 'synonyms_changed',
+    'xrefs': 'xrefs_changed',
+    'parents': 'reparented',
+    'units': 'unit_changed',
+    'facets': 'facets_changed',
+    'properties': 'properties_changed',
+    'obsolete': 'obsolete_changed',
+}
+
+UNIT_PROPERTY = 'bervo:BERVO_has_unit'
+XREF_PROPERTY = 'oboInOwl:hasDbXref'
+FACETS = set(FACET_PROPERTIES.values())
+
+# JSON synonym predicates -> OBO synonym scopes
+SYNONYM_SCOPES = {
+    'hasExactSynonym': 'EXACT',
+    'hasRelatedSynonym': 'RELATED',
+    'hasBroadSynonym': 'BROAD',
+    'hasNarrowSynonym': 'NARROW',
+}
+
+# Digest size of the field group and stanza hashes, in bytes
+DIGEST_SIZE = 8
+
+
+def digest(value):
+    """Hash a normalized field group value."""
+    return hashlib.blake2b(repr(value).encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+def new_fields():
+    """Return empty field groups for one term."""
+    return {'label': None, 'definition': None, 'comment': [], 'synonyms': [], 'xrefs': [], 'parents': [],
+            'units': [], 'facets': [], 'properties': [], 'obsolete': False}
+
+
+def add_property(fields, property_name, value):
+    """Sort a property value into its field group."""
+    if property_name == UNIT_PROPERTY:
+        fields['units'].append(value)
+    elif property_name in FACETS:
+        fields['facets'].append((property_name, value))
+    elif property_name == XREF_PROPERTY:
+        fields['xrefs'].append(value)
+    else:
+        fields['properties'].append((property_name, value))
+
+
+class ReleaseIndex:
+    """
+    Field group hashes of the terms of one release.
+
+    Attributes:
+        version: data-version of the release, or the file name if it has none
+        terms: Term id -> (stanza hash, tuple of field group hashes in GROUPS order,
+            tuple of values of KEPT_GROUPS)
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.terms = {}
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, term_id, fields):
+        """Hash the field groups of a term, sorting multi-valued groups."""
+        values = {group: tuple(sorted(value)) if isinstance(value, list) else value
+                  for group, value in fields.items()}
+        hashes = tuple(digest(values[group]) for group in GROUPS)
+        self.terms[term_id] = (hashlib.blake2b(b''.join(hashes), digest_size=DIGEST_SIZE).digest(),
+                               hashes, tuple(values[group] for group in KEPT_GROUPS))
+
+    @classmethod
+    def from_obo(cls, obo_file):
+        """Read the [Term] stanzas of an OBO file, one at a time."""
+        index = cls(obo_file)
+        term_id = None
+        fields = None
+        in_header = True
+        with open(obo_file, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.rstrip('\n')
+                if not line or line.startswith('!'):
+                    continue
+                if line[0] == '[':
+                    in_header = False
+                    if term_id is not None:
+                        index.add(term_id, fields)
+                    term_id = None
+                    fields = new_fields() if line.startswith('[Term]') else None
+                    continue
+                tag, _, value = line.partition(': ')
+                if in_header:
+                    if tag == 'data-version':
+                        index.version = value.strip()
+                    continue
+                if fields is None:
+                    continue
+
+                if tag == 'id':
+                    term_id = value.strip()
+                elif tag == 'name':
+                    fields['label'] = value.strip()
+                elif tag == 'def':
+                    fields['definition'] = unquote(value)[0]
+                elif tag == 'comment':
+                    fields['comment'].append(value.strip())
+                elif tag == 'synonym':
+                    text, rest = unquote(value)
+                    fields['synonyms'].append((text, rest.split(' ', 1)[0] if rest else 'RELATED'))
+                elif tag == 'xref':
+                    fields['xrefs'].append(strip_comment(value))
+                elif tag == 'is_a':
+                    fields['parents'].append(strip_comment(value))
+                elif tag == 'property_value':
+                    property_name, _, rest = value.partition(' ')
+                    text = unquote(rest)[0] if rest.startswith('"') else strip_comment(rest)
+                    add_property(fields, property_name, text)
+                elif tag == 'is_obsolete':
+                    fields['obsolete'] = value.strip() == 'true'
+        if term_id is not None:
+            index.add(term_id, fields)
+        return index
+
+    @classmethod
+    def from_json(cls, json_file):
+        """
+        Read the classes of an OBO Graphs JSON file, one node at a time.
+
+        Edges follow the nodes in the file, so the parents of each term are
+        collected afterwards and the terms with parents are hashed again.
+        """
+        index = cls(json_file)
+        parents = {}
+        fields_without_parents = {}
+        with open(json_file, 'r', encoding='utf-8') as file:
+            for key, element in iter_graph(JSONStream(file), {'meta', 'nodes', 'edges'}):
+                if key == 'meta':
+                    # e.g. http://purl.obolibrary.org/obo/bervo/releases/2025-08-05/bervo.json
+                    version = element.get('version', '')
+                    if '/releases/' in version:
+                        index.version = 'releases/' + version.split('/releases/', 1)[1].split('/', 1)[0]
+                elif key == 'nodes':
+                    if element.get('type') != 'CLASS':
+                        continue
+                    term_id = curie(element['id'])
+                    meta = element.get('meta') or {}
+                    fields = new_fields()
+                    fields['label'] = element.get('lbl')
+                    fields['definition'] = (meta.get('definition') or {}).get('val')
+                    fields['comment'] = list(meta.get('comments', []))
+                    fields['synonyms'] = [(synonym['val'], SYNONYM_SCOPES.get(synonym.get('pred'), 'RELATED'))
+                                          for synonym in meta.get('synonyms', [])]
+                    fields['xrefs'] = [xref['val'] for xref in meta.get('xrefs', [])]
+                    fields['obsolete'] = meta.get('deprecated', False)
+                    for entry in meta.get('basicPropertyValues', []):
+                        add_property(fields, curie(entry['pred']), curie(entry['val']))
+                    index.add(term_id, fields)
+                    fields_without_parents[term_id] = fields
+                elif element.get('pred') == 'is_a':
+                    parents.setdefault(curie(element['sub']), []).append(curie(element['obj']))
+        for term_id, term_parents in parents.items():
+            fields = fields_without_parents.get(term_id)
+            if fields is not None:
+                fields['parents'] = term_parents
+                index.add(term_id, fields)
+        return index
+
+    @classmethod
+    def from_file(cls, release_file):
+        """Read a release from an .obo or .json file."""
+        if release_file.endswith('.json'):
+            return cls.from_json(release_file)
+        return cls.from_obo(release_file)
+
+
+def diff(old, new):
+    """
+    Compare two releases by term id.
+
+    Args:
+        old: ReleaseIndex of the earlier release
+        new: ReleaseIndex of the later release
+
+    Yields:
+        Change records: dictionaries with id and change, and old and new values
+        for the field groups whose values are kept
+    """
+    kept = {group: position for position, group in enumerate(KEPT_GROUPS)}
+    for term_id, (stanza, hashes, values) in new.terms.items():
+        previous = old.terms.get(term_id)
+        if previous is None:
+            yield {'id': term_id, 'change': 'added', 'label': values[kept['label']]}
+            continue
+        if previous[0] == stanza:
+            continue
+        for position, group in enumerate(GROUPS):
+            if previous[1][position] == hashes[position]:
+                continue
+            record = {'id': term_id, 'change': CHANGE_TYPES[group]}
+            if group in kept:
+                record['old'] = previous[2][kept[group]]
+                record['new'] = values[kept[group]]
+            yield record
+    for term_id, (_, _, values) in old.terms.items():
+        if term_id not in new.terms:
+            yield {'id': term_id, 'change': 'removed', 'label': values[kept['label']]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write the term changes between BERVO releases as JSON Lines.')
+    parser.add_argument('releases', nargs='+', help='Releases as bervo.obo or bervo.json files, oldest first')
+    parser.add_argument('-o', '--output', help='Path to the change log (default: standard output)')
+
+    args = parser.parse_args()
+    if len(args.releases) < 2:
+        parser.error('at least two releases are required')
+
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        start = time.perf_counter()
+        old = ReleaseIndex.from_file(args.releases[0])
+        for release_file in args.releases[1:]:
+            new = ReleaseIndex.from_file(release_file)
+            counts = Counter()
+            for record in diff(old, new):
+                counts[record['change']] += 1
+                output.write(json.dumps({'from': old.version, 'to': new.version, **record},
+                                        ensure_ascii=False) + '\n')
+            summary = ', '.join(f"{count} {change}" for change, count in counts.most_common()) or 'no changes'
+            print(f"{old.version} -> {new.version}: {summary} "
+                  f"({len(old)} -> {len(new)} terms, {time.perf_counter() - start:.2f} s)", file=sys.stderr)
+            old = new
+            start = time.perf_counter()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
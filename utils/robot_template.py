@@ -0,0 +1,629 @@
+"""
+Compile simple ROBOT templates to OBO or OWL without starting ROBOT.
+
+Templates such as src/ontology/attribute.csv and qualifier.csv have a row of
+column names, a row of ROBOT template directives and one row per term:
+
+    ID,label,definition,parent
+    ID,A rdfs:label,A IAO:0000115,SC %
+    ECOSIMCONCEPT:Activity,Activity,"The rate of a process or action",ECOSIMCONCEPT:Attribute
+
+The supported directives are the ones these files use:
+
+    ID          term id, as a CURIE or an IRI
+    LABEL       rdfs:label
+    TYPE        entity type: class (default), object property, annotation
+                property, data property or individual
+    CLASS_TYPE  subclass (default); other class types are reported as errors
+    A p         annotation p with a string value, e.g. A rdfs:label, A IAO:0000115
+    AI p        annotation p with an IRI value, e.g. AI oio:hasDbXref
+    SC %        named superclass, or superproperty of a property; an error
+                for individuals
+    SPLIT=|     suffix of any directive, splitting the cell into several values
+
+Empty cells are skipped, as ROBOT does, and an empty directive leaves a
+column out. Other directives, such as class expressions in SC, are reported
+as errors rather than ignored.
+
+Before anything is written, the templates are checked together: IDs and
+parents must be CURIEs with a known or OBO-style prefix, or IRIs; an ID may be
+defined only once across all templates; a term may not be its own parent and
+the compiled superclasses may not form a cycle. Parents that are defined in
+none of the templates, nor in the files given with --known, are reported as
+warnings, or as errors with --strict.
+
+Templates are parsed in a process pool, one per file. Each template is
+written next to its source (or to --output-dir) with the extension of the
+format, and --merge-output writes all of them as one ontology, as robot merge
+and annotate do for imports.owl.
+
+Usage:
+    python robot_template.py --prefix "ECOSIMCONCEPT: http://purl.obolibrary.org/obo/ECOSIMCONCEPT_" \\
+        src/ontology/attribute.csv src/ontology/qualifier.csv --format obo
+    python robot_template.py src/ontology/*.csv --merge-output src/ontology/imports.owl \\
+        --ontology-iri http://purl.obolibrary.org/obo/bervo/imports.owl
+"""
+import argparse
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+OBO_PURL = 'http://purl.obolibrary.org/obo/'
+
+# Prefixes known without --prefix
+DEFAULT_PREFIXES = {
+    'rdf': 'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    'rdfs': 'http://www.w3.org/2000/01/rdf-schema#',
+    'owl': 'http://www.w3.org/2002/07/owl#',
+    'xsd': 'http://www.w3.org/2001/XMLSchema#',
+    'oio': 'http://www.geneontology.org/formats/oboInOwl#',
+    'oboInOwl': 'http://www.geneontology.org/formats/oboInOwl#',
+    'dcterms': 'http://purl.org/dc/terms/',
+    'skos': 'http://www.w3.org/2004/02/skos/core#',
+    'obo': OBO_PURL,
+    'BERVO': OBO_PURL + 'BERVO_',
+    'ECOSIMCONCEPT': OBO_PURL + 'ECOSIMCONCEPT_',
+    'bervo': 'https://w3id.org/bervo/',
+}
+
+# CURIE of an OBO-style prefix, expanded to an OBO PURL when the prefix is not known
+CURIE_PATTERN = re.compile(r'^([A-Za-z][A-Za-z0-9_.-]*):(\S+)$')
+DIRECTIVE_PATTERN = re.compile(r'^(.*?)(?:\s+SPLIT=(\S+))?$')
+NCNAME_PATTERN = re.compile(r'^[A-Za-z_][\w.-]*$')
+
+# TYPE values -> OWL entity types
+ENTITY_TYPES = {
+    'class': 'owl:Class',
+    'owl:class': 'owl:Class',
+    'object property': 'owl:ObjectProperty',
+    'owl:objectproperty': 'owl:ObjectProperty',
+    'annotation property': 'owl:AnnotationProperty',
+    'owl:annotationproperty': 'owl:AnnotationProperty',
+    'data property': 'owl:DatatypeProperty',
+    'datatype property': 'owl:DatatypeProperty',
+    'owl:datatypeproperty': 'owl:DatatypeProperty',
+    'individual': 'owl:NamedIndividual',
+    'named individual': 'owl:NamedIndividual',
+    'owl:namedindividual': 'owl:NamedIndividual',
+}
+
+# OWL entity types -> OBO stanza types
+OBO_STANZAS = {
+    'owl:Class': 'Term',
+    'owl:ObjectProperty': 'Typedef',
+    'owl:AnnotationProperty': 'Typedef',
+    'owl:DatatypeProperty': 'Typedef',
+    'owl:NamedIndividual': 'Instance',
+}
+
+# Annotation property IRIs written as OBO tags
+LABEL = DEFAULT_PREFIXES['rdfs'] + 'label'
+DEFINITION = OBO_PURL + 'IAO_0000115'
+COMMENT = DEFAULT_PREFIXES['rdfs'] + 'comment'
+OIO = DEFAULT_PREFIXES['oio']
+SYNONYM_SCOPES = {
+    OIO + 'hasExactSynonym': 'EXACT',
+    OIO + 'hasRelatedSynonym': 'RELATED',
+    OIO + 'hasBroadSynonym': 'BROAD',
+    OIO + 'hasNarrowSynonym': 'NARROW',
+}
+XREF = OIO + 'hasDbXref'
+SUBSET = OIO + 'inSubset'
+
+
+class TemplateError(ValueError):
+    """A template that cannot be compiled."""
+
+
+class Column:
+    """A template column: what its cells define, and the separator of multiple values."""
+
+    __slots__ = ('kind', 'property', 'split')
+
+    def __init__(self, kind, property_iri=None, split=None):
+        self.kind = kind
+        self.property = property_iri
+        self.split = split
+
+
+class Entity:
+    """
+    A term defined by a template row.
+
+    Attributes:
+        id: Term id as written in the template
+        iri: Expanded IRI
+        type: OWL entity type, e.g. owl:Class
+        annotations: List of (property IRI, value, value is an IRI)
+        parents: List of (parent id, parent IRI)
+        source: 'file:line' of the row
+    """
+
+    __slots__ = ('id', 'iri', 'type', 'annotations', 'parents', 'source')
+
+    def __init__(self, term_id, iri, source):
+        self.id = term_id
+        self.iri = iri
+        self.type = 'owl:Class'
+        self.annotations = []
+        self.parents = []
+        self.source = source
+
+    def label(self):
+        """Return the first rdfs:label of the term, or None."""
+        return next((value for prop, value, _ in self.annotations if prop == LABEL), None)
+
+
+def expand(curie, prefixes):
+    """
+    Expand a CURIE to an IRI. IRIs are returned as they are, and CURIEs with an
+    unknown prefix are expanded the OBO way, e.g. PO:0025034 -> .../obo/PO_0025034.
+
+    Returns:
+        IRI, or None if the value is neither an IRI nor a CURIE
+    """
+    if curie.startswith(('http://', 'https://')):
+        return curie if not any(char.isspace() for char in curie) else None
+    match = CURIE_PATTERN.match(curie)
+    if match is None:
+        return None
+    prefix, local = match.groups()
+    if prefix in prefixes:
+        return prefixes[prefix] + local
+    return f"{OBO_PURL}{prefix}_{local}"
+
+
+def contract(iri, prefixes):
+    """Return the CURIE of an IRI for OBO output, using the longest matching prefix."""
+    best = None
+    for prefix, namespace in prefixes.items():
+        if iri.startswith(namespace) and len(iri) > len(namespace) and namespace != OBO_PURL:
+            if best is None or len(namespace) > len(prefixes[best]):
+                best = prefix
+    if best is not None:
+        return f"{best}:{iri[len(prefixes[best]):]}"
+    if iri.startswith(OBO_PURL) and '_' in iri[len(OBO_PURL):]:
+        return iri[len(OBO_PURL):].replace('_', ':', 1)
+    return iri
+
+
+def parse_directive(directive, prefixes):
+    """
+    Parse a template directive such as 'A IAO:0000115' or 'SC % SPLIT=|'.
+
+    Raises:
+        TemplateError: for directives this compiler does not support
+    """
+    match = DIRECTIVE_PATTERN.match(directive.strip())
+    template, split = match.group(1).strip(), match.group(2)
+    if not template:
+        return Column('ignore')
+    if template in ('ID', 'LABEL', 'TYPE'):
+        return Column(template.lower(), LABEL if template == 'LABEL' else None, split)
+    if template == 'CLASS_TYPE':
+        return Column('class_type', None, split)
+    kind, _, argument = template.partition(' ')
+    argument = argument.strip()
+    if kind in ('A', 'AI'):
+        property_iri = expand(argument, prefixes)
+        if property_iri is None:
+            raise TemplateError(f"invalid annotation property {argument!r} in {directive!r}")
+        return Column('annotation_iri' if kind == 'AI' else 'annotation', property_iri, split)
+    if kind == 'SC' and argument == '%':
+        return Column('subclass', None, split)
+    raise TemplateError(f"unsupported template directive {directive!r}")
+
+
+def parse_template(template_file, prefixes):
+    """
+    Parse a template file into entities.
+
+    Args:
+        template_file: Path to the CSV or TSV template
+        prefixes: Prefix -> namespace
+
+    Returns:
+        Tuple of (list of Entity, list of error messages)
+    """
+    delimiter = '\t' if template_file.endswith('.tsv') else ','
+    errors = []
+    entities = []
+    with open(template_file, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.reader(file, delimiter=delimiter)
+        names = next(reader, None)
+        directives = next(reader, None)
+        if names is None or directives is None:
+            return [], [f"{template_file}: a template needs a header row and a directive row"]
+        columns = []
+        for position, directive in enumerate(directives):
+            try:
+                columns.append(parse_directive(directive, prefixes))
+            except TemplateError as error:
+                name = names[position] if position < len(names) else position + 1
+                errors.append(f"{template_file}:2: column {name}: {error}")
+                columns.append(Column('ignore'))
+        id_columns = [position for position, column in enumerate(columns) if column.kind == 'id']
+        if len(id_columns) != 1:
+            errors.append(f"{template_file}:2: a template needs exactly one ID column, found {len(id_columns)}")
+            return [], errors
+        id_column = id_columns[0]
+
+        for line, row in enumerate(reader, start=3):
+            if not any(cell.strip() for cell in row):
+                continue
+            source = f"{template_file}:{line}"
+            term_id = row[id_column].strip() if id_column < len(row) else ''
+            if not term_id:
+                errors.append(f"{source}: missing ID")
+                continue
+            iri = expand(term_id, prefixes)
+            if iri is None:
+                errors.append(f"{source}: invalid ID {term_id!r}")
+                continue
+            entity = Entity(term_id, iri, source)
+            for position, column in enumerate(columns):
+                if position >= len(row) or column.kind in ('id', 'ignore'):
+                    continue
+                cell = row[position].strip()
+                if not cell:
+                    continue
+                values = [value.strip() for value in cell.split(column.split)] if column.split else [cell]
+                for value in values:
+                    if not value:
+                        continue
+                    if column.kind in ('label', 'annotation'):
+                        entity.annotations.append((column.property, value, False))
+                    elif column.kind == 'annotation_iri':
+                        value_iri = expand(value, prefixes)
+                        if value_iri is None:
+                            errors.append(f"{source}: invalid IRI value {value!r} in column {names[position]}")
+                        else:
+                            entity.annotations.append((column.property, value_iri, True))
+                    elif column.kind == 'subclass':
+                        parent_iri = expand(value, prefixes)
+                        if parent_iri is None:
+                            errors.append(f"{source}: invalid parent {value!r}")
+                        elif parent_iri == iri:
+                            errors.append(f"{source}: {term_id} is its own parent")
+                        else:
+                            entity.parents.append((value, parent_iri))
+                    elif column.kind == 'class_type':
+                        # Only subclass, the default, is supported; equivalent or
+                        # disjoint classes would otherwise compile to subClassOf
+                        if value.lower() != 'subclass':
+                            errors.append(f"{source}: unsupported CLASS_TYPE {value!r}, only subclass is supported")
+                    elif column.kind == 'type':
+                        entity_type = ENTITY_TYPES.get(value.lower())
+                        if entity_type is None:
+                            errors.append(f"{source}: unknown TYPE {value!r}")
+                        else:
+                            entity.type = entity_type
+            # SC gives superclasses, or superproperties of properties; an
+            # individual has neither, and would need rdf:type instead
+            if entity.type == 'owl:NamedIndividual' and entity.parents:
+                errors.append(f"{source}: SC is not supported for individual {term_id}")
+                entity.parents = []
+            entities.append(entity)
+    return entities, errors
+
+
+def check_entities(templates, known_iris=(), strict=False):
+    """
+    Check the entities of all templates together.
+
+    Args:
+        templates: List of (template file, entities)
+        known_iris: IRIs of terms defined outside the templates
+        strict: Report undefined parents as errors instead of warnings
+
+    Returns:
+        Tuple of (list of errors, list of warnings)
+    """
+    errors = []
+    warnings = []
+    defined = {}
+    for _, entities in templates:
+        for entity in entities:
+            if entity.iri in defined:
+                errors.append(f"{entity.source}: {entity.id} is already defined at {defined[entity.iri].source}")
+            else:
+                defined[entity.iri] = entity
+            if entity.label() is None:
+                warnings.append(f"{entity.source}: {entity.id} has no label")
+
+    # Undefined parents are reported once each, with the first term that uses them
+    known = set(known_iris)
+    undefined = {}
+    for entity in defined.values():
+        for parent_id, parent_iri in entity.parents:
+            if parent_iri not in defined and parent_iri not in known:
+                undefined.setdefault(parent_iri, (parent_id, entity, []))[2].append(entity)
+    for parent_id, first, children in undefined.values():
+        message = (f"{first.source}: parent {parent_id} of {first.id} is not defined in the templates"
+                   + (f", nor for {len(children) - 1} other terms" if len(children) > 1 else ''))
+        (errors if strict else warnings).append(message)
+
+    # Cycles among the compiled superclasses
+    state = {}
+    for start in defined:
+        if start in state:
+            continue
+        stack = [(start, iter(defined[start].parents))]
+        state[start] = 'open'
+        while stack:
+            iri, parents = stack[-1]
+            for _, parent_iri in parents:
+                if parent_iri not in defined:
+                    continue
+                if state.get(parent_iri) == 'open':
+                    errors.append(f"{defined[iri].source}: superclass cycle through {defined[iri].id} "
+                                  f"and {defined[parent_iri].id}")
+                elif parent_iri not in state:
+                    state[parent_iri] = 'open'
+                    stack.append((parent_iri, iter(defined[parent_iri].parents)))
+                    break
+            else:
+                state[iri] = 'done'
+                stack.pop()
+    return errors, warnings
+
+
+def obo_quote(text):
+    """Quote a string for an OBO tag value."""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def render_obo(entities, prefixes, ontology=None):
+    """
+    Write entities as an OBO document, with stanzas sorted by id and tags in OBO order.
+
+    Args:
+        entities: List of Entity
+        prefixes: Prefix -> namespace, to write IRIs as CURIEs
+        ontology: Optional value of the ontology header tag
+
+    Returns:
+        OBO text
+    """
+    lines = ['format-version: 1.2']
+    if ontology:
+        lines.append(f"ontology: {ontology}")
+    order = {'Term': 0, 'Typedef': 1, 'Instance': 2}
+    for entity in sorted(entities, key=lambda entity: (order[OBO_STANZAS[entity.type]], contract(entity.iri, prefixes))):
+        tags = {tag: [] for tag in ('name', 'def', 'comment', 'subset', 'synonym', 'xref', 'is_a', 'property_value')}
+        for prop, value, is_iri in entity.annotations:
+            if prop == LABEL and not tags['name']:
+                tags['name'].append(value)
+            elif prop == DEFINITION and not tags['def']:
+                tags['def'].append(f"{obo_quote(value)} []")
+            elif prop == COMMENT and not tags['comment']:
+                tags['comment'].append(value)
+            elif prop in SYNONYM_SCOPES:
+                tags['synonym'].append(f"{obo_quote(value)} {SYNONYM_SCOPES[prop]} []")
+            elif prop == XREF:
+                tags['xref'].append(contract(value, prefixes) if is_iri else value)
+            elif prop == SUBSET and is_iri:
+                tags['subset'].append(contract(value, prefixes))
+            elif is_iri:
+                tags['property_value'].append(f"{contract(prop, prefixes)} {contract(value, prefixes)}")
+            else:
+                tags['property_value'].append(f"{contract(prop, prefixes)} {obo_quote(value)} xsd:string")
+        for parent_id, parent_iri in entity.parents:
+            tags['is_a'].append(contract(parent_iri, prefixes))
+
+        lines += ['', f"[{OBO_STANZAS[entity.type]}]", f"id: {contract(entity.iri, prefixes)}"]
+        for tag, values in tags.items():
+            lines += [f"{tag}: {value}" for value in values]
+    return '\n'.join(lines) + '\n'
+
+
+def qualified_name(iri, namespaces):
+    """
+    Split a property IRI into an XML qualified name, adding its namespace to namespaces.
+
+    Raises:
+        TemplateError: if the IRI has no local part that is a valid XML name
+    """
+    position = max(iri.rfind('/'), iri.rfind('#')) + 1
+    namespace, local = iri[:position], iri[position:]
+    if not NCNAME_PATTERN.match(local):
+        raise TemplateError(f"annotation property {iri} cannot be written as RDF/XML")
+    prefix = namespaces.get(namespace)
+    if prefix is None:
+        prefix = namespaces[namespace] = f"ns{len(namespaces) + 1}"
+    return f"{prefix}:{local}"
+
+
+def render_owl(entities, ontology_iri=None):
+    """
+    Write entities as an OWL ontology in RDF/XML, with entities sorted by IRI.
+
+    Args:
+        entities: List of Entity
+        ontology_iri: Optional ontology IRI
+
+    Returns:
+        RDF/XML text
+    """
+    namespaces = {
+        DEFAULT_PREFIXES['rdf']: 'rdf',
+        DEFAULT_PREFIXES['rdfs']: 'rdfs',
+        DEFAULT_PREFIXES['owl']: 'owl',
+        DEFAULT_PREFIXES['xsd']: 'xsd',
+        OIO: 'oboInOwl',
+        OBO_PURL: 'obo',
+    }
+    body = []
+    if ontology_iri:
+        body.append(f"    <owl:Ontology rdf:about={quoteattr(ontology_iri)}/>")
+    else:
+        body.append('    <owl:Ontology/>')
+
+    properties = sorted({prop for entity in entities for prop, _, _ in entity.annotations} - {LABEL, COMMENT})
+    for prop in properties:
+        body.append(f"    <owl:AnnotationProperty rdf:about={quoteattr(prop)}/>")
+
+    for entity in sorted(entities, key=lambda entity: entity.iri):
+        body.append(f"    <{entity.type} rdf:about={quoteattr(entity.iri)}>")
+        for _, parent_iri in entity.parents:
+            relation = 'rdfs:subClassOf' if entity.type == 'owl:Class' else 'rdfs:subPropertyOf'
+            body.append(f"        <{relation} rdf:resource={quoteattr(parent_iri)}/>")
+        for prop, value, is_iri in entity.annotations:
+            name = qualified_name(prop, namespaces)
+            if is_iri:
+                body.append(f"        <{name} rdf:resource={quoteattr(value)}/>")
+            else:
+                body.append(f"        <{name}>{escape(value)}</{name}>")
+        body.append(f"    </{entity.type}>")
+
+    header = ['<?xml version="1.0"?>', '<rdf:RDF']
+    header += [f"     xmlns:{prefix}={quoteattr(namespace)}" for namespace, prefix in namespaces.items()]
+    header[-1] += '>'
+    return '\n'.join(header + body + ['</rdf:RDF>']) + '\n'
+
+
+def read_known_iris(known_file, prefixes):
+    """Read the term IRIs of an OBO file (id: tags) or of a list of ids, one per line."""
+    iris = set()
+    with open(known_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            line = line.strip()
+            if line.startswith('id: '):
+                line = line[4:].strip()
+            elif ':' not in line or ' ' in line:
+                continue
+            iri = expand(line, prefixes)
+            if iri is not None:
+                iris.add(iri)
+    return iris
+
+
+def output_path(template_file, output_format, output_dir=None):
+    """Return the output path of a template, e.g. attribute.csv -> attribute.obo."""
+    name = os.path.splitext(os.path.basename(template_file))[0] + '.' + output_format
+    return os.path.join(output_dir or os.path.dirname(template_file), name)
+
+
+def compile_templates(template_files, prefixes=None, output_format='obo', output_dir=None, outputs=None,
+                      merge_output=None, ontology_iri=None, known_iris=(), strict=False, workers=1,
+                      template_outputs=True):
+    """
+    Parse, check and write templates.
+
+    Nothing is written if any template has errors.
+
+    Args:
+        template_files: Paths to the templates
+        prefixes: Prefix -> namespace, added to DEFAULT_PREFIXES
+        output_format: 'obo' or 'owl', for the per-template outputs
+        output_dir: Directory of the per-template outputs (default: next to each template)
+        outputs: Explicit output paths, one per template, instead of output_dir
+        merge_output: Optional path of one ontology with the terms of all templates;
+            its format follows its extension
+        ontology_iri: Ontology IRI of the merged output
+        known_iris: IRIs of parents defined outside the templates
+        strict: Report undefined parents as errors
+        workers: Number of worker processes to parse templates in
+        template_outputs: Write one file per template; if False, only merge_output is written
+
+    Returns:
+        Tuple of (list of errors, list of warnings, dictionary of output path -> number of terms)
+    """
+    prefixes = {**DEFAULT_PREFIXES, **(prefixes or {})}
+    if workers > 1 and len(template_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parsed = list(pool.map(parse_template, template_files, [prefixes] * len(template_files)))
+    else:
+        parsed = [parse_template(template_file, prefixes) for template_file in template_files]
+
+    errors = [error for _, template_errors in parsed for error in template_errors]
+    templates = [(template_file, entities) for template_file, (entities, _) in zip(template_files, parsed)]
+    check_errors, warnings = check_entities(templates, known_iris, strict)
+    errors += check_errors
+    if errors:
+        return errors, warnings, {}
+
+    written = {}
+    documents = []
+    for position, (template_file, entities) in enumerate(templates):
+        if not template_outputs:
+            break
+        path = outputs[position] if outputs else output_path(template_file, output_format, output_dir)
+        documents.append((path, entities, None))
+    if merge_output:
+        documents.append((merge_output, [entity for _, entities in templates for entity in entities], ontology_iri))
+    try:
+        rendered = []
+        for path, entities, iri in documents:
+            if path.endswith('.owl'):
+                text = render_owl(entities, iri)
+            else:
+                text = render_obo(entities, prefixes, iri)
+            rendered.append((path, text, len(entities)))
+    except TemplateError as error:
+        return [str(error)], warnings, {}
+    for path, text, count in rendered:
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        written[path] = count
+    return errors, warnings, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile simple ROBOT templates to OBO or OWL.')
+    parser.add_argument('templates', nargs='+', help='Template CSV or TSV files')
+    parser.add_argument('--prefix', action='append', default=[],
+                        help='Prefix as "PREFIX: namespace", as for robot template (repeatable)')
+    parser.add_argument('-f', '--format', choices=['obo', 'owl'], default='obo',
+                        help='Format of the per-template outputs (default: obo)')
+    parser.add_argument('-o', '--output', action='append',
+                        help='Output path of a template, once per template in order (default: next to the template)')
+    parser.add_argument('--output-dir', help='Directory of the per-template outputs')
+    parser.add_argument('--no-template-output', action='store_true',
+                        help='Only write --merge-output, not one file per template')
+    parser.add_argument('--merge-output', help='Path of one ontology with the terms of all templates (.obo or .owl)')
+    parser.add_argument('--ontology-iri', help='Ontology IRI of the merged output')
+    parser.add_argument('--known', action='append', default=[],
+                        help='OBO file or list of ids of terms defined elsewhere, which parents may refer to (repeatable)')
+    parser.add_argument('--strict', action='store_true', help='Report parents not defined anywhere as errors')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Number of worker processes (default: number of CPUs)')
+
+    args = parser.parse_args()
+
+    prefixes = {}
+    for prefix in args.prefix:
+        name, _, namespace = prefix.partition(':')
+        if not name or not namespace.strip():
+            parser.error(f'invalid --prefix {prefix!r}, expected "PREFIX: namespace"')
+        prefixes[name.strip()] = namespace.strip()
+    if args.output and len(args.output) != len(args.templates):
+        parser.error('give one --output per template')
+    if args.no_template_output and not args.merge_output:
+        parser.error('--no-template-output requires --merge-output')
+
+    all_prefixes = {**DEFAULT_PREFIXES, **prefixes}
+    known_iris = set()
+    for known_file in args.known:
+        known_iris |= read_known_iris(known_file, all_prefixes)
+
+    errors, warnings, written = compile_templates(
+        args.templates, prefixes, args.format, args.output_dir, args.output,
+        args.merge_output, args.ontology_iri, known_iris, args.strict, args.workers,
+        template_outputs=not args.no_template_output)
+
+    for warning in warnings:
+        print(f"WARNING: {warning}", file=sys.stderr)
+    for error in errors:
+        print(f"ERROR: {error}", file=sys.stderr)
+    if errors:
+        sys.exit(1)
+    for path, count in written.items():
+        print(f"Wrote {count} terms to {path}")
+
+
+if __name__ == "__main__":
+    main()
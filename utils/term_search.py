@@ -0,0 +1,252 @@
+"""
+Local search index over BERVO labels, synonyms and definitions.
+
+Three lookups are built from bervo.obo (through obo_loader), with no service
+or network dependency:
+
+- exact: a hash of normalized labels and synonyms (case, spaces, underscores
+  and hyphens are ignored, so Eco_NetRad_col and "eco netrad col" match)
+- fuzzy: an inverted index of character trigrams over labels and synonyms,
+  scored by Dice similarity, for misspelled or abbreviated names
+- text: BM25 ranking over labels and definitions, for free-text descriptions
+
+match() tries them in that order, and match_many() answers a batch of queries,
+computing each distinct query only once.
+
+Usage:
+    python term_search.py ../bervo.obo "net radiation" Eco_NetRad_col
+    python term_search.py ../bervo.obo --queries headers.txt -o matches.tsv
+"""
+import argparse
+import csv
+import math
+import re
+import sys
+from collections import Counter
+
+import numpy as np
+
+from obo_loader import load_obo
+
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+# Names are padded at both ends, not between words, so short names still have trigrams
+PAD = '  '
+
+
+def normalize(text):
+    """Normalize a name for exact lookup: lowercase words, ignoring punctuation and separators."""
+    return ' '.join(WORD_PATTERN.findall(text.lower()))
+
+
+def trigrams(text):
+    """Return the set of character trigrams of a normalized name."""
+    padded = f"{PAD}{normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens for BM25."""
+    return WORD_PATTERN.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Exact, trigram and BM25 indexes over the terms of an Ontology.
+
+    Args:
+        ontology: Ontology loaded by obo_loader
+        k1: BM25 term frequency saturation
+        b: BM25 document length normalization
+    """
+
+    def __init__(self, ontology, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.ids = []
+        self.labels = []
+        # Names (labels and synonyms): text, and the position of their term in ids
+        self.names = []
+        self.name_terms = []
+        self.exact = {}
+        self.memo = {}
+
+        for term in ontology:
+            if term.name is None or term.obsolete:
+                continue
+            position = len(self.ids)
+            self.ids.append(term.id)
+            self.labels.append(term.name)
+            for text in [term.name] + [synonym for synonym, _ in term.synonyms]:
+                self.names.append(text)
+                self.name_terms.append(position)
+                terms = self.exact.setdefault(normalize(text), [])
+                if position not in terms:
+                    terms.append(position)
+        self.name_terms = np.array(self.name_terms, dtype=np.int32)
+
+        # Trigram postings: trigram -> array of name positions
+        postings = {}
+        sizes = []
+        for position, text in enumerate(self.names):
+            grams = trigrams(text)
+            sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.trigram_postings = {gram: np.array(names, dtype=np.int32) for gram, names in postings.items()}
+        self.trigram_sizes = np.array(sizes, dtype=np.float64)
+
+        # BM25 postings over each term's label and definition
+        postings = {}
+        lengths = []
+        for position, term in enumerate(term for term in ontology if term.name is not None and not term.obsolete):
+            counts = Counter(tokenize(f"{term.name} {term.definition or ''}"))
+            lengths.append(sum(counts.values()))
+            for word, count in counts.items():
+                postings.setdefault(word, ([], []))
+                postings[word][0].append(position)
+                postings[word][1].append(count)
+        n = len(self.ids)
+        self.doc_lengths = np.array(lengths, dtype=np.float64)
+        average = self.doc_lengths.mean() if n else 0.0
+        self.length_norm = k1 * (1 - b + b * self.doc_lengths / average) if n else self.doc_lengths
+        self.text_postings = {}
+        for word, (docs, counts) in postings.items():
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.text_postings[word] = (np.array(docs, dtype=np.int32), idf, np.array(counts, dtype=np.float64))
+
+    @classmethod
+    def from_obo(cls, obo_file, **kwargs):
+        """Build the index from an OBO file, loading it through the obo_loader cache."""
+        return cls(load_obo(obo_file), **kwargs)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, text):
+        """
+        Return the ids of the terms with a label or synonym equal to text, ignoring case and separators.
+        """
+        return [self.ids[position] for position in self.exact.get(normalize(text), [])]
+
+    def fuzzy(self, text, limit=5, min_score=0.3):
+        """
+        Find terms whose label or synonym shares the most trigrams with text.
+
+        Args:
+            text: Query name
+            limit: Maximum number of terms to return
+            min_score: Minimum Dice similarity of trigram sets, between 0 and 1
+
+        Returns:
+            List of (term id, score, matched label or synonym), best first
+        """
+        query_grams = trigrams(text)
+        grams = [gram for gram in query_grams if gram in self.trigram_postings]
+        if not grams:
+            return []
+        shared = np.bincount(np.concatenate([self.trigram_postings[gram] for gram in grams]),
+                             minlength=len(self.names))
+        scores = 2 * shared / (len(query_grams) + self.trigram_sizes)
+        candidates = np.flatnonzero(scores >= min_score)
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+        results = []
+        seen = set()
+        for name in candidates:
+            term = self.name_terms[name]
+            if term in seen:
+                continue
+            seen.add(term)
+            results.append((self.ids[term], float(scores[name]), self.names[name]))
+            if len(results) == limit:
+                break
+        return results
+
+    def search(self, text, limit=5):
+        """
+        Rank terms by BM25 over their labels and definitions.
+
+        Returns:
+            List of (term id, score), best first
+        """
+        scores = np.zeros(len(self.ids))
+        for word in set(tokenize(text)):
+            posting = self.text_postings.get(word)
+            if posting is None:
+                continue
+            docs, idf, counts = posting
+            scores[docs] += idf * counts * (self.k1 + 1) / (counts + self.length_norm[docs])
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(self.ids[term], float(scores[term])) for term in candidates]
+
+    def match(self, text, min_score=0.5):
+        """
+        Return the best term for a query, trying exact, then fuzzy, then BM25 matching.
+
+        Returns:
+            Tuple of (term id, score, method), or (None, 0.0, None) if nothing matches
+        """
+        result = self.memo.get((text, min_score))
+        if result is not None:
+            return result
+        exact = self.lookup(text)
+        if exact:
+            result = (exact[0], 1.0, 'exact')
+        else:
+            fuzzy = self.fuzzy(text, limit=1, min_score=min_score)
+            if fuzzy:
+                result = (fuzzy[0][0], fuzzy[0][1], 'fuzzy')
+            else:
+                text_results = self.search(text, limit=1)
+                result = (text_results[0][0], text_results[0][1], 'text') if text_results else (None, 0.0, None)
+        self.memo[(text, min_score)] = result
+        return result
+
+    def match_many(self, texts, min_score=0.5):
+        """
+        Match a batch of queries, e.g. the column headers of an input file.
+
+        Returns:
+            List of (term id, score, method), aligned with texts
+        """
+        return [self.match(text, min_score) for text in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Match names or free text to BERVO terms.')
+    parser.add_argument('obo', help='Path to bervo.obo')
+    parser.add_argument('query', nargs='*', help='Queries to match')
+    parser.add_argument('--queries', help="File with one query per line ('-' for standard input)")
+    parser.add_argument('-o', '--output', help='Path to the output TSV file (default: standard output)')
+    parser.add_argument('--min-score', type=float, default=0.5,
+                        help='Minimum trigram similarity of a fuzzy match (default: 0.5)')
+
+    args = parser.parse_args()
+
+    queries = list(args.query)
+    if args.queries:
+        if args.queries == '-':
+            queries += [line.rstrip('\n') for line in sys.stdin if line.strip()]
+        else:
+            with open(args.queries, 'r', encoding='utf-8') as file:
+                queries += [line.rstrip('\n') for line in file if line.strip()]
+
+    index = SearchIndex.from_obo(args.obo)
+    labels = dict(zip(index.ids, index.labels))
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        writer = csv.writer(output, delimiter='\t', lineterminator='\n')
+        writer.writerow(['query', 'term_id', 'label', 'score', 'method'])
+        for query, (term_id, score, method) in zip(queries, index.match_many(queries, args.min_score)):
+            writer.writerow([query, term_id or '', labels.get(term_id, ''), f"{score:.3f}", method or ''])
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
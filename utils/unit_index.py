@@ -0,0 +1,372 @@
+"""
+Parse the BERVO_has_unit strings of bervo.obo and index terms by physical dimension.
+
+Units are written in EcoSIM's free style: "g d-2 h-1", "mol m^-3", "MJ/m3/K",
+"g N m-3", "m3 H2O (gC)-1", "umol g-1 h-1 at 25 oC". Each distinct string is parsed
+once into a canonical Unit: a vector of SI base dimension exponents
+(length, mass, time, current, temperature, amount, luminosity), the factor that
+converts a value to SI units, and an offset for temperature scales.
+
+Parsing rules:
+- exponents may be written m-3, m^-3, m3 or d2; "/" divides by the next unit
+- a parenthesised group takes the exponent after it, as in (gC)-1
+- chemical species and other qualifiers (C, N, H2O, soil, micr., ...) do not
+  change the dimension; they may be written on their own or glued to a mass or
+  amount unit, as in gC or MgC
+- in EcoSIM, d2 and d3 are the area and volume of the grid cell (m2, m3), while
+  d with an exponent of 1 is a day
+- "~" separates alternative spellings of a unit, of which the first is used, and
+  anything after " at " is a measurement condition and is ignored
+
+Results are memoized in a bounded LRU cache, so converting arrays repeatedly
+between the same units never re-parses a string.
+
+Usage:
+    from unit_index import UnitIndex, convert
+
+    index = UnitIndex.from_obo('bervo.obo')
+    index.terms_with_dimension('kg m-2 s-1')
+    convert(values, 'g d-2 h-1', 'kg m-2 s-1')
+"""
+import argparse
+import math
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+import numpy as np
+
+from obo_loader import load_obo
+
+UNIT_PROPERTY = 'bervo:BERVO_has_unit'
+
+# Base dimensions, in the order of the dimension vector
+DIMENSIONS = ('L', 'M', 'T', 'I', 'Θ', 'N', 'J')
+
+
+def dims(L=0, M=0, T=0, I=0, Θ=0, N=0, J=0):
+    """Build a dimension vector from exponents of the base dimensions."""
+    return (L, M, T, I, Θ, N, J)
+
+
+DIMENSIONLESS = dims()
+
+# Units without SI prefixes: symbol -> (dimension vector, SI scale)
+PLAIN_UNITS = {
+    'h': (dims(T=1), 3600.0),
+    'hr': (dims(T=1), 3600.0),
+    'hour': (dims(T=1), 3600.0),
+    'min': (dims(T=1), 60.0),
+    'day': (dims(T=1), 86400.0),
+    'yr': (dims(T=1), 365.0 * 86400.0),
+    'year': (dims(T=1), 365.0 * 86400.0),
+    'ton': (dims(M=1), 1000.0),
+    'K': (dims(Θ=1), 1.0),
+    'degree': (DIMENSIONLESS, math.pi / 180),
+    'degrees': (DIMENSIONLESS, math.pi / 180),
+    'rad': (DIMENSIONLESS, 1.0),
+    'ppm': (DIMENSIONLESS, 1e-6),
+    'ppmv': (DIMENSIONLESS, 1e-6),
+    'ppb': (DIMENSIONLESS, 1e-9),
+    'ppbv': (DIMENSIONLESS, 1e-9),
+    'eqv': (dims(N=1), 1.0),
+    'eq': (dims(N=1), 1.0),
+    'mole': (dims(N=1), 1.0),
+    '%': (DIMENSIONLESS, 0.01),
+}
+
+# Units that take SI prefixes: symbol -> (dimension vector, SI scale)
+PREFIXABLE_UNITS = {
+    'm': (dims(L=1), 1.0),
+    'g': (dims(M=1), 1e-3),
+    's': (dims(T=1), 1.0),
+    'mol': (dims(N=1), 1.0),
+    'J': (dims(L=2, M=1, T=-2), 1.0),
+    'W': (dims(L=2, M=1, T=-3), 1.0),
+    'Pa': (dims(L=-1, M=1, T=-2), 1.0),
+    'S': (dims(L=-2, M=-1, T=3, I=2), 1.0),
+    'L': (dims(L=3), 1e-3),
+    'M': (dims(L=-3, N=1), 1e3),
+}
+
+PREFIXES = {'': 1.0, 'G': 1e9, 'M': 1e6, 'k': 1e3, 'c': 1e-2, 'd': 1e-1, 'm': 1e-3,
+            'u': 1e-6, 'µ': 1e-6, 'n': 1e-9}
+
+# Temperature scales with an offset: symbol -> (scale, offset to kelvin)
+OFFSET_UNITS = {'oC': (1.0, 273.15), 'degC': (1.0, 273.15), '°C': (1.0, 273.15)}
+
+# Qualifiers that name what is measured rather than a unit
+SPECIES = {
+    'C', 'N', 'P', 'O', 'H', 'S', 'K', 'Ca', 'Mg', 'Na', 'Al', 'Fe', 'Cl', 'H2O', 'H3O', 'CO2', 'O2',
+    'e-', 'PAR', 'soil', 'subs', 'subs.', 'micr', 'micr.', 'solute', 'gas', 'pore', 'litr', 'water',
+    'north', 'from', 'horizontal',
+}
+
+# Species symbols that are also units; they are read as species right after a mass unit, as in mg K kg-1
+AMBIGUOUS_SPECIES = {'K', 'Mg', 'S'}
+
+
+def build_unit_table():
+    """Combine plain and prefixed units into one table of symbol -> (dimension vector, SI scale)."""
+    table = {}
+    for symbol, (dimension, scale) in PREFIXABLE_UNITS.items():
+        for prefix, factor in PREFIXES.items():
+            table.setdefault(prefix + symbol, (dimension, scale * factor))
+    # Plain symbols win over prefixed readings
+    table.update(PLAIN_UNITS)
+    table['Mg'] = (dims(M=1), 1e3)
+    table['Mpa'] = table['MPa']
+    return table
+
+
+UNITS = build_unit_table()
+
+TOKEN_PATTERN = re.compile(r'\(|\)(?:\^?(-?\^?\d+))?|/|[^\s()/,]+')
+EXPONENT_PATTERN = re.compile(r'^(.*?)\^?(-?)\^?(\d+)$')
+GLUED_PATTERN = re.compile(r'^([A-Za-zµ°%]+)(\^?-?\^?\d+)([A-Z][A-Za-z0-9]*)$')
+
+
+class Unit(NamedTuple):
+    """A parsed unit: SI value = value * scale + offset."""
+    dimension: tuple
+    scale: float
+    offset: float = 0.0
+
+
+def format_dimension(dimension):
+    """Format a dimension vector, e.g. (-2, 1, -1, 0, 0, 0, 0) -> 'L-2 M T-1'."""
+    parts = [name if exponent == 1 else f"{name}{exponent}"
+             for name, exponent in zip(DIMENSIONS, dimension) if exponent]
+    return ' '.join(parts) or '1'
+
+
+def read_symbol(symbol, exponent, previous):
+    """
+    Read one unit symbol with its exponent.
+
+    Returns:
+        Tuple of (dimension vector, scale, offset), None for a qualifier, or raises ValueError
+    """
+    if symbol in SPECIES and exponent == 1 and (symbol not in AMBIGUOUS_SPECIES or previous == 'mass'):
+        return None
+    if symbol == 'd':
+        # EcoSIM grid cell: d2 is its area and d3 its volume; d alone is a day
+        if abs(exponent) in (2, 3):
+            return dims(L=exponent), 1.0, 0.0
+        return dims(T=exponent), 86400.0 ** exponent, 0.0
+    if symbol in OFFSET_UNITS:
+        scale, offset = OFFSET_UNITS[symbol]
+        return dims(Θ=exponent), scale ** exponent, offset if exponent == 1 else 0.0
+    if symbol in UNITS:
+        dimension, scale = UNITS[symbol]
+        return tuple(d * exponent for d in dimension), scale ** exponent, 0.0
+
+    # A mass or amount unit with a species glued to it, e.g. gC, MgC, g-1C
+    for length in range(len(symbol) - 1, 0, -1):
+        head, tail = symbol[:length], symbol[length:]
+        if head in UNITS and tail in SPECIES and UNITS[head][0] in (dims(M=1), dims(N=1)):
+            dimension, scale = UNITS[head]
+            return tuple(d * exponent for d in dimension), scale ** exponent, 0.0
+    raise ValueError(f"Unknown unit symbol: {symbol}")
+
+
+@lru_cache(maxsize=4096)
+def parse_unit(text):
+    """
+    Parse a unit string into a Unit.
+
+    Args:
+        text: Unit string, e.g. "g d-2 h-1"
+
+    Returns:
+        Unit
+
+    Raises:
+        ValueError: If the string contains a symbol that is not a known unit or qualifier
+    """
+    text = text.split('~', 1)[0].split(' at ', 1)[0].strip()
+    if text in ('', '-', '0-1', '1', 'none', 'dimensionless'):
+        return Unit(DIMENSIONLESS, 1.0)
+
+    dimension = [0] * len(DIMENSIONS)
+    scale = 1.0
+    offset = 0.0
+    symbols = 0
+    # Stack of group frames: (dimension, scale) before the group, and whether it is divided
+    groups = []
+    divide_next = False
+    previous = None
+
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        if token == '/':
+            divide_next = True
+            continue
+        if token == '(':
+            groups.append((dimension, scale, divide_next))
+            dimension, scale, divide_next = [0] * len(DIMENSIONS), 1.0, False
+            continue
+        if token.startswith(')'):
+            if not groups:
+                raise ValueError(f"Unbalanced parentheses in unit: {text}")
+            exponent = int(match.group(1).replace('^', '')) if match.group(1) else 1
+            outer_dimension, outer_scale, divided = groups.pop()
+            sign = -1 if divided else 1
+            dimension = [o + sign * exponent * d for o, d in zip(outer_dimension, dimension)]
+            scale = outer_scale * scale ** (sign * exponent)
+            previous = None
+            continue
+
+        if token in SPECIES:
+            # Species names such as H2O and CO2 end in digits that are not exponents
+            symbol, exponent = token, 1
+        else:
+            # Glued exponent and species, e.g. g-1C
+            glued = GLUED_PATTERN.match(token)
+            if glued and glued.group(3) in SPECIES:
+                token = glued.group(1) + glued.group(2)
+            parts = EXPONENT_PATTERN.match(token)
+            if parts and parts.group(1) and not parts.group(1).endswith(('-', '^')):
+                symbol = parts.group(1)
+                exponent = int(parts.group(3)) * (-1 if parts.group(2) else 1)
+            else:
+                symbol, exponent = token, 1
+        if divide_next:
+            exponent = -exponent
+            divide_next = False
+
+        result = read_symbol(symbol, exponent, previous)
+        if result is None:
+            continue
+        symbol_dimension, symbol_scale, symbol_offset = result
+        dimension = [d + s for d, s in zip(dimension, symbol_dimension)]
+        scale *= symbol_scale
+        offset = symbol_offset
+        symbols += 1
+        previous = 'mass' if symbol_dimension == dims(M=exponent) else None
+
+    if groups:
+        raise ValueError(f"Unbalanced parentheses in unit: {text}")
+    if not symbols:
+        raise ValueError(f"No unit in: {text}")
+    # An offset only applies to a plain temperature, not to e.g. a per-degree rate
+    if symbols > 1 or tuple(dimension) != dims(Θ=1):
+        offset = 0.0
+    return Unit(tuple(dimension), scale, offset)
+
+
+@lru_cache(maxsize=4096)
+def conversion(from_unit, to_unit):
+    """
+    Return (factor, shift) such that value in to_unit = value in from_unit * factor + shift.
+
+    Raises:
+        ValueError: If the units have different dimensions
+    """
+    source, target = parse_unit(from_unit), parse_unit(to_unit)
+    if source.dimension != target.dimension:
+        raise ValueError(f"Cannot convert {from_unit} ({format_dimension(source.dimension)}) "
+                         f"to {to_unit} ({format_dimension(target.dimension)})")
+    return source.scale / target.scale, (source.offset - target.offset) / target.scale
+
+
+def convert(values, from_unit, to_unit):
+    """
+    Convert an array of values between two units of the same dimension.
+
+    Args:
+        values: Array-like of numbers
+        from_unit: Unit string of the values
+        to_unit: Unit string to convert to
+
+    Returns:
+        NumPy float array of converted values
+    """
+    factor, shift = conversion(from_unit, to_unit)
+    values = np.asarray(values, dtype=np.float64)
+    if shift:
+        return values * factor + shift
+    return values * factor
+
+
+class UnitIndex:
+    """
+    Parsed units of all terms of an Ontology, with an inverted index from dimension to terms.
+
+    Attributes:
+        units: Unit string -> Unit, for every distinct string that parsed
+        unparsed: Unit string -> error message, for the strings that did not
+        term_units: Term id -> list of unit strings
+        by_dimension: Dimension vector -> list of term ids
+    """
+
+    def __init__(self, ontology):
+        self.units = {}
+        self.unparsed = {}
+        self.term_units = {}
+        self.by_dimension = {}
+
+        for term in ontology:
+            if term.name is None:
+                continue
+            for text in ontology.property_values(term.id, UNIT_PROPERTY):
+                self.term_units.setdefault(term.id, []).append(text)
+                if text not in self.units and text not in self.unparsed:
+                    try:
+                        self.units[text] = parse_unit(text)
+                    except ValueError as error:
+                        self.unparsed[text] = str(error)
+                unit = self.units.get(text)
+                if unit is not None:
+                    terms = self.by_dimension.setdefault(unit.dimension, [])
+                    if not terms or terms[-1] != term.id:
+                        terms.append(term.id)
+
+    @classmethod
+    def from_obo(cls, obo_file):
+        """Build the index from an OBO file, loading it through the obo_loader cache."""
+        return cls(load_obo(obo_file))
+
+    def terms_with_dimension(self, unit_or_dimension):
+        """
+        Return the ids of the terms whose unit has a dimension.
+
+        Args:
+            unit_or_dimension: A unit string (e.g. "kg m-2 s-1") or a dimension vector
+        """
+        if isinstance(unit_or_dimension, str):
+            unit_or_dimension = parse_unit(unit_or_dimension).dimension
+        return list(self.by_dimension.get(tuple(unit_or_dimension), []))
+
+    def unit_of(self, term_id):
+        """Return the parsed Unit of a term, or None if it has none that parses."""
+        for text in self.term_units.get(term_id, []):
+            if text in self.units:
+                return self.units[text]
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parse the units of an OBO file and group its terms by dimension.')
+    parser.add_argument('obo', help='Path to bervo.obo')
+    parser.add_argument('--convert', nargs=3, metavar=('VALUE', 'FROM', 'TO'),
+                        help='Convert a value between two units instead')
+
+    args = parser.parse_args()
+
+    if args.convert:
+        value, from_unit, to_unit = args.convert
+        print(f"{value} {from_unit} = {convert([float(value)], from_unit, to_unit)[0]:g} {to_unit}")
+        return
+
+    index = UnitIndex.from_obo(args.obo)
+    print(f"{len(index.units)} distinct units parsed, {len(index.unparsed)} not parsed, "
+          f"{len(index.term_units)} terms with units, {len(index.by_dimension)} dimensions")
+    for dimension, terms in sorted(index.by_dimension.items(), key=lambda item: -len(item[1])):
+        print(f"{len(terms):6d}  {format_dimension(dimension)}")
+    for text, error in sorted(index.unparsed.items()):
+        print(f"not parsed: {text!r}: {error}")
+
+
+if __name__ == "__main__":
+    main()